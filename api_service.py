@@ -1,19 +1,28 @@
 import os
-import json
 import time
 import asyncio
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, Optional
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 import signal
 import sys
 
+from contextlib import asynccontextmanager
 from config import Config
-from llm_client import LLMClient
-from embedding_client import EmbeddingClient
-from retriever import PaperRetriever
+from sse_utils import format_sse_data, format_sse_comment, stream_message, stream_with_heartbeat
+from pipeline_scheduler import PipelineScheduler, PipelineStage
+from async_llm_client import AsyncLLMClient
+from http_pool import close_sessions
+from component_pool import get_component_pool
+from request_coalescer import RequestCoalescer
+from review_cache import ReviewCacheHit, get_review_cache, make_review_key
+from rate_limiter import get_all_rate_limiter_stats
+from paper_store import get_paper_store
+from ttl_cache import get_all_ttl_cache_stats
+from hedging import get_all_hedger_stats
+from concurrency_limiter import get_all_concurrency_limiter_stats, start_request_scope
 from literature_analyzer import LiteratureAnalyzer
 from review_generator import ReviewGenerator
 from query_intent_analyzer import QueryIntentAnalyzer
@@ -46,12 +55,22 @@ def load_env_file(env_file: str):
 # 加载环境变量
 load_env_file(".env")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """服务生命周期：启动时创建共享组件，退出时释放连接池"""
+    await asyncio.to_thread(get_component_pool().initialize)
+    yield
+    await AsyncLLMClient.aclose_shared()
+    close_sessions()
+
+
 # 创建FastAPI应用
 app = FastAPI(
     title="ICAIS2025-LiteratureReview API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 @app.middleware("http")
@@ -86,97 +105,164 @@ app.add_middleware(
 REQUEST_TIMEOUT = Config.LITERATURE_REVIEW_TIMEOUT
 
 
+# Cache-Status响应头中的缓存名称（RFC 9211）
+CACHE_STATUS_NAME = "ICAIS2025-LiteratureReview"
+
+# 命中缓存时输出的消息
+CACHE_HIT_MESSAGES = {
+    'zh': {
+        'exact': lambda minutes: f"♻️ 已找到相同查询的综述结果（{minutes} 分钟前生成）\n\n",
+        'semantic': lambda minutes, query: f"♻️ 已找到相似查询「{query}」的综述结果（{minutes} 分钟前生成）\n\n",
+        'refresh': "🔄 已在后台重新生成综述，完成后将更新缓存\n\n",
+        'final_title': "## 📄 文献综述\n\n"
+    },
+    'en': {
+        'exact': lambda minutes: f"♻️ Found a review for the same query (generated {minutes} minutes ago)\n\n",
+        'semantic': lambda minutes, query: f"♻️ Found a review for the similar query \"{query}\" (generated {minutes} minutes ago)\n\n",
+        'refresh': "🔄 Regenerating the review in the background; the cache will be updated when it finishes\n\n",
+        'final_title': "## 📄 Literature Review\n\n"
+    }
+}
+
+# 相同查询的并发请求共享同一条流水线
+request_coalescer = RequestCoalescer("v1")
+
+# 后台刷新缓存的任务，按缓存键去重（保留引用，避免任务被回收）
+_refresh_tasks: Dict[str, asyncio.Task] = {}
+
+
 class LiteratureReviewRequest(BaseModel):
     query: str
+    refresh: bool = False  # 命中缓存时是否在后台重新生成并更新缓存
 
 
-def format_sse_data(content: str) -> str:
-    """生成OpenAI格式的SSE数据"""
-    data = {
-        "object": "chat.completion.chunk",
-        "choices": [{
-            "delta": {
-                "content": content
-            }
-        }]
-    }
-    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-
+async def _encode_query(query: str):
+    """计算查询向量，Embedding客户端不可用或调用失败时返回None"""
+    embedding_client = get_component_pool().embedding_client
+    if embedding_client is None:
+        return None
+    try:
+        embeddings = await asyncio.to_thread(embedding_client.encode, [query])
+        return embeddings[0]
+    except Exception as e:
+        print(f"⚠️  查询向量计算失败: {e}，仅使用精确匹配")
+        return None
 
-def format_sse_done() -> str:
-    """生成SSE结束标记"""
-    return "data: [DONE]\n\n"
 
+async def _lookup_review_cache(query: str, language: str) -> Optional[ReviewCacheHit]:
+    """查询综述缓存：先精确匹配，未命中且有候选条目时再按查询向量近似匹配"""
+    cache = get_review_cache()
+    if cache is None:
+        return None
+    embedding = None
+    if cache.needs_embedding(query, language):
+        await get_component_pool().ensure_initialized()
+        embedding = await _encode_query(query)
+    return await asyncio.to_thread(cache.lookup, query, language, embedding)
 
-def stream_message(message: str, chunk_size: int = 1):
-    """将消息按字符流式输出（同步生成器）"""
-    for i in range(0, len(message), chunk_size):
-        chunk = message[i:i + chunk_size]
-        yield format_sse_data(chunk)
 
+async def _store_review(query: str, language: str, review: str, degraded: Optional[list] = None):
+    """将生成成功的综述写入缓存，失败只记录警告
 
-async def run_with_heartbeat(task_func, *args, heartbeat_interval=25, **kwargs):
-    """
-    执行长时间任务，期间定期发送心跳数据
-    
     Args:
-        task_func: 要执行的同步函数
-        *args, **kwargs: 传递给函数的参数
-        heartbeat_interval: 心跳间隔（秒），默认25秒
-    
-    Yields:
-        心跳数据（空格字符）或任务结果
+        degraded: 降级的阶段（结果为空或使用了fallback），非空时只缓存 REVIEW_CACHE_DEGRADED_TTL 秒，
+            避免降级结果在整个 REVIEW_CACHE_TTL 内被相同和相似的查询复用
     """
-    start_time = time.time()
-    last_heartbeat = start_time
-    
-    # 创建任务（使用asyncio.to_thread将同步函数转换为协程）
-    task = asyncio.create_task(asyncio.to_thread(task_func, *args, **kwargs))
-    
-    # 在任务执行期间定期发送心跳
-    while not task.done():
-        await asyncio.sleep(1)  # 每秒检查一次
-        elapsed = time.time() - last_heartbeat
-        
-        # 如果超过心跳间隔，发送心跳数据
-        if elapsed >= heartbeat_interval:
-            yield format_sse_data(" ")  # 发送一个空格作为心跳
-            last_heartbeat = time.time()
-        
-        # 检查任务是否完成
-        if task.done():
-            break
-    
-    # 等待任务完成并返回结果
+    cache = get_review_cache()
+    if cache is None:
+        return
+    ttl = None
+    if degraded:
+        ttl = Config.REVIEW_CACHE_DEGRADED_TTL
+        print(f"⚠️  综述生成时部分阶段降级（{', '.join(degraded)}），缓存 {ttl} 秒")
     try:
-        result = await task
-        # 使用特殊标记来区分结果和心跳数据
-        yield ("RESULT", result)
+        embedding = await _encode_query(query)
+        await asyncio.to_thread(cache.put, query, language, review, embedding, ttl)
     except Exception as e:
-        print(f"⚠️  任务执行失败: {e}")
-        import traceback
-        print(traceback.format_exc())
-        raise e
+        print(f"⚠️  综述缓存写入失败: {e}")
+
+
+def _schedule_refresh(query: str, language: str):
+    """在后台重新执行流水线以刷新缓存，同一查询已在刷新时不重复启动"""
+    key = make_review_key(query, language)
+    task = _refresh_tasks.get(key)
+    if task is not None and not task.done():
+        return
+
+    async def refresh():
+        try:
+            async for _ in request_coalescer.subscribe(query, lambda: _generate_review_internal(query, language)):
+                pass
+        finally:
+            _refresh_tasks.pop(key, None)
+
+    _refresh_tasks[key] = asyncio.create_task(refresh())
+
+
+def _cache_status(hit: Optional[ReviewCacheHit], refreshing: bool = False) -> str:
+    """生成Cache-Status值，例如 "ICAIS2025-LiteratureReview; hit; detail=semantic" """
+    if get_review_cache() is None:
+        return f"{CACHE_STATUS_NAME}; fwd=bypass"
+    if hit is None:
+        return f"{CACHE_STATUS_NAME}; fwd=miss"
+    ttl = max(0, int(hit.entry.expires_at(get_review_cache().ttl) - time.time()))
+    status = f"{CACHE_STATUS_NAME}; hit; ttl={ttl}; detail={hit.match}"
+    if hit.match == "semantic":
+        status += f"; similarity={hit.similarity:.3f}"
+    if refreshing:
+        status += "; refresh"
+    return status
+
+
+async def _replay_cached_review(hit: ReviewCacheHit, language: str, refreshing: bool) -> AsyncGenerator[str, None]:
+    """直接输出缓存的综述"""
+    messages = CACHE_HIT_MESSAGES[language]
+    minutes = int(hit.age // 60)
+    if hit.match == "semantic":
+        notice = messages['semantic'](minutes, hit.entry.query)
+    else:
+        notice = messages['exact'](minutes)
+    if refreshing:
+        notice += messages['refresh']
+    for text in (notice, messages['final_title'], hit.entry.review):
+        for chunk in stream_message(text):
+            yield chunk
+
+
+async def _with_cache_status(status: str, stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """在SSE流开头输出Cache-Status注释"""
+    yield format_sse_comment(f"cache-status: {status}")
+    async for chunk in stream:
+        yield chunk
 
 
-async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
+async def _generate_review_internal(query: str, language: Optional[str] = None) -> AsyncGenerator[str, None]:
     """内部生成器函数，执行实际的文献综述生成逻辑"""
     start_time = time.time()
+    # 本请求发起的LLM调用共享一份并发份额，避免大请求挤占其他请求
+    start_request_scope()
     
     try:
         # 先检测语言，用于后续消息模板
-        language = await asyncio.to_thread(detect_language, query)
+        if language is None:
+            language = await asyncio.to_thread(detect_language, query)
         
         # 根据语言设置消息模板
         if language == 'zh':
             msg_templates = {
                 'step0': "### 🔍 步骤 0/7: 查询意图深度分析\n\n",
-                'step1': "### 📝 步骤 1/7: 关键词提取与领域分析\n\n✅ 已完成\n\n",
+                'step1': "### 📝 步骤 1/7: 关键词提取\n\n✅ 已完成\n\n",
                 'step2': lambda n: f"### 📚 步骤 2/7: 混合检索论文\n\n✅ 已检索到 {n} 篇相关论文\n\n",
                 'step2_5': "### ✅ 步骤 2.5/7: 检索结果验证\n\n✅ 已完成\n\n",
                 'step3': "### 🗂️ 步骤 3/7: 论文分类与筛选\n\n✅ 已完成\n\n",
                 'step4': "### 📄 步骤 4/7: 论文内容总结\n\n",
+                'step4_progress': "🔄 正在总结论文内容，同时进行趋势分析，请稍候...\n\n",
+                'summary_item': lambda i, n, title, summary: f"**[{i}/{n}] {title}**\n\n{summary}\n\n",
+                'summaries_done': lambda n: f"✅ 已完成 {n} 篇论文总结\n\n",
                 'step5': "### 🔍 步骤 5/7: 主题聚类与趋势分析\n\n",
+                'step5_progress': "🔄 正在进行主题聚类，请稍候...\n\n",
+                'trends_done': "✅ 趋势分析已完成\n\n",
+                'topics_done': "✅ 主题聚类已完成\n\n",
                 'step6': "### 📋 步骤 6/7: 生成文献综述\n\n",
                 'final_title': "## 📄 文献综述\n\n",
                 'error_no_papers': "## ❌ 错误\n\n未检索到相关论文，程序终止\n\n",
@@ -191,12 +277,18 @@ async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
         else:
             msg_templates = {
                 'step0': "### 🔍 Step 0/7: Query Intent Deep Analysis\n\n",
-                'step1': "### 📝 Step 1/7: Keyword Extraction and Domain Analysis\n\n✅ Completed\n\n",
+                'step1': "### 📝 Step 1/7: Keyword Extraction\n\n✅ Completed\n\n",
                 'step2': lambda n: f"### 📚 Step 2/7: Hybrid Paper Retrieval\n\n✅ Retrieved {n} related papers\n\n",
                 'step2_5': "### ✅ Step 2.5/7: Retrieval Result Validation\n\n✅ Completed\n\n",
                 'step3': "### 🗂️ Step 3/7: Paper Classification and Filtering\n\n✅ Completed\n\n",
                 'step4': "### 📄 Step 4/7: Paper Content Summarization\n\n",
+                'step4_progress': "🔄 Summarizing paper content while analyzing trends, please wait...\n\n",
+                'summary_item': lambda i, n, title, summary: f"**[{i}/{n}] {title}**\n\n{summary}\n\n",
+                'summaries_done': lambda n: f"✅ Summarized {n} papers\n\n",
                 'step5': "### 🔍 Step 5/7: Topic Clustering and Trend Analysis\n\n",
+                'step5_progress': "🔄 Performing topic clustering, please wait...\n\n",
+                'trends_done': "✅ Trend analysis completed\n\n",
+                'topics_done': "✅ Topic clustering completed\n\n",
                 'step6': "### 📋 Step 6/7: Literature Review Generation\n\n",
                 'final_title': "## 📄 Literature Review\n\n",
                 'error_no_papers': "## ❌ Error\n\nNo related papers found. Process terminated.\n\n",
@@ -209,43 +301,34 @@ async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
                 'error_general': lambda e: f"## ❌ Error\n\nProcess execution failed: {e}\n\n"
             }
         
-        # 验证配置（不输出）
-        try:
-            config_valid = await asyncio.to_thread(Config.validate_config)
-            if not config_valid:
-                for chunk in stream_message(msg_templates['error_config']):
-                    yield chunk
-                return
-        except Exception as e:
-            for chunk in stream_message(msg_templates['error_config_exception'](e)):
+        # 获取启动时创建的共享组件（初始化失败时在本次请求中重试一次）
+        pool = get_component_pool()
+        await pool.ensure_initialized()
+        if pool.state == "failed":
+            await asyncio.to_thread(pool.recover)
+        
+        if not pool.is_usable:
+            if 'config' in pool.errors:
+                if pool.errors['config']:
+                    message = msg_templates['error_config_exception'](pool.errors['config'])
+                else:
+                    message = msg_templates['error_config']
+            elif 'llm' in pool.errors:
+                message = msg_templates['error_llm_init'](pool.errors['llm'])
+            else:
+                message = msg_templates['error_retriever_init'](pool.errors.get('retriever', ''))
+            for chunk in stream_message(message):
                 yield chunk
             return
         
-        # 创建组件（不输出初始化信息）
-        try:
-            llm_client = LLMClient()
-        except Exception as e:
-            for chunk in stream_message(msg_templates['error_llm_init'](e)):
-                yield chunk
-            return
+        llm_client = pool.llm_client
+        async_llm_client = pool.async_llm_client
+        retriever = pool.retriever
         
-        try:
-            embedding_client = EmbeddingClient()
-        except Exception as e:
-            # Embedding客户端失败不影响主要流程，只记录警告
-            print(f"⚠️  Embedding客户端初始化失败: {e}，将跳过语义重排序")
-            embedding_client = None
-        
-        try:
-            retriever = PaperRetriever()
-        except Exception as e:
-            for chunk in stream_message(msg_templates['error_retriever_init'](e)):
-                yield chunk
-            return
-        
-        analyzer = LiteratureAnalyzer(llm_client, language=language)
-        generator = ReviewGenerator(llm_client, language=language)
-        intent_analyzer = QueryIntentAnalyzer(llm_client, language=language)
+        analyzer = LiteratureAnalyzer(llm_client, language=language, async_llm_client=async_llm_client,
+                                      embedding_client=pool.embedding_client)
+        generator = ReviewGenerator(llm_client, language=language, async_llm_client=async_llm_client)
+        intent_analyzer = QueryIntentAnalyzer(llm_client, language=language, async_llm_client=async_llm_client)
         
         # 步骤0: 查询意图深度分析
         for chunk in stream_message(msg_templates['step0']):
@@ -259,133 +342,118 @@ async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
         for chunk in stream_message(step0_progress):
             yield chunk
         
-        intent_result = None
-        async for item in run_with_heartbeat(
-            intent_analyzer.analyze_intent,
-            query,
-            heartbeat_interval=25
-        ):
-            if isinstance(item, tuple) and len(item) == 2 and item[0] == "RESULT":
-                intent_result = item[1]
-                break
-            else:
-                yield item
+        # 步骤0-5表示为阶段依赖图，依赖满足的阶段立即并发执行：
+        #   intent -> keywords -> retrieval -> validation -> classification -> {summaries, trends}
+        #   summaries -> topics
+        async def run_intent(results, emit):
+            return await intent_analyzer.analyze_intent_async(query) or {}
         
-        if not intent_result:
-            intent_result = {}
+        async def run_keywords(results, emit):
+            return await analyzer.extract_keywords_async(query, results['intent'])
         
-        # 步骤1: 关键词提取与领域分析（基于意图分析结果）
-        keywords = await asyncio.to_thread(analyzer.extract_keywords, query, intent_result)
-        domain_analysis = await asyncio.to_thread(analyzer.analyze_domain, query, keywords, intent_result)
-        for chunk in stream_message(msg_templates['step1']):
-            yield chunk
+        async def run_retrieval(results, emit):
+            return await asyncio.to_thread(retriever.hybrid_retrieve, query, results['keywords'])
         
-        # 步骤2: 混合检索论文
-        papers = await asyncio.to_thread(retriever.hybrid_retrieve, query, keywords)
-        for chunk in stream_message(msg_templates['step2'](len(papers))):
-            yield chunk
-        
-        if not papers:
-            for chunk in stream_message(msg_templates['error_no_papers']):
-                yield chunk
-            return
-        
-        # 步骤2.5: 检索结果验证
-        validated_papers, need_reretrieval = await asyncio.to_thread(
-            analyzer.validate_retrieved_papers, papers, query, intent_result
-        )
-        
-        if need_reretrieval:
-            # 如果需要重新检索，使用意图分析结果中的推荐关键词
-            if language == 'zh':
-                reretrieval_msg = "⚠️  检测到检索结果与查询意图不匹配，正在使用优化后的关键词重新检索...\n\n"
-            else:
-                reretrieval_msg = "⚠️  Detected mismatch between retrieval results and query intent. Re-retrieving with optimized keywords...\n\n"
+        async def run_validation(results, emit):
+            papers = results['retrieval']
+            intent_result = results['intent']
+            validated_papers, need_reretrieval = await analyzer.validate_retrieved_papers_async(
+                papers, query, intent_result
+            )
             
-            for chunk in stream_message(reretrieval_msg):
-                yield chunk
+            if need_reretrieval:
+                # 如果需要重新检索，使用意图分析结果中的推荐关键词
+                if language == 'zh':
+                    emit("⚠️  检测到检索结果与查询意图不匹配，正在使用优化后的关键词重新检索...\n\n")
+                else:
+                    emit("⚠️  Detected mismatch between retrieval results and query intent. Re-retrieving with optimized keywords...\n\n")
+                
+                # 使用推荐关键词重新检索
+                recommended_keywords = intent_result.get("recommended_keywords", results['keywords'])
+                if recommended_keywords:
+                    papers = await asyncio.to_thread(retriever.hybrid_retrieve, query, recommended_keywords)
+            return papers
+        
+        async def run_classification(results, emit):
+            return await analyzer.classify_papers_async(results['validation'], query)
+        
+        # 结果为空或使用了fallback的阶段，决定综述的缓存时间
+        degraded = []
+        
+        async def run_summaries(results, emit):
+            # 每篇总结完成后立即推送，最终按论文顺序组装，保证引用编号与论文对应
+            papers = results['classification']
+            summaries = {}
+            async for index, summary in analyzer.iter_summaries_async(papers, query, results['intent']):
+                summaries[index] = summary
+                emit(msg_templates['summary_item'](index + 1, len(papers), papers[index].get('title', ''), summary))
+            if len(summaries) < len(papers):
+                degraded.append('summaries')
+            return analyzer.assemble_summaries(papers, summaries)
+        
+        async def run_trends(results, emit):
+            return await analyzer.analyze_trends_async(results['classification'])
+        
+        async def run_topics(results, emit):
+            return await analyzer.cluster_topics_async(results['summaries'], results['classification'])
+        
+        scheduler = PipelineScheduler([
+            PipelineStage('intent', run_intent),
+            PipelineStage('keywords', run_keywords, deps=['intent']),
+            PipelineStage('retrieval', run_retrieval, deps=['keywords']),
+            PipelineStage('validation', run_validation, deps=['retrieval']),
+            PipelineStage('classification', run_classification, deps=['validation']),
+            PipelineStage('summaries', run_summaries, deps=['classification']),
+            PipelineStage('trends', run_trends, deps=['classification']),
+            PipelineStage('topics', run_topics, deps=['summaries']),
+        ], heartbeat_interval=25)
+        
+        async for event in scheduler.run():
+            if event[0] == "HEARTBEAT":
+                yield format_sse_data(" ")
+                continue
+            if event[0] == "PROGRESS":
+                for chunk in stream_message(event[2]):
+                    yield chunk
+                continue
             
-            # 使用推荐关键词重新检索
-            recommended_keywords = intent_result.get("recommended_keywords", keywords)
-            if recommended_keywords:
-                papers = await asyncio.to_thread(retriever.hybrid_retrieve, query, recommended_keywords)
-                validated_papers = papers
-        else:
-            validated_papers = papers
-        
-        for chunk in stream_message(msg_templates['step2_5']):
-            yield chunk
-        
-        # 步骤3: 论文分类与筛选
-        classified_papers = await asyncio.to_thread(analyzer.classify_papers, validated_papers, query)
-        for chunk in stream_message(msg_templates['step3']):
-            yield chunk
-        
-        # 步骤4: 论文内容总结（使用心跳机制）
-        for chunk in stream_message(msg_templates['step4']):
-            yield chunk
-        
-        if language == 'zh':
-            step4_progress = "🔄 正在总结论文内容，请稍候...\n\n"
-        else:
-            step4_progress = "🔄 Summarizing paper content, please wait...\n\n"
-        
-        for chunk in stream_message(step4_progress):
-            yield chunk
-        
-        summaries = None
-        async for item in run_with_heartbeat(
-            analyzer.summarize_papers,
-            classified_papers, query,
-            heartbeat_interval=25
-        ):
-            if isinstance(item, tuple) and len(item) == 2 and item[0] == "RESULT":
-                summaries = item[1]
-                break
+            stage_name, result = event[1], event[2]
+            if stage_name == 'keywords':
+                message = msg_templates['step1']
+            elif stage_name == 'retrieval':
+                message = msg_templates['step2'](len(result))
+                if not result:
+                    for chunk in stream_message(message + msg_templates['error_no_papers']):
+                        yield chunk
+                    return
+            elif stage_name == 'validation':
+                message = msg_templates['step2_5']
+            elif stage_name == 'classification':
+                # 分类完成后论文总结与趋势分析同时开始
+                message = msg_templates['step3'] + msg_templates['step4'] + msg_templates['step4_progress']
+            elif stage_name == 'trends':
+                message = msg_templates['trends_done']
+            elif stage_name == 'summaries':
+                message = msg_templates['summaries_done'](len(result)) + msg_templates['step5'] + msg_templates['step5_progress']
+            elif stage_name == 'topics':
+                message = msg_templates['topics_done']
             else:
-                yield item
-        
-        if not summaries:
-            summaries = []
-        
-        # 步骤5: 主题聚类与趋势分析（使用心跳机制）
-        for chunk in stream_message(msg_templates['step5']):
-            yield chunk
-        
-        if language == 'zh':
-            step5_progress = "🔄 正在进行主题聚类和趋势分析，请稍候...\n\n"
-        else:
-            step5_progress = "🔄 Performing topic clustering and trend analysis, please wait...\n\n"
-        
-        for chunk in stream_message(step5_progress):
-            yield chunk
-        
-        topics = None
-        trends = None
-        
-        async for item in run_with_heartbeat(
-            analyzer.cluster_topics,
-            summaries,
-            heartbeat_interval=25
-        ):
-            if isinstance(item, tuple) and len(item) == 2 and item[0] == "RESULT":
-                topics = item[1]
-                break
-            else:
-                yield item
-        
-        async for item in run_with_heartbeat(
-            analyzer.analyze_trends,
-            classified_papers,
-            heartbeat_interval=25
-        ):
-            if isinstance(item, tuple) and len(item) == 2 and item[0] == "RESULT":
-                trends = item[1]
-                break
-            else:
-                yield item
+                continue
+            for chunk in stream_message(message):
+                yield chunk
         
-        # 步骤6: 生成文献综述（使用心跳机制）
+        intent_result = scheduler.results['intent']
+        classified_papers = scheduler.results['classification']
+        summaries = scheduler.results['summaries']
+        topics = scheduler.results['topics']
+        trends = scheduler.results['trends']
+        # 主题聚类和趋势分析失败时返回空字符串，综述缺少相应内容
+        if not topics:
+            degraded.append('topics')
+        if not trends:
+            degraded.append('trends')
+        
+        # 步骤6: 生成文献综述（流式输出）
         for chunk in stream_message(msg_templates['step6']):
             yield chunk
         
@@ -397,24 +465,25 @@ async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
         for chunk in stream_message(step6_progress):
             yield chunk
         
-        review = None
-        async for item in run_with_heartbeat(
-            generator.generate_review,
-            summaries, topics or "", trends or "", query, classified_papers, intent_result,
+        # 流式转发模型输出，收到第一段内容时再输出综述标题
+        review_parts = []
+        async for item in stream_with_heartbeat(
+            generator.stream_review_async(
+                summaries, topics or "", trends or "", query, classified_papers, intent_result
+            ),
             heartbeat_interval=25
         ):
-            if isinstance(item, tuple) and len(item) == 2 and item[0] == "RESULT":
-                review = item[1]
-                break
+            if isinstance(item, tuple) and len(item) == 2 and item[0] == "DELTA":
+                if not review_parts:
+                    for chunk in stream_message(msg_templates['final_title']):
+                        yield chunk
+                review_parts.append(item[1])
+                yield format_sse_data(item[1])
             else:
                 yield item
         
-        # 输出最终综述
-        if review:
-            for chunk in stream_message(msg_templates['final_title']):
-                yield chunk
-            for chunk in stream_message(review):
-                yield chunk
+        if review_parts:
+            await _store_review(query, language, "".join(review_parts), degraded)
         else:
             if language == 'zh':
                 error_msg = "## ❌ 错误\n\n文献综述生成失败\n\n"
@@ -455,11 +524,26 @@ async def generate_literature_review(request: LiteratureReviewRequest):
         StreamingResponse: SSE流式响应
     """
     try:
+        language = await asyncio.to_thread(detect_language, request.query)
+        hit = await _lookup_review_cache(request.query, language)
+        if hit is None:
+            status = _cache_status(None)
+            stream = request_coalescer.subscribe(
+                request.query, lambda: _generate_review_internal(request.query, language)
+            )
+        else:
+            refreshing = request.refresh
+            if refreshing:
+                _schedule_refresh(request.query, language)
+            status = _cache_status(hit, refreshing)
+            stream = _replay_cached_review(hit, language, refreshing)
+        
         return StreamingResponse(
-            _generate_review_internal(request.query),
+            _with_cache_status(status, stream),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
+                "Cache-Status": status,
                 "Connection": "keep-alive",
                 "X-Accel-Buffering": "no"
             }
@@ -474,7 +558,34 @@ async def health_check():
     return {
         "status": "ok",
         "service": "ICAIS2025-LiteratureReview API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "ready": get_component_pool().is_usable
+    }
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """就绪检查端点：共享组件不可用时返回503"""
+    pool = get_component_pool()
+    return JSONResponse(
+        status_code=200 if pool.is_usable else 503,
+        content=pool.readiness()
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """运行指标：限流等待时间、各级缓存命中率、检索对冲、请求合并统计、本地论文库、LLM自适应并发"""
+    review_cache = get_review_cache()
+    paper_store = get_paper_store()
+    return {
+        "rate_limiters": get_all_rate_limiter_stats(),
+        "paper_store": paper_store.get_stats() if paper_store is not None else None,
+        "ttl_caches": get_all_ttl_cache_stats(),
+        "hedging": get_all_hedger_stats(),
+        "review_cache": review_cache.get_stats() if review_cache is not None else None,
+        "request_coalescer": request_coalescer.get_stats(),
+        "llm_concurrency": get_all_concurrency_limiter_stats()
     }
 
 
@@ -485,6 +596,7 @@ async def root():
         "service": "ICAIS2025-LiteratureReview API",
         "version": "1.0.0",
         "health": "http://localhost:3000/health",
+        "metrics": "http://localhost:3000/metrics",
         "docs": "http://localhost:3000/docs",
         "literature_review": "POST /literature_review"
     }
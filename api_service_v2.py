@@ -3,7 +3,6 @@ API服务 v2 - 纯Prompt文献综述生成方案
 不使用检索API，完全依赖大模型的知识库
 """
 import os
-import json
 import time
 import asyncio
 from typing import AsyncGenerator
@@ -15,7 +14,11 @@ import signal
 import sys
 
 from config import Config
+from request_coalescer import RequestCoalescer
+from sse_utils import format_sse_done, stream_message, run_with_heartbeat
 from llm_client import LLMClient
+from async_llm_client import AsyncLLMClient
+from concurrency_limiter import start_request_scope
 from review_generator_v2 import ReviewGeneratorV2
 from prompt_template_v2 import detect_language
 
@@ -85,83 +88,19 @@ app.add_middleware(
 # 设置全局超时
 REQUEST_TIMEOUT = Config.LITERATURE_REVIEW_TIMEOUT
 
+# 相同查询的并发请求共享同一条流水线
+request_coalescer = RequestCoalescer("v2")
+
 
 class LiteratureReviewRequest(BaseModel):
     query: str
 
 
-def format_sse_data(content: str) -> str:
-    """生成OpenAI格式的SSE数据"""
-    data = {
-        "object": "chat.completion.chunk",
-        "choices": [{
-            "delta": {
-                "content": content
-            }
-        }]
-    }
-    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-
-
-def format_sse_done() -> str:
-    """生成SSE结束标记"""
-    return "data: [DONE]\n\n"
-
-
-def stream_message(message: str, chunk_size: int = 1):
-    """将消息按字符流式输出（同步生成器）"""
-    for i in range(0, len(message), chunk_size):
-        chunk = message[i:i + chunk_size]
-        yield format_sse_data(chunk)
-
-
-async def run_with_heartbeat(task_func, *args, heartbeat_interval=25, **kwargs):
-    """
-    执行长时间任务，期间定期发送心跳数据
-    
-    Args:
-        task_func: 要执行的同步函数
-        *args, **kwargs: 传递给函数的参数
-        heartbeat_interval: 心跳间隔（秒），默认25秒
-    
-    Yields:
-        心跳数据（空格字符）或任务结果
-    """
-    start_time = time.time()
-    last_heartbeat = start_time
-    
-    # 创建任务（使用asyncio.to_thread将同步函数转换为协程）
-    task = asyncio.create_task(asyncio.to_thread(task_func, *args, **kwargs))
-    
-    # 在任务执行期间定期发送心跳
-    while not task.done():
-        await asyncio.sleep(1)  # 每秒检查一次
-        elapsed = time.time() - last_heartbeat
-        
-        # 如果超过心跳间隔，发送心跳数据
-        if elapsed >= heartbeat_interval:
-            yield format_sse_data(" ")  # 发送一个空格作为心跳
-            last_heartbeat = time.time()
-        
-        # 检查任务是否完成
-        if task.done():
-            break
-    
-    # 等待任务完成并返回结果
-    try:
-        result = await task
-        # 使用特殊标记来区分结果和心跳数据
-        yield ("RESULT", result)
-    except Exception as e:
-        print(f"⚠️  任务执行失败: {e}")
-        import traceback
-        print(traceback.format_exc())
-        raise e
-
-
 async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
     """内部生成器函数，执行实际的文献综述生成逻辑（v2版本）"""
     start_time = time.time()
+    # 本请求发起的LLM调用共享一份并发份额，避免大请求挤占其他请求
+    start_request_scope()
     
     try:
         # 先检测语言，用于后续消息模板
@@ -206,12 +145,13 @@ async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
         # 创建组件（不输出初始化信息）
         try:
             llm_client = LLMClient()
+            async_llm_client = AsyncLLMClient()
         except Exception as e:
             for chunk in stream_message(msg_templates['error_llm_init'](e)):
                 yield chunk
             return
         
-        generator = ReviewGeneratorV2(llm_client, language=language)
+        generator = ReviewGeneratorV2(llm_client, language=language, async_llm_client=async_llm_client)
         
         # 步骤1: 查询理解与知识规划
         for chunk in stream_message(msg_templates['step1']):
@@ -227,7 +167,7 @@ async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
         
         knowledge_plan = None
         async for item in run_with_heartbeat(
-            generator.understand_query,
+            generator.understand_query_async,
             query,
             heartbeat_interval=25
         ):
@@ -260,7 +200,7 @@ async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
         
         review = None
         async for item in run_with_heartbeat(
-            generator.generate_review,
+            generator.generate_review_async,
             query, knowledge_plan,
             heartbeat_interval=25
         ):
@@ -316,7 +256,9 @@ async def literature_review_endpoint(request: LiteratureReviewRequest):
     try:
         # 使用asyncio.wait_for设置超时
         async def generate_with_timeout():
-            async for chunk in _generate_review_internal(request.query):
+            async for chunk in request_coalescer.subscribe(
+                request.query, lambda: _generate_review_internal(request.query)
+            ):
                 yield chunk
         
         return StreamingResponse(
@@ -2,7 +2,6 @@
 API服务 v4 - 基于v2结构融合v3规范的纯Prompt文献综述生成方案
 """
 import os
-import json
 import time
 import asyncio
 from typing import AsyncGenerator
@@ -14,7 +13,11 @@ import signal
 import sys
 
 from config import Config
+from request_coalescer import RequestCoalescer
+from sse_utils import format_sse_data, format_sse_done, stream_message, run_with_heartbeat, stream_with_heartbeat
 from llm_client import LLMClient
+from async_llm_client import AsyncLLMClient
+from concurrency_limiter import start_request_scope
 from review_generator_v4 import ReviewGeneratorV4
 from prompt_template_v4 import detect_language
 
@@ -86,75 +89,19 @@ app.add_middleware(
 # 设置全局超时
 REQUEST_TIMEOUT = Config.LITERATURE_REVIEW_TIMEOUT
 
+# 相同查询的并发请求共享同一条流水线
+request_coalescer = RequestCoalescer("v4")
+
 
 class LiteratureReviewRequest(BaseModel):
     query: str
 
 
-def format_sse_data(content: str) -> str:
-    """生成OpenAI格式的SSE数据"""
-    data = {
-        "object": "chat.completion.chunk",
-        "choices": [{
-            "delta": {
-                "content": content
-            }
-        }]
-    }
-    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-
-
-def format_sse_done() -> str:
-    """生成SSE结束标记"""
-    return "data: [DONE]\n\n"
-
-
-def stream_message(message: str, chunk_size: int = 1):
-    """将消息按字符流式输出（同步生成器）"""
-    for i in range(0, len(message), chunk_size):
-        chunk = message[i:i + chunk_size]
-        yield format_sse_data(chunk)
-
-
-async def run_with_heartbeat(task_func, *args, heartbeat_interval=25, **kwargs):
-    """
-    执行长时间任务，期间定期发送心跳数据
-    
-    Args:
-        task_func: 要执行的同步函数
-        *args, **kwargs: 传递给函数的参数
-        heartbeat_interval: 心跳间隔（秒），默认25秒
-    
-    Yields:
-        心跳数据（空格字符）或任务结果
-    """
-    start_time = time.time()
-    last_heartbeat = start_time
-    
-    task = asyncio.create_task(asyncio.to_thread(task_func, *args, **kwargs))
-    
-    while not task.done():
-        await asyncio.sleep(1)
-        elapsed = time.time() - last_heartbeat
-        if elapsed >= heartbeat_interval:
-            yield format_sse_data(" ")
-            last_heartbeat = time.time()
-        if task.done():
-            break
-    
-    try:
-        result = await task
-        yield ("RESULT", result)
-    except Exception as e:
-        print(f"⚠️  任务执行失败: {e}")
-        import traceback
-        print(traceback.format_exc())
-        raise e
-
-
 async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
     """内部生成器函数，执行实际的文献综述生成逻辑（v4版本）"""
     start_time = time.time()
+    # 本请求发起的LLM调用共享一份并发份额，避免大请求挤占其他请求
+    start_request_scope()
     
     try:
         language = await asyncio.to_thread(detect_language, query)
@@ -195,12 +142,13 @@ async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
         
         try:
             llm_client = LLMClient()
+            async_llm_client = AsyncLLMClient()
         except Exception as e:
             for chunk in stream_message(msg_templates['error_llm_init'](e)):
                 yield chunk
             return
         
-        generator = ReviewGeneratorV4(llm_client, language=language)
+        generator = ReviewGeneratorV4(llm_client, language=language, async_llm_client=async_llm_client)
         
         # 步骤1：查询理解
         for chunk in stream_message(msg_templates['step1']):
@@ -215,7 +163,7 @@ async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
         
         knowledge_plan = None
         async for item in run_with_heartbeat(
-            generator.understand_query,
+            generator.understand_query_async,
             query,
             heartbeat_interval=25
         ):
@@ -245,24 +193,19 @@ async def _generate_review_internal(query: str) -> AsyncGenerator[str, None]:
         for chunk in stream_message(step2_progress):
             yield chunk
         
-        review = None
-        async for item in run_with_heartbeat(
-            generator.generate_review,
-            query, knowledge_plan,
+        # 流式转发模型输出
+        review_parts = []
+        async for item in stream_with_heartbeat(
+            generator.stream_review_async(query, knowledge_plan),
             heartbeat_interval=25
         ):
-            if isinstance(item, tuple) and len(item) == 2 and item[0] == "RESULT":
-                review = item[1]
-                break
+            if isinstance(item, tuple) and len(item) == 2 and item[0] == "DELTA":
+                review_parts.append(item[1])
+                yield format_sse_data(item[1])
             else:
                 yield item
         
-        if review:
-            # for chunk in stream_message(msg_templates['final_title']):
-            #     yield chunk
-            for chunk in stream_message(review):
-                yield chunk
-        else:
+        if not review_parts:
             if language == 'zh':
                 error_msg = "## ❌ 错误\n\n文献综述生成失败\n\n"
             else:
@@ -297,7 +240,9 @@ async def literature_review_endpoint(request: LiteratureReviewRequest):
     """文献综述生成端点（v4版本 - 基于v2结构融合v3规范）"""
     try:
         async def generate_with_timeout():
-            async for chunk in _generate_review_internal(request.query):
+            async for chunk in request_coalescer.subscribe(
+                request.query, lambda: _generate_review_internal(request.query)
+            ):
                 yield chunk
         
         return StreamingResponse(
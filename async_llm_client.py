@@ -0,0 +1,243 @@
+"""
+异步LLM客户端 - 基于httpx.AsyncClient的原生asyncio实现
+与LLMClient保持相同的重试策略和推理模型语义，但每个进行中的调用不再占用线程
+"""
+import asyncio
+import weakref
+from typing import Optional, AsyncIterator
+import httpx
+from config import Config
+from llm_client import LLMClient
+from concurrency_limiter import OVERLOAD, get_llm_concurrency_limiter, is_overload_status, limit_slot_async
+
+
+class AsyncLLMClient:
+    """异步LLM客户端 - 支持自定义API端点"""
+
+    # 每个事件循环共享一个httpx.AsyncClient（连接与事件循环绑定）
+    _shared_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+    def __init__(self, llm: Optional[str] = None, **kwargs):
+        """
+        初始化异步LLM客户端
+
+        Args:
+            llm: 模型名称
+            **kwargs: 其他参数
+        """
+        self.config = Config
+
+        # 验证配置
+        if not self.config.validate_config():
+            raise ValueError("LLM配置验证失败")
+
+        # 设置模型
+        self.llm = llm or self.config.LLM_MODEL
+        self.endpoint = self.config.LLM_API_ENDPOINT
+        self.api_key = self.config.LLM_API_KEY
+
+        # 设置参数
+        self.temperature = kwargs.get('temperature', self.config.DEFAULT_TEMPERATURE)
+        self.max_retries = kwargs.get('max_retries', self.config.MAX_RETRIES)
+        self.timeout = kwargs.get('timeout', self.config.LLM_REQUEST_TIMEOUT)
+
+        # 与同步客户端共享的AIMD并发限制（非流式调用），未启用时为None
+        self.concurrency = get_llm_concurrency_limiter()
+
+    @classmethod
+    def _get_http_client(cls) -> httpx.AsyncClient:
+        """获取当前事件循环共享的AsyncClient"""
+        loop = asyncio.get_running_loop()
+        client = cls._shared_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=Config.LLM_ASYNC_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.LLM_HTTP_POOL_SIZE if Config.LLM_HTTP_KEEPALIVE else 0
+                )
+            )
+            cls._shared_clients[loop] = client
+        return client
+
+    @classmethod
+    async def aclose_shared(cls):
+        """关闭当前事件循环的共享AsyncClient（服务退出时调用）"""
+        loop = asyncio.get_running_loop()
+        client = cls._shared_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    async def _make_api_call(self, prompt: str, model: str, temperature: float, max_retries: int, timeout: float) -> str:
+        """使用自定义API端点异步调用"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "stream": False
+        }
+
+        client = self._get_http_client()
+
+        for attempt in range(max_retries):
+            try:
+                # 只在HTTP请求期间占用并发名额，重试等待前已归还
+                async with limit_slot_async(self.concurrency) as slot:
+                    try:
+                        response = await client.post(
+                            f"{self.endpoint}/chat/completions",
+                            headers=headers,
+                            json=data,
+                            timeout=timeout
+                        )
+                    except httpx.TimeoutException:
+                        slot.mark(OVERLOAD)
+                        raise
+                    if is_overload_status(response.status_code):
+                        slot.mark(OVERLOAD)
+                response.raise_for_status()
+
+                result = response.json()
+                return LLMClient._extract_content(result)
+
+            except httpx.TimeoutException:
+                if attempt < max_retries - 1:
+                    wait_time = 2 ** attempt
+                    print(f"API超时，{wait_time}秒后重试... (尝试 {attempt + 1}/{max_retries})")
+                    await asyncio.sleep(wait_time)
+                    continue
+                else:
+                    raise Exception(f"API调用超时，已重试{max_retries}次")
+
+            except (httpx.HTTPError, ValueError) as e:
+                if attempt < max_retries - 1:
+                    wait_time = 2 ** attempt
+                    print(f"API调用失败: {e}，{wait_time}秒后重试... (尝试 {attempt + 1}/{max_retries})")
+                    await asyncio.sleep(wait_time)
+                    continue
+                else:
+                    raise Exception(f"API调用失败: {e}")
+
+    async def get_response(self, prompt: str, use_reasoning_model: bool = False, **kwargs) -> str:
+        """异步获取LLM响应
+
+        Args:
+            prompt: 提示词
+            use_reasoning_model: 是否使用推理模型，如果为True则使用Config.LLM_REASONING_MODEL
+            **kwargs: 其他参数（temperature, max_retries, timeout等）
+        """
+        # 参数按调用传递而不是临时修改实例属性，同一实例可被并发调用
+        model = self.config.LLM_REASONING_MODEL if use_reasoning_model else self.llm
+        return await self._make_api_call(
+            prompt,
+            model=model,
+            temperature=kwargs.get('temperature', self.temperature),
+            max_retries=kwargs.get('max_retries', self.max_retries),
+            timeout=kwargs.get('timeout', self.timeout)
+        )
+
+    async def stream_response(self, prompt: str, use_reasoning_model: bool = False, **kwargs) -> AsyncIterator[str]:
+        """异步流式获取LLM响应，逐段产出上游返回的增量文本
+
+        仅在收到第一段内容之前重试；开始输出后出错直接抛出异常，避免重复输出。
+
+        Args:
+            prompt: 提示词
+            use_reasoning_model: 是否使用推理模型，如果为True则使用Config.LLM_REASONING_MODEL
+            **kwargs: 其他参数（temperature, max_retries, timeout等），timeout为两段数据之间的最长等待时间
+        """
+        model = self.config.LLM_REASONING_MODEL if use_reasoning_model else self.llm
+        max_retries = kwargs.get('max_retries', self.max_retries)
+        timeout = kwargs.get('timeout', self.timeout)
+
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": kwargs.get('temperature', self.temperature),
+            "stream": True
+        }
+
+        client = self._get_http_client()
+
+        for attempt in range(max_retries):
+            started = False
+            try:
+                async with client.stream(
+                    "POST",
+                    f"{self.endpoint}/chat/completions",
+                    headers=headers,
+                    json=data,
+                    timeout=timeout
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        done, content = LLMClient._parse_stream_line(line)
+                        if done:
+                            break
+                        if content:
+                            started = True
+                            yield content
+                if not started:
+                    raise Exception("流式API未返回任何内容")
+                return
+
+            except httpx.TimeoutException:
+                if not started and attempt < max_retries - 1:
+                    wait_time = 2 ** attempt
+                    print(f"流式API超时，{wait_time}秒后重试... (尝试 {attempt + 1}/{max_retries})")
+                    await asyncio.sleep(wait_time)
+                    continue
+                raise Exception(f"流式API调用超时，已重试{attempt + 1}次")
+
+            except httpx.HTTPError as e:
+                if not started and attempt < max_retries - 1:
+                    wait_time = 2 ** attempt
+                    print(f"流式API调用失败: {e}，{wait_time}秒后重试... (尝试 {attempt + 1}/{max_retries})")
+                    await asyncio.sleep(wait_time)
+                    continue
+                raise Exception(f"流式API调用失败: {e}")
+
+    def get_config_info(self) -> dict:
+        """获取配置信息"""
+        return {
+            "model": self.llm,
+            "endpoint": self.endpoint,
+            "temperature": self.temperature,
+            "max_retries": self.max_retries,
+            "timeout": self.timeout
+        }
+
+
+async def get_response_async(llm_client: LLMClient, async_llm_client: Optional[AsyncLLMClient], prompt: str, **kwargs) -> str:
+    """优先使用异步客户端获取响应，未配置异步客户端时在线程中执行同步调用"""
+    if async_llm_client is not None:
+        return await async_llm_client.get_response(prompt=prompt, **kwargs)
+    return await asyncio.to_thread(llm_client.get_response, prompt=prompt, **kwargs)
+
+
+async def stream_response_async(llm_client: LLMClient, async_llm_client: Optional[AsyncLLMClient], prompt: str, **kwargs) -> AsyncIterator[str]:
+    """优先使用异步客户端流式获取响应，未配置异步客户端时在线程中逐段读取同步流"""
+    if async_llm_client is not None:
+        async for content in async_llm_client.stream_response(prompt=prompt, **kwargs):
+            yield content
+        return
+
+    iterator = llm_client.stream_response(prompt=prompt, **kwargs)
+    sentinel = object()
+    while True:
+        content = await asyncio.to_thread(next, iterator, sentinel)
+        if content is sentinel:
+            break
+        yield content
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+OpenAlex结果解析微基准
+对比JSON解析（标准库json / orjson，完整字段 / select投影）和摘要还原（位置字典+排序 / 预分配数组）的耗时
+
+用法:
+    python benchmarks/bench_openalex_decode.py [--fixture PATH] [--repeat N]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from retriever import PaperRetriever, decode_abstract_inverted_index, orjson  # noqa: E402
+
+
+DEFAULT_FIXTURE = Path(__file__).resolve().parent / "fixtures" / "openalex_works_page.json"
+
+
+def decode_with_sort(inverted_index: dict) -> str:
+    """原实现：构建位置字典后排序"""
+    pos_to_word = {}
+    for word, positions in inverted_index.items():
+        for pos in positions:
+            pos_to_word[pos] = word
+    if not pos_to_word:
+        return ''
+    return ' '.join([pos_to_word[pos] for pos in sorted(pos_to_word.keys())])
+
+
+def bench(name: str, func, repeat: int) -> float:
+    """运行func共repeat次，输出并返回每次的平均耗时（毫秒）"""
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {name:<28} {elapsed:8.3f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAlex结果解析微基准")
+    parser.add_argument("--fixture", default=str(DEFAULT_FIXTURE), help="OpenAlex /works 响应的JSON文件")
+    parser.add_argument("--repeat", type=int, default=50, help="每项重复次数")
+    args = parser.parse_args()
+
+    content = Path(args.fixture).read_bytes()
+    works = json.loads(content)["results"]
+    indexes = [work["abstract_inverted_index"] for work in works if work.get("abstract_inverted_index")]
+    print(f"📄 {os.path.basename(args.fixture)}: {len(content) / 1024:.1f} KB, {len(works)} 篇, {len(indexes)} 个摘要")
+
+    # 两种实现的结果必须一致
+    for inverted_index in indexes:
+        assert decode_abstract_inverted_index(inverted_index) == decode_with_sort(inverted_index)
+
+    print("JSON解析（整页）:")
+    json_ms = bench("json.loads", lambda: json.loads(content), args.repeat)
+    if orjson is not None:
+        orjson_ms = bench("orjson.loads", lambda: orjson.loads(content), args.repeat)
+        print(f"  加速: {json_ms / orjson_ms:.1f}x")
+    else:
+        print("  未安装orjson，跳过")
+
+    # 模拟select投影后的响应：只保留默认投影的字段
+    selected = PaperRetriever.OPENALEX_SELECT.split(",")
+    projected = json.dumps({"results": [{key: work.get(key) for key in selected} for work in works]}).encode("utf-8")
+    print(f"select投影: {len(content) / 1024:.1f} KB -> {len(projected) / 1024:.1f} KB")
+    full_ms = bench("json.loads (full)", lambda: json.loads(content), args.repeat)
+    projected_ms = bench("json.loads (select)", lambda: json.loads(projected), args.repeat)
+    print(f"  加速: {full_ms / projected_ms:.1f}x")
+
+    print("摘要还原（整页）:")
+    sort_ms = bench("dict + sort", lambda: [decode_with_sort(index) for index in indexes], args.repeat)
+    array_ms = bench("preallocated array", lambda: [decode_abstract_inverted_index(index) for index in indexes], args.repeat)
+    print(f"  加速: {sort_ms / array_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+BM25词法打分与倒数排名融合（RRF）- 纯CPU、无需网络的候选论文排序
+"""
+import re
+from collections import Counter
+from typing import List, Optional, Sequence
+import numpy as np
+
+
+# 英文单词/数字按词切分，中日韩文字按单字切分
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or that the this to was were with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """将文本切分为小写词元（去除常见英文停用词）"""
+    return [token for token in _TOKEN_PATTERN.findall((text or "").lower()) if token not in _STOPWORDS]
+
+
+def bm25_scores(query_tokens: Sequence[str], documents: Sequence[Sequence[str]], k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """计算每篇文档对查询的BM25得分
+
+    只统计查询词在各文档中的词频，得到 (文档数, 查询词数) 的矩阵，
+    IDF、长度归一化和求和都以矩阵运算完成。
+
+    Args:
+        query_tokens: 查询词元（重复的词元只计一次）
+        documents: 每篇文档的词元列表
+        k1: 词频饱和参数
+        b: 文档长度归一化参数
+
+    Returns:
+        float32得分数组，长度与documents相同
+    """
+    n = len(documents)
+    terms = list(dict.fromkeys(query_tokens))
+    if n == 0 or not terms:
+        return np.zeros(n, dtype=np.float32)
+
+    tf = np.empty((n, len(terms)), dtype=np.float32)
+    lengths = np.empty(n, dtype=np.float32)
+    for row, tokens in enumerate(documents):
+        counts = Counter(tokens)
+        tf[row] = [counts.get(term, 0) for term in terms]
+        lengths[row] = len(tokens)
+
+    df = np.count_nonzero(tf, axis=0).astype(np.float32)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    avg_length = max(float(lengths.mean()), 1.0)
+    norm = k1 * (1.0 - b + b * lengths / avg_length)
+    return ((tf * (k1 + 1.0)) / (tf + norm[:, None])) @ idf
+
+
+def reciprocal_rank_fusion(score_lists: Sequence[Optional[np.ndarray]], k: int = 60) -> np.ndarray:
+    """倒数排名融合：每个得分数组先转换为名次，融合得分为 sum(1 / (k + 名次))
+
+    名次从1开始，得分相同时按原顺序排名；为None的得分数组被忽略。
+    """
+    score_lists = [np.asarray(scores) for scores in score_lists if scores is not None]
+    if not score_lists:
+        return np.zeros(0, dtype=np.float32)
+
+    fused = np.zeros(score_lists[0].shape[0], dtype=np.float32)
+    for scores in score_lists:
+        order = np.argsort(-scores, kind="stable")
+        ranks = np.empty_like(order)
+        ranks[order] = np.arange(1, order.shape[0] + 1)
+        fused += 1.0 / (k + ranks)
+    return fused
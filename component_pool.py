@@ -0,0 +1,144 @@
+"""
+组件池 - 进程级共享的LLM/Embedding客户端和论文检索器，在服务启动时创建一次
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+from config import Config
+from llm_client import LLMClient
+from async_llm_client import AsyncLLMClient
+from embedding_client import EmbeddingClient
+from retriever import PaperRetriever
+
+
+class ComponentPool:
+    """共享组件池
+
+    组件均为无请求状态（或内部线程安全），可被并发请求复用：
+    - llm_client / async_llm_client: 每次调用按参数传递模型与超时，不修改实例属性
+    - embedding_client: 由检索器与请求共用同一个实例（同一个缓存和连接）
+    - retriever: 持有共享的embedding_client
+
+    状态：
+    - uninitialized: 尚未初始化
+    - ready: 全部组件可用
+    - degraded: 必需组件可用，可选组件（Embedding）初始化失败
+    - failed: 配置无效或必需组件初始化失败
+    """
+
+    def __init__(self):
+        self.config = Config
+        self.state = "uninitialized"
+        self.errors: Dict[str, str] = {}
+        self.initialized_at: Optional[float] = None
+        self.llm_client: Optional[LLMClient] = None
+        self.async_llm_client: Optional[AsyncLLMClient] = None
+        self.embedding_client: Optional[EmbeddingClient] = None
+        self.retriever: Optional[PaperRetriever] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_usable(self) -> bool:
+        """必需组件是否可用"""
+        return self.state in ("ready", "degraded")
+
+    def initialize(self, force: bool = False):
+        """创建全部组件（同步执行，启动时在线程中调用）
+
+        Args:
+            force: 已初始化时是否重新创建
+        """
+        with self._lock:
+            if self.state != "uninitialized" and not force:
+                return
+            self._initialize_locked()
+
+    def recover(self):
+        """初始化失败时重新创建全部组件（同步执行，在线程中调用）
+
+        并发请求可能同时发现失败状态，获得锁后再检查一次：已被其他请求恢复时直接返回，
+        避免重复重建时把正在被使用的组件置为None。
+        """
+        with self._lock:
+            if self.state != "failed":
+                return
+            self._initialize_locked()
+
+    def _initialize_locked(self):
+        """创建全部组件（调用方需持有锁）"""
+        self.errors = {}
+        self.llm_client = None
+        self.async_llm_client = None
+        self.embedding_client = None
+        self.retriever = None
+
+        # 验证配置
+        try:
+            if not self.config.validate_config():
+                # 空字符串表示验证未通过（无异常信息）
+                self.errors["config"] = ""
+                self.state = "failed"
+                return
+        except Exception as e:
+            self.errors["config"] = str(e)
+            self.state = "failed"
+            return
+
+        # LLM客户端（必需）
+        try:
+            self.llm_client = LLMClient()
+            self.async_llm_client = AsyncLLMClient()
+        except Exception as e:
+            self.errors["llm"] = str(e)
+            self.state = "failed"
+            return
+
+        # Embedding客户端（可选，失败时跳过语义重排序）
+        try:
+            self.embedding_client = EmbeddingClient()
+        except Exception as e:
+            print(f"⚠️  Embedding客户端初始化失败: {e}，将跳过语义重排序")
+            self.errors["embedding"] = str(e)
+            self.embedding_client = None
+
+        # 论文检索器（必需），与请求共用同一个embedding客户端
+        try:
+            self.retriever = PaperRetriever(embedding_client=self.embedding_client, init_embedding=False)
+        except Exception as e:
+            self.errors["retriever"] = str(e)
+            self.state = "failed"
+            return
+
+        self.state = "degraded" if self.errors else "ready"
+        self.initialized_at = time.time()
+        print(f"✓ 组件池初始化完成，状态: {self.state}")
+
+    async def ensure_initialized(self):
+        """确保组件池已初始化（未经lifespan启动时在首个请求中初始化）"""
+        if self.state == "uninitialized":
+            await asyncio.to_thread(self.initialize)
+
+    def readiness(self) -> dict:
+        """获取就绪状态"""
+        return {
+            "state": self.state,
+            "ready": self.is_usable,
+            "initialized_at": self.initialized_at,
+            "components": {
+                "llm_client": self.llm_client is not None,
+                "async_llm_client": self.async_llm_client is not None,
+                "embedding_client": self.embedding_client is not None,
+                "retriever": self.retriever is not None
+            },
+            "errors": dict(self.errors)
+        }
+
+
+# 进程级单例
+_pool = ComponentPool()
+
+
+def get_component_pool() -> ComponentPool:
+    """获取进程级共享组件池"""
+    return _pool
@@ -0,0 +1,282 @@
+"""
+自适应并发限制 - AIMD（加性增、乘性减）控制进程内同时进行的LLM调用数
+同步（线程）与异步（协程）调用共用同一个限制；并发名额按请求公平分配
+"""
+import time
+import uuid
+import asyncio
+import threading
+import contextvars
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import Dict, List, Optional
+from config import Config
+
+
+# 调用结果
+SUCCESS = "success"    # 成功，延迟正常时增加并发限制
+OVERLOAD = "overload"  # 上游过载（超时、429、5xx），乘性减小并发限制
+ERROR = "error"        # 其他错误，不调整并发限制
+
+# 当前请求的标识，用于按请求公平分配并发名额（asyncio任务和to_thread会自动继承）
+_request_owner: contextvars.ContextVar = contextvars.ContextVar("llm_request_owner", default=None)
+
+
+def start_request_scope(owner: Optional[str] = None) -> str:
+    """将当前上下文标记为一个新的请求，之后发起的LLM调用都计入该请求的并发份额"""
+    owner = owner or uuid.uuid4().hex
+    _request_owner.set(owner)
+    return owner
+
+
+def current_request_owner() -> str:
+    """当前上下文所属的请求，未标记时为 default"""
+    return _request_owner.get() or "default"
+
+
+class _Waiter:
+    """排队等待并发名额的调用"""
+
+    def __init__(self, owner: str, seq: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.owner = owner
+        self.seq = seq
+        self.loop = loop
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+
+class _Slot:
+    """一个已获得的并发名额；调用方可用 mark() 标记调用结果"""
+
+    def __init__(self, owner: str):
+        self.owner = owner
+        self.outcome: Optional[str] = None
+        self.started_at = time.monotonic()
+
+    def mark(self, outcome: str):
+        self.outcome = outcome
+
+
+class AIMDLimiter:
+    """AIMD并发限制器（线程安全，同步与异步调用共用）
+
+    - 并发限制 limit 在 [min_limit, max_limit] 之间，进行中的调用数不超过 int(limit)
+    - 名额用满时，每次成功且延迟不超过 latency_target 的调用使 limit 增加 1/limit（约每轮增加1）
+    - 过载（超时、429、5xx）时 limit 乘以 backoff，cooldown 秒内最多减小一次，避免同一批失败连续减半
+    - 有空余名额时优先分配给进行中调用最少的请求，同一请求内按到达顺序
+    """
+
+    def __init__(self, name: str, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 backoff: float = 0.5, latency_target: float = 0.0, cooldown: float = 5.0):
+        """
+        Args:
+            name: 名称（用于日志和统计）
+            initial_limit: 初始并发限制
+            min_limit: 最小并发限制
+            max_limit: 最大并发限制
+            backoff: 过载时并发限制的缩小倍数
+            latency_target: 延迟目标（秒），超过时不增加并发限制；0表示不考虑延迟
+            cooldown: 两次缩小之间的最短间隔（秒）
+        """
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial_limit)))
+        self.backoff = backoff
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._owners: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = 0
+        self._last_decrease = 0.0
+        self._stats = {"success": 0, "overload": 0, "error": 0, "decreases": 0, "queued": 0}
+        self._total_queue_wait = 0.0
+        self._max_limit_seen = self.limit
+
+    def acquire(self, owner: Optional[str] = None) -> _Slot:
+        """获取一个并发名额（同步，必要时阻塞等待）"""
+        owner = owner or current_request_owner()
+        with self._lock:
+            waiter = self._enqueue(owner, None)
+        if waiter is None:
+            return _Slot(owner)
+        waiter.event.wait()
+        return _Slot(owner)
+
+    async def acquire_async(self, owner: Optional[str] = None) -> _Slot:
+        """获取一个并发名额（异步，等待时不占用线程）"""
+        owner = owner or current_request_owner()
+        with self._lock:
+            waiter = self._enqueue(owner, asyncio.get_running_loop())
+        if waiter is None:
+            return _Slot(owner)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    # 已分配名额但调用方被取消，归还名额
+                    self._release_locked(owner, ERROR, None)
+                else:
+                    self._waiters.remove(waiter)
+            raise
+        return _Slot(owner)
+
+    def release(self, slot: _Slot, outcome: Optional[str] = None):
+        """归还名额并按调用结果调整并发限制"""
+        outcome = outcome or slot.outcome or SUCCESS
+        with self._lock:
+            self._release_locked(slot.owner, outcome, time.monotonic() - slot.started_at)
+
+    @contextmanager
+    def slot(self, owner: Optional[str] = None):
+        """同步上下文管理器：进入时获取名额，退出时归还（抛出异常且未标记时记为ERROR）"""
+        slot = self.acquire(owner)
+        try:
+            yield slot
+        except BaseException:
+            self.release(slot, slot.outcome or ERROR)
+            raise
+        self.release(slot)
+
+    @asynccontextmanager
+    async def slot_async(self, owner: Optional[str] = None):
+        """异步上下文管理器：进入时获取名额，退出时归还（抛出异常且未标记时记为ERROR）"""
+        slot = await self.acquire_async(owner)
+        try:
+            yield slot
+        except BaseException:
+            self.release(slot, slot.outcome or ERROR)
+            raise
+        self.release(slot)
+
+    def get_stats(self) -> dict:
+        """获取并发限制统计"""
+        with self._lock:
+            queued = self._stats["queued"]
+            return dict(
+                self._stats,
+                name=self.name,
+                limit=round(self.limit, 2),
+                max_limit_seen=round(self._max_limit_seen, 2),
+                in_flight=self._in_flight,
+                waiting=len(self._waiters),
+                active_requests=len(self._owners),
+                avg_queue_wait_seconds=round(self._total_queue_wait / queued, 3) if queued else 0.0
+            )
+
+    def _enqueue(self, owner: str, loop: Optional[asyncio.AbstractEventLoop]) -> Optional[_Waiter]:
+        """有空余名额且无人排队时直接分配并返回None，否则排队（调用方需持有锁）"""
+        if not self._waiters and self._in_flight < int(self.limit):
+            self._take(owner)
+            return None
+        self._seq += 1
+        waiter = _Waiter(owner, self._seq, loop)
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        self._dispatch()
+        return waiter
+
+    def _take(self, owner: str):
+        self._in_flight += 1
+        self._owners[owner] = self._owners.get(owner, 0) + 1
+
+    def _dispatch(self):
+        """把空余名额分配给进行中调用最少的请求（调用方需持有锁）"""
+        while self._waiters and self._in_flight < int(self.limit):
+            waiter = min(self._waiters, key=lambda item: (self._owners.get(item.owner, 0), item.seq))
+            self._waiters.remove(waiter)
+            self._take(waiter.owner)
+            waiter.granted = True
+            self._total_queue_wait += time.monotonic() - waiter.enqueued_at
+            if waiter.loop is None:
+                waiter.event.set()
+            else:
+                waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+    def _release_locked(self, owner: str, outcome: str, latency: Optional[float]):
+        """归还名额、调整并发限制并唤醒等待者（调用方需持有锁）"""
+        saturated = self._in_flight >= int(self.limit)
+        self._in_flight -= 1
+        count = self._owners.get(owner, 0) - 1
+        if count > 0:
+            self._owners[owner] = count
+        else:
+            self._owners.pop(owner, None)
+
+        self._stats[outcome] += 1
+        if outcome == OVERLOAD:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+                self._stats["decreases"] += 1
+                print(f"⚠️  {self.name}上游过载，并发限制降为{int(self.limit)}")
+        elif outcome == SUCCESS and saturated:
+            # 名额用满时才增加，空闲时不会无限增长
+            if self.latency_target <= 0 or (latency is not None and latency <= self.latency_target):
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+                self._max_limit_seen = max(self._max_limit_seen, self.limit)
+        self._dispatch()
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+# 进程内共享的并发限制器，按名称区分
+_limiters: Dict[str, AIMDLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(name: str, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64,
+                            backoff: float = 0.5, latency_target: float = 0.0) -> AIMDLimiter:
+    """获取指定名称的共享并发限制器，首次调用时按参数创建"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = AIMDLimiter(name, initial_limit, min_limit, max_limit, backoff, latency_target)
+            _limiters[name] = limiter
+        return limiter
+
+
+def get_llm_concurrency_limiter() -> Optional[AIMDLimiter]:
+    """获取LLM调用共享的并发限制器，未启用时返回None"""
+    if not Config.LLM_CONCURRENCY_ENABLED:
+        return None
+    return get_concurrency_limiter(
+        "llm",
+        initial_limit=Config.LLM_CONCURRENCY_INITIAL,
+        min_limit=Config.LLM_CONCURRENCY_MIN,
+        max_limit=Config.LLM_CONCURRENCY_MAX,
+        backoff=Config.LLM_CONCURRENCY_BACKOFF,
+        latency_target=Config.LLM_CONCURRENCY_LATENCY_TARGET
+    )
+
+
+def is_overload_status(status_code: int) -> bool:
+    """429和5xx表示上游过载"""
+    return status_code == 429 or status_code >= 500
+
+
+def limit_slot(limiter: Optional[AIMDLimiter]):
+    """同步调用的并发名额上下文，limiter为None时不限制"""
+    return limiter.slot() if limiter is not None else nullcontext(_Slot(current_request_owner()))
+
+
+def limit_slot_async(limiter: Optional[AIMDLimiter]):
+    """异步调用的并发名额上下文，limiter为None时不限制"""
+    return limiter.slot_async() if limiter is not None else nullcontext(_Slot(current_request_owner()))
+
+
+def get_all_concurrency_limiter_stats() -> Dict[str, dict]:
+    """获取所有共享并发限制器的统计"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.get_stats() for limiter in limiters}
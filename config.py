@@ -40,6 +40,24 @@ class Config(metaclass=ConfigMeta):
             return reasoning_model
         elif name == "LLM_REQUEST_TIMEOUT":
             return int(cls._get_env("LLM_REQUEST_TIMEOUT", "120"))
+        elif name == "LLM_HTTP_POOL_SIZE":
+            return int(cls._get_env("LLM_HTTP_POOL_SIZE", "20"))  # 每个主机的最大连接数
+        elif name == "LLM_HTTP_KEEPALIVE":
+            return cls._get_env("LLM_HTTP_KEEPALIVE", "True").lower() == "true"
+        elif name == "LLM_ASYNC_MAX_CONNECTIONS":
+            return int(cls._get_env("LLM_ASYNC_MAX_CONNECTIONS", "500"))  # 异步客户端最大并发连接数
+        elif name == "LLM_CONCURRENCY_ENABLED":
+            return cls._get_env("LLM_CONCURRENCY_ENABLED", "True").lower() == "true"  # 是否启用AIMD自适应并发限制
+        elif name == "LLM_CONCURRENCY_INITIAL":
+            return int(cls._get_env("LLM_CONCURRENCY_INITIAL", "8"))  # 初始并发限制
+        elif name == "LLM_CONCURRENCY_MIN":
+            return int(cls._get_env("LLM_CONCURRENCY_MIN", "2"))  # 最小并发限制
+        elif name == "LLM_CONCURRENCY_MAX":
+            return int(cls._get_env("LLM_CONCURRENCY_MAX", "64"))  # 最大并发限制
+        elif name == "LLM_CONCURRENCY_BACKOFF":
+            return float(cls._get_env("LLM_CONCURRENCY_BACKOFF", "0.5"))  # 过载时并发限制的缩小倍数
+        elif name == "LLM_CONCURRENCY_LATENCY_TARGET":
+            return float(cls._get_env("LLM_CONCURRENCY_LATENCY_TARGET", "0"))  # 延迟目标（秒），超过时不再增加并发；0表示不考虑延迟
         
         # 应用配置
         elif name == "APP_ENV":
@@ -58,10 +76,68 @@ class Config(metaclass=ConfigMeta):
             return int(cls._get_env("MAX_PAPERS_PER_QUERY", "5"))
         elif name == "MAX_TOTAL_PAPERS":
             return int(cls._get_env("MAX_TOTAL_PAPERS", "15"))  # 文献综述需要更多论文
+        elif name == "RETRIEVAL_CANDIDATE_DEPTH":
+            return int(cls._get_env("RETRIEVAL_CANDIDATE_DEPTH", "0"))  # 最新/高引用检索分页读取的候选数，0表示不分页
+        elif name == "RETRIEVAL_EARLY_STOP_SIMILARITY":
+            return float(cls._get_env("RETRIEVAL_EARLY_STOP_SIMILARITY", "0.5"))  # 高相似度候选的阈值
+        elif name == "RETRIEVAL_EARLY_STOP_COUNT":
+            return int(cls._get_env("RETRIEVAL_EARLY_STOP_COUNT", "15"))  # 高相似度候选达到该数量时停止翻页
+        elif name == "RETRIEVAL_DEEP_TIME_BUDGET":
+            return float(cls._get_env("RETRIEVAL_DEEP_TIME_BUDGET", "30"))  # 分页读取的总耗时上限（秒）
+        elif name == "RERANK_BM25_ENABLED":
+            return cls._get_env("RERANK_BM25_ENABLED", "True").lower() == "true"  # BM25与向量相似度融合排序，Embedding不可用时单独使用
+        elif name == "RERANK_RRF_K":
+            return int(cls._get_env("RERANK_RRF_K", "60"))  # 倒数排名融合的平滑常数
+        elif name == "DEDUP_NEAR_DUPLICATES":
+            return cls._get_env("DEDUP_NEAR_DUPLICATES", "True").lower() == "true"  # 用MinHash/LSH合并近似重复的论文
+        elif name == "DEDUP_SIMILARITY_THRESHOLD":
+            return float(cls._get_env("DEDUP_SIMILARITY_THRESHOLD", "0.6"))  # 标题+摘要的估计Jaccard相似度阈值
         elif name == "SEMANTIC_SCHOLAR_TIMEOUT":
             return int(cls._get_env("SEMANTIC_SCHOLAR_TIMEOUT", "30"))
         elif name == "SEMANTIC_SCHOLAR_MAX_RETRIES":
             return int(cls._get_env("SEMANTIC_SCHOLAR_MAX_RETRIES", "2"))
+        elif name == "OPENALEX_RICH_FIELDS":
+            return cls._get_env("OPENALEX_RICH_FIELDS", "False").lower() == "true"  # OpenAlex额外返回DOI
+        elif name == "RETRIEVAL_HEDGE_ENABLED":
+            return cls._get_env("RETRIEVAL_HEDGE_ENABLED", "True").lower() == "true"
+        elif name == "RETRIEVAL_HEDGE_QUANTILE":
+            return float(cls._get_env("RETRIEVAL_HEDGE_QUANTILE", "0.95"))  # 按Semantic Scholar延迟的该分位数决定何时并行请求OpenAlex
+        elif name == "RETRIEVAL_HEDGE_MIN_DELAY":
+            return float(cls._get_env("RETRIEVAL_HEDGE_MIN_DELAY", "1.0"))  # 秒
+        elif name == "RETRIEVAL_HEDGE_MAX_DELAY":
+            return float(cls._get_env("RETRIEVAL_HEDGE_MAX_DELAY", "8.0"))  # 秒，延迟样本不足时使用
+        elif name == "RETRIEVAL_HEDGE_GRACE_MS":
+            return int(cls._get_env("RETRIEVAL_HEDGE_GRACE_MS", "300"))  # 两个后端在该时间内先后返回时合并结果
+        elif name == "RETRIEVAL_HEDGE_DEADLINE":
+            return float(cls._get_env("RETRIEVAL_HEDGE_DEADLINE", "30"))  # 秒，单次对冲检索的总时限，0表示不限制
+        elif name == "RETRIEVAL_CACHE_ENABLED":
+            return cls._get_env("RETRIEVAL_CACHE_ENABLED", "True").lower() == "true"
+        elif name == "RETRIEVAL_CACHE_TTL":
+            return int(cls._get_env("RETRIEVAL_CACHE_TTL", "86400"))  # 检索结果有效期（秒）
+        elif name == "RETRIEVAL_CACHE_NEGATIVE_TTL":
+            return int(cls._get_env("RETRIEVAL_CACHE_NEGATIVE_TTL", "60"))  # 失败结果的负缓存时间（秒）
+        elif name == "RETRIEVAL_CACHE_MAX_ENTRIES":
+            return int(cls._get_env("RETRIEVAL_CACHE_MAX_ENTRIES", "2000"))
+        elif name == "RETRIEVAL_CACHE_PATH":
+            return cls._get_env("RETRIEVAL_CACHE_PATH", ".cache/retrieval.sqlite3")  # 留空则只使用内存缓存
+        elif name == "PAPER_STORE_MODE":
+            return cls._get_env("PAPER_STORE_MODE", "local_first").lower()  # local_first / write / off
+        elif name == "PAPER_STORE_PATH":
+            return cls._get_env("PAPER_STORE_PATH", ".cache/papers.sqlite3")
+        elif name == "PAPER_STORE_MIN_RESULTS":
+            return int(cls._get_env("PAPER_STORE_MIN_RESULTS", "5"))  # 本地命中数不低于该值时不再请求远程API
+        elif name == "PAPER_STORE_MIN_KEYWORD_MATCHES":
+            return int(cls._get_env("PAPER_STORE_MIN_KEYWORD_MATCHES", "2"))  # 本地论文至少包含的关键词短语数才计入命中
+        elif name == "PAPER_STORE_NEWEST_MAX_AGE":
+            return int(cls._get_env("PAPER_STORE_NEWEST_MAX_AGE", "86400"))  # 最新论文只使用该时间（秒）内更新过的本地论文，0表示总是请求远程API
+        elif name == "SEMANTIC_SCHOLAR_RATE_LIMIT":
+            return float(cls._get_env("SEMANTIC_SCHOLAR_RATE_LIMIT", "1.0"))  # 每秒请求数
+        elif name == "SEMANTIC_SCHOLAR_BURST":
+            return int(cls._get_env("SEMANTIC_SCHOLAR_BURST", "3"))  # 允许的突发请求数
+        elif name == "SEMANTIC_SCHOLAR_MAX_WAIT":
+            return float(cls._get_env("SEMANTIC_SCHOLAR_MAX_WAIT", "10"))  # 等待令牌的最长时间（秒），超过则使用OpenAlex
+        elif name == "SEMANTIC_SCHOLAR_RATE_LIMIT_PATH":
+            return cls._get_env("SEMANTIC_SCHOLAR_RATE_LIMIT_PATH", "")  # 设置SQLite路径后多个进程共享限流状态
         
         # Embedding配置
         elif name == "EMBEDDING_MODEL_NAME":
@@ -72,6 +148,46 @@ class Config(metaclass=ConfigMeta):
             return cls._get_env_with_fallback("SCI_EMBEDDING_API_KEY", "EMBEDDING_API_KEY")
         elif name == "EMBEDDING_DEVICE":
             return cls._get_env("EMBEDDING_DEVICE", "cpu")
+        elif name == "EMBEDDING_BATCH_SIZE":
+            return int(cls._get_env("EMBEDDING_BATCH_SIZE", "32"))  # 单次请求的文本数
+        elif name == "EMBEDDING_CACHE_ENABLED":
+            return cls._get_env("EMBEDDING_CACHE_ENABLED", "True").lower() == "true"
+        elif name == "EMBEDDING_CACHE_MEMORY_SIZE":
+            return int(cls._get_env("EMBEDDING_CACHE_MEMORY_SIZE", "10000"))  # 内存LRU条目数
+        elif name == "EMBEDDING_CACHE_PATH":
+            return cls._get_env("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")  # 留空则禁用磁盘缓存
+        elif name == "EMBEDDING_CACHE_MAX_DISK_ENTRIES":
+            return int(cls._get_env("EMBEDDING_CACHE_MAX_DISK_ENTRIES", "200000"))
+        
+        # SSE输出配置
+        elif name == "SSE_CHUNK_BYTES":
+            return int(cls._get_env("SSE_CHUNK_BYTES", "512"))  # 单个SSE帧的内容字节预算
+        elif name == "SSE_FLUSH_INTERVAL_MS":
+            return int(cls._get_env("SSE_FLUSH_INTERVAL_MS", "50"))  # 流式增量的最长缓冲时间
+        
+        # 综述结果缓存配置
+        elif name == "REVIEW_CACHE_ENABLED":
+            return cls._get_env("REVIEW_CACHE_ENABLED", "True").lower() == "true"
+        elif name == "REVIEW_CACHE_TTL":
+            return int(cls._get_env("REVIEW_CACHE_TTL", "86400"))  # 24小时
+        elif name == "REVIEW_CACHE_DEGRADED_TTL":
+            return int(cls._get_env("REVIEW_CACHE_DEGRADED_TTL", "600"))  # 部分阶段降级时生成的综述的有效期（秒）
+        elif name == "REVIEW_CACHE_MAX_ENTRIES":
+            return int(cls._get_env("REVIEW_CACHE_MAX_ENTRIES", "500"))
+        elif name == "REVIEW_CACHE_SIMILARITY_THRESHOLD":
+            return float(cls._get_env("REVIEW_CACHE_SIMILARITY_THRESHOLD", "0.92"))  # 查询向量余弦相似度阈值
+        elif name == "REVIEW_CACHE_PATH":
+            return cls._get_env("REVIEW_CACHE_PATH", ".cache/reviews.sqlite3")  # 留空则仅使用内存缓存
+        
+        # 论文总结缓存配置
+        elif name == "SUMMARY_CACHE_ENABLED":
+            return cls._get_env("SUMMARY_CACHE_ENABLED", "True").lower() == "true"
+        elif name == "SUMMARY_CACHE_TTL":
+            return int(cls._get_env("SUMMARY_CACHE_TTL", "604800"))  # 7天
+        elif name == "SUMMARY_CACHE_MAX_ENTRIES":
+            return int(cls._get_env("SUMMARY_CACHE_MAX_ENTRIES", "2000"))  # 内存LRU条目数（磁盘层为其10倍）
+        elif name == "SUMMARY_CACHE_PATH":
+            return cls._get_env("SUMMARY_CACHE_PATH", ".cache/summaries.sqlite3")  # 留空则仅使用内存缓存
         
         # 文献综述配置
         elif name == "LITERATURE_REVIEW_TIMEOUT":
@@ -86,8 +202,22 @@ class Config(metaclass=ConfigMeta):
             return int(cls._get_env("PAPER_CLASSIFICATION_TIMEOUT", "120"))  # 2分钟
         elif name == "PAPER_SUMMARY_TIMEOUT":
             return int(cls._get_env("PAPER_SUMMARY_TIMEOUT", "300"))  # 5分钟
+        elif name == "PAPER_SUMMARY_CONCURRENCY":
+            return int(cls._get_env("PAPER_SUMMARY_CONCURRENCY", "5"))  # 单个请求内并行总结的批数（仅在未启用AIMD并发限制时生效）
+        elif name == "PAPER_SUMMARY_BATCH_SIZE":
+            return int(cls._get_env("PAPER_SUMMARY_BATCH_SIZE", "1"))  # 每次推理模型调用总结的论文数，1表示逐篇总结
+        elif name == "PAPER_SUMMARY_BATCH_TOKENS":
+            return int(cls._get_env("PAPER_SUMMARY_BATCH_TOKENS", "6000"))  # 每批论文标题+摘要的估计token预算
         elif name == "TOPIC_CLUSTERING_TIMEOUT":
             return int(cls._get_env("TOPIC_CLUSTERING_TIMEOUT", "120"))  # 2分钟
+        elif name == "TOPIC_CLUSTERING_MODE":
+            return cls._get_env("TOPIC_CLUSTERING_MODE", "local").lower()  # local: 本地向量聚类；llm: 推理模型聚类
+        elif name == "TOPIC_CLUSTERING_MAX_K":
+            return int(cls._get_env("TOPIC_CLUSTERING_MAX_K", "5"))  # 本地聚类的最大主题数（按轮廓系数自动选择）
+        elif name == "TOPIC_CLUSTERING_LABEL_TERMS":
+            return int(cls._get_env("TOPIC_CLUSTERING_LABEL_TERMS", "4"))  # 每个主题的TF-IDF标签词数
+        elif name == "TOPIC_CLUSTERING_LLM_NAMING":
+            return cls._get_env("TOPIC_CLUSTERING_LLM_NAMING", "False").lower() == "true"  # 是否用非推理模型为本地聚类的主题命名
         elif name == "TREND_ANALYSIS_TIMEOUT":
             return int(cls._get_env("TREND_ANALYSIS_TIMEOUT", "120"))  # 2分钟
         elif name == "REVIEW_GENERATION_TIMEOUT":
@@ -0,0 +1,154 @@
+"""
+论文去重 - 规范化标题哈希 + DOI + MinHash/LSH近似重复检测
+同一篇论文来自不同后端（Semantic Scholar / OpenAlex）或预印本与正式版标题略有差异时也能合并
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+|[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+# MinHash使用乘法-移位哈希 h(x) = (a * x + b) >> 32（uint64按2^64回绕），a为奇数
+_NUM_PERM = 64
+_BANDS = 16
+_ROWS = _NUM_PERM // _BANDS
+_rng = np.random.RandomState(20251)
+_A = (_rng.randint(0, 2 ** 62, size=_NUM_PERM, dtype=np.int64).astype(np.uint64) << np.uint64(1)) | np.uint64(1)
+_B = _rng.randint(0, 2 ** 62, size=_NUM_PERM, dtype=np.int64).astype(np.uint64)
+# 组合相邻三个词哈希的乘数
+_C1 = np.uint64(0x9E3779B97F4A7C15)
+_C2 = np.uint64(0xC2B2AE3D27D4EB4F)
+_SHIFT = np.uint64(32)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, x: int, y: int) -> bool:
+        """合并两个集合（保留较小的下标为根），已在同一集合时返回False"""
+        root_x, root_y = self.find(x), self.find(y)
+        if root_x == root_y:
+            return False
+        if root_y < root_x:
+            root_x, root_y = root_y, root_x
+        self.parent[root_y] = root_x
+        return True
+
+
+def normalize_title(title: str) -> str:
+    """规范化标题：NFKC、大小写折叠、去除标点和多余空白"""
+    text = unicodedata.normalize("NFKC", title or "").casefold()
+    return " ".join(_WORD_PATTERN.findall(text))
+
+
+def extract_doi(paper: Dict) -> Optional[str]:
+    """提取规范化的DOI（小写、去除 https://doi.org/ 前缀），没有时返回None"""
+    doi = paper.get('doi') or (paper.get('externalIds') or {}).get('DOI')
+    if not doi or not isinstance(doi, str):
+        return None
+    doi = doi.strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "doi:"):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+    return doi or None
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """计算文本词3-gram集合的MinHash签名，文本为空时返回None"""
+    words = _WORD_PATTERN.findall(unicodedata.normalize("NFKC", text or "").casefold())
+    if not words:
+        return None
+    # 使用内置hash()：进程内稳定，签名只在同一进程内比较
+    hashes = np.fromiter(map(hash, words), dtype=np.int64, count=len(words)).view(np.uint64)
+    if len(hashes) >= 3:
+        # 相邻三个词的哈希组合为一个shingle
+        shingles = np.unique(hashes[:-2] * _C1 ^ hashes[1:-1] * _C2 ^ hashes[2:])
+    else:
+        shingles = np.unique(hashes)
+    return ((_A[:, None] * shingles[None, :] + _B[:, None]) >> _SHIFT).min(axis=1)
+
+
+def deduplicate_papers(papers: List[Dict], threshold: float = 0.6, near_duplicates: bool = True) -> Tuple[List[Dict], Dict[str, int]]:
+    """合并重复论文
+
+    依次按paperId、规范化标题、DOI、MinHash/LSH（标题+摘要，估计Jaccard相似度不低于threshold）
+    找出重复论文，用并查集合并为一组。每组保留最先出现的论文，并用组内其他论文补全缺失字段。
+
+    Args:
+        papers: 论文列表（顺序代表优先级）
+        threshold: MinHash估计的Jaccard相似度阈值
+        near_duplicates: 是否做MinHash近似重复检测
+
+    Returns:
+        (去重后的论文列表, 报告)，报告包含输入数、输出数、合并数及各方法合并的数量
+    """
+    n = len(papers)
+    union_find = _UnionFind(n)
+    report = {"input": n, "output": n, "collapsed": 0, "by_id": 0, "by_title": 0, "by_doi": 0, "by_minhash": 0}
+
+    def link(index: int, bucket: Dict, key, method: str):
+        if key in bucket:
+            if union_find.union(bucket[key], index):
+                report[method] += 1
+        else:
+            bucket[key] = index
+
+    by_id, by_title, by_doi = {}, {}, {}
+    for index, paper in enumerate(papers):
+        paper_id = paper.get('paperId')
+        if paper_id:
+            link(index, by_id, paper_id, "by_id")
+        title = normalize_title(paper.get('title', ''))
+        if title:
+            link(index, by_title, title, "by_title")
+        doi = extract_doi(paper)
+        if doi:
+            link(index, by_doi, doi, "by_doi")
+
+    if near_duplicates and n > 1:
+        signatures = {}
+        buckets: Dict[tuple, List[int]] = {}
+        for index, paper in enumerate(papers):
+            signature = minhash_signature(f"{paper.get('title', '') or ''} {paper.get('abstract', '') or ''}")
+            if signature is None:
+                continue
+            signatures[index] = signature
+            for band in range(_BANDS):
+                key = (band, signature[band * _ROWS:(band + 1) * _ROWS].tobytes())
+                buckets.setdefault(key, []).append(index)
+
+        # 同一个band桶中的论文是候选对，用完整签名估计相似度后确认
+        for members in buckets.values():
+            for position, first in enumerate(members):
+                for other in members[position + 1:]:
+                    if union_find.find(first) == union_find.find(other):
+                        continue
+                    similarity = float(np.mean(signatures[first] == signatures[other]))
+                    if similarity >= threshold and union_find.union(first, other):
+                        report["by_minhash"] += 1
+
+    groups: Dict[int, List[int]] = {}
+    for index in range(n):
+        groups.setdefault(union_find.find(index), []).append(index)
+
+    deduplicated = []
+    for root in sorted(groups):
+        merged = dict(papers[root])
+        for index in groups[root][1:]:
+            for key, value in papers[index].items():
+                if value not in (None, '', [], {}) and merged.get(key) in (None, '', [], {}):
+                    merged[key] = value
+        deduplicated.append(merged)
+
+    report["output"] = len(deduplicated)
+    report["collapsed"] = n - len(deduplicated)
+    return deduplicated, report
@@ -0,0 +1,219 @@
+"""
+Embedding缓存 - 内存LRU + SQLite磁盘两级缓存，按（模型名, 规范化文本哈希）寻址
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from config import Config
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本（Unicode NFKC + 折叠空白），用于计算缓存键"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def make_cache_key(model: str, text: str) -> str:
+    """生成缓存键：模型名 + 规范化文本的SHA-256"""
+    digest = hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def resolve_cache_path(path: Optional[str]) -> Optional[str]:
+    """将相对路径解析到项目目录下，空路径表示禁用磁盘缓存"""
+    if not path:
+        return None
+    if not os.path.isabs(path):
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        path = os.path.join(current_dir, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+class EmbeddingCache:
+    """两级Embedding缓存（线程安全）
+
+    - 内存层：OrderedDict实现的LRU，容量为 memory_size 条
+    - 磁盘层：SQLite表，向量以float32字节存储，超过 max_disk_entries 时按最近访问时间淘汰
+    """
+
+    def __init__(self, model: str, memory_size: int = 10000, disk_path: Optional[str] = None, max_disk_entries: int = 200000):
+        self.model = model
+        self.memory_size = max(0, memory_size)
+        self.max_disk_entries = max(0, max_disk_entries)
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+        if disk_path and self.max_disk_entries > 0:
+            try:
+                self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  Embedding磁盘缓存初始化失败: {e}，仅使用内存缓存")
+                self._conn = None
+
+    def get_many(self, texts: Sequence[str]) -> Dict[int, np.ndarray]:
+        """批量查询缓存
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            命中项字典 {输入下标: float32向量}
+        """
+        keys = [make_cache_key(self.model, text) for text in texts]
+        found: Dict[int, np.ndarray] = {}
+        disk_lookup: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for index, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[index] = vector
+                    self.memory_hits += 1
+                else:
+                    disk_lookup.setdefault(key, []).append(index)
+
+            if disk_lookup and self._conn is not None:
+                disk_found = self._disk_get(list(disk_lookup.keys()))
+                for key, vector in disk_found.items():
+                    self._memory_put(key, vector)
+                    for index in disk_lookup.pop(key):
+                        found[index] = vector
+                        self.disk_hits += 1
+
+            self.misses += sum(len(indices) for indices in disk_lookup.values())
+
+        return found
+
+    def put_many(self, texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """批量写入缓存（None向量会被跳过）"""
+        items = []
+        for text, embedding in zip(texts, embeddings):
+            if embedding is None or len(embedding) == 0:
+                continue
+            items.append((make_cache_key(self.model, text), np.asarray(embedding, dtype=np.float32)))
+        if not items:
+            return
+
+        with self._lock:
+            for key, vector in items:
+                self._memory_put(key, vector)
+            if self._conn is not None:
+                self._disk_put(items)
+
+    def get_stats(self) -> dict:
+        """获取缓存命中统计"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "model": self.model,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self.disk_evictions,
+                "disk_enabled": self._conn is not None
+            }
+
+    def _memory_put(self, key: str, vector: np.ndarray):
+        """写入内存LRU（调用方需持有锁）"""
+        if self.memory_size == 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """从SQLite读取向量并刷新访问时间（调用方需持有锁）"""
+        found = {}
+        try:
+            # SQLite单条语句的参数数量有限，分块查询
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, dim, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    if vector.shape[0] == dim:
+                        found[key] = vector
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  Embedding磁盘缓存读取失败: {e}")
+        return found
+
+    def _disk_put(self, items: List[tuple]):
+        """写入SQLite并按最近访问时间淘汰超量条目（调用方需持有锁）"""
+        try:
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_access) VALUES (?, ?, ?, ?)",
+                [(key, int(vector.shape[0]), vector.tobytes(), now) for key, vector in items]
+            )
+            total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = total - self.max_disk_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self.disk_evictions += overflow
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  Embedding磁盘缓存写入失败: {e}")
+
+
+# 进程内共享的缓存实例，按模型名区分
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model: str) -> Optional[EmbeddingCache]:
+    """获取指定模型的共享缓存实例，未启用缓存时返回None"""
+    if not Config.EMBEDDING_CACHE_ENABLED:
+        return None
+
+    with _caches_lock:
+        cache = _caches.get(model)
+        if cache is None:
+            cache = EmbeddingCache(
+                model=model,
+                memory_size=Config.EMBEDDING_CACHE_MEMORY_SIZE,
+                disk_path=resolve_cache_path(Config.EMBEDDING_CACHE_PATH),
+                max_disk_entries=Config.EMBEDDING_CACHE_MAX_DISK_ENTRIES
+            )
+            _caches[model] = cache
+        return cache
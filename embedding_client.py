@@ -5,10 +5,24 @@ from openai import OpenAI
 import os
 import time
 import json
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 import numpy as np
 import requests
 from config import Config
+from embedding_cache import get_embedding_cache
+from vector_utils import normalize_rows
+
+
+# 请求内容有问题的HTTP状态码：拆分批次可能绕过异常文本
+_INPUT_ERROR_STATUS = (400, 413, 422)
+
+
+def _is_input_error(error: Exception) -> bool:
+    """是否为请求内容错误（400/413/422）；超时、连接错误、鉴权错误和5xx不会因拆分批次而恢复"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status in _INPUT_ERROR_STATUS
 
 
 class EmbeddingClient:
@@ -32,6 +46,10 @@ class EmbeddingClient:
         self.base_url = base_url or self.config.EMBEDDING_API_ENDPOINT
         self.api_key = api_key or self.config.EMBEDDING_API_KEY
         self.model = model or self.config.EMBEDDING_MODEL_NAME
+        self.batch_size = self.config.EMBEDDING_BATCH_SIZE
+        # 向量维度，由第一次成功返回的向量自动确定
+        self.dimension: Optional[int] = None
+        self.cache = get_embedding_cache(self.model) if self.model else None
         
         if not self.api_key:
             raise ValueError("API密钥未找到，请设置 SCI_EMBEDDING_API_KEY 环境变量")
@@ -71,7 +89,7 @@ class EmbeddingClient:
                 self.use_http_only = True
                 print(f"⚠️  OpenAI客户端初始化失败，将使用 HTTP 请求方式")
     
-    def encode(self, texts: Union[List[str], str], show_progress_bar: bool = False, device: Optional[str] = None) -> np.ndarray:
+    def encode(self, texts: Union[List[str], str], show_progress_bar: bool = False, device: Optional[str] = None, normalize_embeddings: bool = True) -> np.ndarray:
         """
         获取文本的向量嵌入
         
@@ -79,9 +97,11 @@ class EmbeddingClient:
             texts: 输入文本（字符串或字符串列表）
             show_progress_bar: 是否显示进度条（API调用时忽略）
             device: 设备（API调用时忽略）
+            normalize_embeddings: 是否L2归一化（归一化后点积即余弦相似度）
         
         Returns:
-            向量数组，单个文本返回1D数组，多个文本返回2D数组
+            float32向量数组，单个文本返回1D数组，多个文本返回 (文本数, 维度) 的2D数组；
+            空文本和获取失败的文本为零向量，维度未知（从未成功获取过向量）时维度为0
         """
         # 处理单个文本
         if isinstance(texts, str):
@@ -90,35 +110,76 @@ class EmbeddingClient:
         else:
             single_text = False
         
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        
         # 过滤空文本
-        valid_texts = [text for text in texts if text and text.strip()]
-        if not valid_texts:
-            if single_text:
-                return np.array([])
-            else:
-                return np.array([[]] * len(texts))
+        valid_indices = [i for i, text in enumerate(texts) if text and text.strip()]
+        
+        # 先查缓存，命中的文本不再请求网络
+        if self.cache is not None and valid_indices:
+            cached = self.cache.get_many([texts[i] for i in valid_indices])
+            for position, embedding in cached.items():
+                embeddings[valid_indices[position]] = embedding
+            valid_indices = [index for index in valid_indices if embeddings[index] is None]
         
-        # 批量获取embedding
-        embeddings = []
-        for i, text in enumerate(texts):
-            if text and text.strip():
-                embedding = self._get_embedding(text)
+        # 按批次获取embedding，每批作为一个input列表发送
+        batch_size = max(1, self.batch_size)
+        for start in range(0, len(valid_indices), batch_size):
+            batch_indices = valid_indices[start:start + batch_size]
+            batch_texts = [texts[i] for i in batch_indices]
+            batch_embeddings = self._encode_batch(batch_texts)
+            for index, embedding in zip(batch_indices, batch_embeddings):
                 if embedding is not None:
-                    embeddings.append(embedding)
-                else:
-                    embeddings.append([0.0] * 1024)
-            else:
-                embeddings.append([0.0] * 1024)
+                    embeddings[index] = np.asarray(embedding, dtype=np.float32)
+            if self.cache is not None:
+                self.cache.put_many(batch_texts, batch_embeddings)
         
-        # 转换为numpy数组
-        embeddings_array = np.array(embeddings)
+        # 按检测到的维度预分配矩阵，失败或空文本保持为零向量
+        if self.dimension is None:
+            self.dimension = next((len(embedding) for embedding in embeddings if embedding is not None), None)
+        dimension = self.dimension or 0
+        embeddings_array = np.zeros((len(texts), dimension), dtype=np.float32)
+        for index, embedding in enumerate(embeddings):
+            if embedding is None:
+                continue
+            if len(embedding) != dimension:
+                print(f"⚠️  Embedding维度不一致: 期望 {dimension}，实际 {len(embedding)}，按失败处理")
+                continue
+            embeddings_array[index] = embedding
+        
+        if normalize_embeddings:
+            embeddings_array = normalize_rows(embeddings_array)
         
         # 如果是单个文本，返回1D数组
         if single_text:
-            return embeddings_array[0] if len(embeddings_array) > 0 else np.array([])
+            return embeddings_array[0]
         
         return embeddings_array
     
+    def _encode_batch(self, texts: List[str], max_retries: int = 3) -> List[Optional[List[float]]]:
+        """
+        获取一批文本的向量嵌入，因请求内容失败（4xx、响应不完整）时二分拆分后重试
+        
+        超时、连接错误和5xx在常规重试后整批按失败处理，不再拆分（服务不可用时拆分只会成倍增加请求）。
+        
+        Args:
+            texts: 非空文本列表
+            max_retries: 整批请求的最大重试次数（拆分后的子批次只尝试一次）
+        
+        Returns:
+            与输入顺序一致的向量列表，失败的文本对应None
+        """
+        embeddings, splittable = self._request_embeddings(texts, max_retries)
+        if embeddings is not None:
+            return embeddings
+        
+        if len(texts) == 1 or not splittable:
+            return [None] * len(texts)
+        
+        # 拆分成两半分别请求，避免单条异常文本拖垮整批
+        mid = len(texts) // 2
+        return self._encode_batch(texts[:mid], max_retries=1) + self._encode_batch(texts[mid:], max_retries=1)
+    
     def _get_embedding(self, text: str, max_retries: int = 3, retry_delay: float = 1.0) -> Optional[List[float]]:
         """
         获取单个文本的向量嵌入
@@ -134,9 +195,70 @@ class EmbeddingClient:
         if not text or not text.strip():
             return None
         
+        embeddings = self._get_embeddings([text], max_retries, retry_delay)
+        return embeddings[0] if embeddings else None
+    
+    @staticmethod
+    def _order_embeddings(items: List, count: int) -> Optional[List[List[float]]]:
+        """
+        按响应中的index字段恢复输入顺序，并校验每个向量
+        
+        Args:
+            items: 响应data列表（SDK对象或字典）
+            count: 请求中的文本数
+        
+        Returns:
+            按输入顺序排列的向量列表，响应不完整时返回None
+        """
+        if not items or len(items) != count:
+            return None
+        
+        ordered: List[Optional[List[float]]] = [None] * count
+        for position, item in enumerate(items):
+            if isinstance(item, dict):
+                index = item.get('index', position)
+                embedding = item.get('embedding')
+            else:
+                index = getattr(item, 'index', position)
+                embedding = getattr(item, 'embedding', None)
+            
+            if index is None or not 0 <= index < count:
+                index = position
+            if not embedding or not isinstance(embedding, list) or len(embedding) == 0:
+                return None
+            ordered[index] = embedding
+        
+        if any(embedding is None for embedding in ordered):
+            return None
+        return ordered
+    
+    def _get_embeddings(self, texts: List[str], max_retries: int = 3, retry_delay: float = 1.0) -> Optional[List[List[float]]]:
+        """
+        通过一次请求获取一批文本的向量嵌入
+        
+        Args:
+            texts: 非空文本列表
+            max_retries: 最大重试次数
+            retry_delay: 重试延迟（秒），会指数增长
+        
+        Returns:
+            与输入顺序一致的向量列表，失败时返回None
+        """
+        return self._request_embeddings(texts, max_retries, retry_delay)[0]
+    
+    def _request_embeddings(self, texts: List[str], max_retries: int = 3, retry_delay: float = 1.0) -> Tuple[Optional[List[List[float]]], bool]:
+        """
+        通过一次请求获取一批文本的向量嵌入（内部方法）
+        
+        Returns:
+            (与输入顺序一致的向量列表，失败时为None, 失败是否可能由请求内容引起)
+        """
+        if not texts:
+            return [], False
+        
         # 如果已检测到Pydantic兼容性问题，直接使用HTTP请求
         if self.use_http_only:
-            return self._get_embedding_via_http(text, max_retries, retry_delay)
+            return self._request_embeddings_via_http(texts, max_retries, retry_delay)
         
         # 重试循环
         for attempt in range(max_retries):
@@ -146,7 +268,7 @@ class EmbeddingClient:
                 try:
                     response = self.client.embeddings.create(
                         model=self.model,
-                        input=text,
+                        input=texts,
                         encoding_format="float"
                     )
                 except (ValueError, TypeError) as pydantic_error:
@@ -163,35 +285,19 @@ class EmbeddingClient:
                         if not EmbeddingClient._pydantic_warning_shown:
                             print(f"⚠️  检测到 Pydantic 兼容性问题，切换到 HTTP 请求方式（后续调用将静默使用HTTP）")
                             EmbeddingClient._pydantic_warning_shown = True
-                        return self._get_embedding_via_http(text, max_retries - attempt, retry_delay)
+                        return self._request_embeddings_via_http(texts, max_retries - attempt, retry_delay)
                     else:
                         raise  # 重新抛出其他错误
                 
-                # 验证响应
-                if not hasattr(response, 'data') or not response.data:
+                # 验证响应并按index恢复输入顺序
+                embeddings = self._order_embeddings(getattr(response, 'data', None), len(texts))
+                if embeddings is None:
                     if attempt < max_retries - 1:
                         time.sleep(retry_delay * (2 ** attempt))
                         continue
-                    return None
+                    return None, True
                 
-                # 获取embedding
-                embedding_obj = response.data[0]
-                if not hasattr(embedding_obj, 'embedding'):
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay * (2 ** attempt))
-                        continue
-                    return None
-                
-                embedding = embedding_obj.embedding
-                
-                # 验证embedding
-                if not embedding or not isinstance(embedding, list) or len(embedding) == 0:
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay * (2 ** attempt))
-                        continue
-                    return None
-                
-                return embedding
+                return embeddings, False
                 
             except Exception as e:
                 error_msg = str(e)
@@ -208,7 +314,12 @@ class EmbeddingClient:
                     if not EmbeddingClient._pydantic_warning_shown:
                         print(f"⚠️  检测到 Pydantic 兼容性问题，切换到 HTTP 请求方式（后续调用将静默使用HTTP）")
                         EmbeddingClient._pydantic_warning_shown = True
-                    return self._get_embedding_via_http(text, max_retries - attempt, retry_delay)
+                    return self._request_embeddings_via_http(texts, max_retries - attempt, retry_delay)
+                
+                # 请求内容错误重试也不会成功，交由调用方拆分
+                if _is_input_error(e):
+                    print(f"⚠️  Embedding API拒绝请求内容（批大小 {len(texts)}）: {e}")
+                    return None, True
                 
                 # 其他类型的错误，按原逻辑处理
                 if attempt < max_retries - 1:
@@ -217,14 +328,27 @@ class EmbeddingClient:
                     time.sleep(wait_time)
                     continue
                 else:
-                    print(f"⚠️  Embedding API调用最终失败: {e}")
-                    return None
+                    print(f"⚠️  Embedding API调用最终失败（批大小 {len(texts)}）: {e}")
+                    return None, False
         
-        return None
+        return None, False
     
     def _get_embedding_via_http(self, text: str, max_retries: int = 3, retry_delay: float = 1.0) -> Optional[List[float]]:
         """
-        使用原始 HTTP 请求获取 embedding（用于避免 Pydantic 兼容性问题）
+        使用原始 HTTP 请求获取单个文本的 embedding（用于避免 Pydantic 兼容性问题）
+        """
+        embeddings = self._get_embeddings_via_http([text], max_retries, retry_delay)
+        return embeddings[0] if embeddings else None
+    
+    def _get_embeddings_via_http(self, texts: List[str], max_retries: int = 3, retry_delay: float = 1.0) -> Optional[List[List[float]]]:
+        """
+        使用原始 HTTP 请求批量获取 embedding（用于避免 Pydantic 兼容性问题）
+        """
+        return self._request_embeddings_via_http(texts, max_retries, retry_delay)[0]
+    
+    def _request_embeddings_via_http(self, texts: List[str], max_retries: int = 3, retry_delay: float = 1.0) -> Tuple[Optional[List[List[float]]], bool]:
+        """
+        使用原始 HTTP 请求批量获取 embedding（内部方法），返回值同 _request_embeddings
         """
         url = f"{self.base_url}/embeddings"
         headers = {
@@ -233,7 +357,7 @@ class EmbeddingClient:
         }
         payload = {
             "model": self.model,
-            "input": text,
+            "input": texts,
             "encoding_format": "float"
         }
         
@@ -243,26 +367,27 @@ class EmbeddingClient:
                 response.raise_for_status()
                 data = response.json()
                 
-                if 'data' in data and len(data['data']) > 0:
-                    embedding = data['data'][0].get('embedding')
-                    if embedding and isinstance(embedding, list) and len(embedding) > 0:
-                        return embedding
+                embeddings = self._order_embeddings(data.get('data'), len(texts))
+                if embeddings is not None:
+                    return embeddings, False
                 
                 if attempt < max_retries - 1:
                     wait_time = retry_delay * (2 ** attempt)
                     time.sleep(wait_time)
                     continue
-                return None
+                return None, True
                 
             except Exception as e:
+                if _is_input_error(e):
+                    print(f"⚠️  HTTP Embedding API拒绝请求内容（批大小 {len(texts)}）: {e}")
+                    return None, True
                 if attempt < max_retries - 1:
                     wait_time = retry_delay * (2 ** attempt)
                     print(f"⚠️  HTTP Embedding API调用失败: {e}，{wait_time:.1f}秒后重试... (尝试 {attempt + 1}/{max_retries})")
                     time.sleep(wait_time)
                     continue
                 else:
-                    print(f"⚠️  HTTP Embedding API调用最终失败: {e}")
-                    return None
+                    print(f"⚠️  HTTP Embedding API调用最终失败（批大小 {len(texts)}）: {e}")
+                    return None, False
         
-        return None
-
+        return None, False
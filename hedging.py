@@ -0,0 +1,207 @@
+"""
+对冲请求 - 主请求超过延迟阈值（基于历史延迟分位数）仍未返回时并行发起备用请求，
+采用先返回的有效结果；两者在宽限窗口内先后返回时合并结果
+"""
+import time
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Callable, Dict, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """滑动窗口延迟统计（线程安全）"""
+
+    def __init__(self, window: int = 200, min_samples: int = 10):
+        """
+        Args:
+            window: 保留最近多少次延迟样本
+            min_samples: 样本数少于该值时不计算分位数
+        """
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """返回延迟的q分位数，样本不足时返回None"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        index = min(len(samples) - 1, int(q * len(samples)))
+        return samples[index]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+
+class Hedger:
+    """对冲执行器
+
+    对冲延迟 = 主请求历史延迟的 quantile 分位数，限制在 [min_delay, max_delay] 之间；
+    样本不足时使用 max_delay。
+    """
+
+    def __init__(self, name: str, min_delay: float = 1.0, max_delay: float = 8.0, quantile: float = 0.95, grace: float = 0.3,
+                 deadline: float = 0.0, max_workers: int = 32):
+        """
+        Args:
+            name: 名称（用于日志和统计）
+            min_delay: 最小对冲延迟（秒）
+            max_delay: 最大对冲延迟（秒）
+            quantile: 用于计算对冲延迟的延迟分位数
+            grace: 先返回的有效结果等待另一方的宽限时间（秒）
+            deadline: 单次调用的总时限（秒），超过时返回None；0表示不限制
+            max_workers: 主请求和备用请求各自的线程数
+        """
+        self.name = name
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.quantile = quantile
+        self.grace = grace
+        self.deadline = deadline
+        self.latency = LatencyTracker()
+        # 不使用with语句：返回结果后落后的一方继续在后台完成（其结果仍会写入缓存）
+        # 备用请求使用独立的线程池，主请求排队时备用请求不会排在它们后面
+        self._primary_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{name}")
+        self._fallback_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{name}-fallback")
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "hedged": 0, "primary": 0, "fallback": 0, "merged": 0, "failed": 0, "timeout": 0}
+
+    def delay(self) -> float:
+        """当前的对冲延迟（秒）"""
+        observed = self.latency.quantile(self.quantile)
+        if observed is None:
+            return self.max_delay
+        return min(self.max_delay, max(self.min_delay, observed))
+
+    def call(self, primary: Callable[[], T], fallback: Callable[[], T], is_valid: Callable[[T], bool], merge: Callable[[T, T], T]) -> Optional[T]:
+        """执行对冲请求
+
+        Args:
+            primary: 主请求
+            fallback: 备用请求
+            is_valid: 判断结果是否有效
+            merge: 合并两个有效结果（主请求结果在前）
+
+        Returns:
+            先返回的有效结果或合并结果；两者都无效时返回备用请求的结果；超过总时限时返回None
+        """
+        self._count("calls")
+        deadline = time.monotonic() + self.deadline if self.deadline > 0 else None
+        primary_future = self._primary_executor.submit(primary)
+        done, _ = concurrent.futures.wait([primary_future], timeout=self._remaining(deadline, self.delay()))
+        if done:
+            result = self._result(primary_future)
+            if is_valid(result):
+                self._count("primary")
+                return result
+            # 主请求已失败，直接使用备用请求
+            self._count("fallback")
+            fallback_future = self._fallback_executor.submit(fallback)
+            done, _ = concurrent.futures.wait([fallback_future], timeout=self._remaining(deadline))
+            if not done:
+                return self._timeout()
+            return self._result(fallback_future)
+
+        if self._remaining(deadline) == 0:
+            return self._timeout()
+
+        self._count("hedged")
+        fallback_future = self._fallback_executor.submit(fallback)
+        pending = {primary_future, fallback_future}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=self._remaining(deadline),
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                return self._timeout()
+            for future in done:
+                result = self._result(future)
+                if not is_valid(result):
+                    continue
+                other = fallback_future if future is primary_future else primary_future
+                # 宽限窗口内另一方也返回有效结果时合并
+                try:
+                    other_result = other.result(timeout=self._remaining(deadline, self.grace))
+                except Exception:
+                    other_result = None
+                if other_result is not None and is_valid(other_result):
+                    self._count("merged")
+                    if future is primary_future:
+                        return merge(result, other_result)
+                    return merge(other_result, result)
+                self._count("primary" if future is primary_future else "fallback")
+                return result
+
+        self._count("failed")
+        return self._result(fallback_future)
+
+    def get_stats(self) -> dict:
+        """获取对冲统计"""
+        with self._lock:
+            stats = dict(self._stats)
+        observed = self.latency.quantile(self.quantile)
+        stats.update({
+            "name": self.name,
+            "delay_seconds": round(self.delay(), 3),
+            "observed_quantile_seconds": round(observed, 3) if observed is not None else None,
+            "latency_samples": len(self.latency)
+        })
+        return stats
+
+    @staticmethod
+    def _remaining(deadline: Optional[float], limit: Optional[float] = None) -> Optional[float]:
+        """距总时限的剩余时间（不超过limit），未设置总时限时返回limit"""
+        if deadline is None:
+            return limit
+        remaining = max(0.0, deadline - time.monotonic())
+        return remaining if limit is None else min(limit, remaining)
+
+    def _timeout(self) -> None:
+        """超过总时限：放弃等待，未完成的请求继续在后台完成"""
+        self._count("timeout")
+        print(f"⚠️  {self.name}对冲请求超过总时限{self.deadline}秒")
+        return None
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _result(self, future: concurrent.futures.Future):
+        """获取请求结果，请求抛出异常时返回None"""
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"⚠️  {self.name}对冲请求失败: {e}")
+            return None
+
+
+# 进程内共享的对冲执行器，按名称区分
+_hedgers: Dict[str, Hedger] = {}
+_hedgers_lock = threading.Lock()
+
+
+def get_hedger(name: str, min_delay: float = 1.0, max_delay: float = 8.0, quantile: float = 0.95, grace: float = 0.3,
+               deadline: float = 0.0) -> Hedger:
+    """获取指定名称的共享对冲执行器，首次调用时按参数创建"""
+    with _hedgers_lock:
+        hedger = _hedgers.get(name)
+        if hedger is None:
+            hedger = Hedger(name, min_delay, max_delay, quantile, grace, deadline)
+            _hedgers[name] = hedger
+        return hedger
+
+
+def get_all_hedger_stats() -> Dict[str, dict]:
+    """获取所有共享对冲执行器的统计"""
+    with _hedgers_lock:
+        hedgers = list(_hedgers.values())
+    return {hedger.name: hedger.get_stats() for hedger in hedgers}
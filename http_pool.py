@@ -0,0 +1,72 @@
+"""
+HTTP连接池 - 进程内共享的requests.Session，复用TCP/TLS连接
+"""
+import socket
+import threading
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    """为连接池中的socket开启TCP keep-alive，避免空闲连接被中间设备静默断开"""
+
+    def __init__(self, tcp_keepalive: bool = True, **kwargs):
+        self.tcp_keepalive = tcp_keepalive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.tcp_keepalive:
+            socket_options = list(HTTPConnection.default_socket_options)
+            socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            kwargs["socket_options"] = socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+# 按名称共享的Session实例
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(name: str, pool_size: int = 20, keepalive: bool = True) -> requests.Session:
+    """
+    获取（或创建）指定名称的共享Session
+
+    同名Session在进程内只创建一次，底层urllib3连接池是线程安全的，
+    可以被多个线程、多个请求同时复用。
+
+    Args:
+        name: Session名称（如 "llm"），不同服务使用不同的连接池
+        pool_size: 每个主机的最大连接数
+        keepalive: 是否保持长连接；为False时每次请求后关闭连接
+
+    Returns:
+        共享的requests.Session
+    """
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = requests.Session()
+            adapter = _PooledAdapter(
+                tcp_keepalive=keepalive,
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                pool_block=False,
+                max_retries=0  # 重试由调用方控制
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Connection"] = "keep-alive" if keepalive else "close"
+            _sessions[name] = session
+        return session
+
+
+def close_sessions(name: Optional[str] = None):
+    """关闭共享Session（服务退出时调用），name为空时关闭全部"""
+    with _sessions_lock:
+        names = [name] if name else list(_sessions.keys())
+        for session_name in names:
+            session = _sessions.pop(session_name, None)
+            if session is not None:
+                session.close()
@@ -1,35 +1,73 @@
 """
 文献分析器 - 负责关键词提取、领域分析、论文分类、论文总结、主题聚类、趋势分析
 """
-from typing import List, Dict, Optional, Tuple
+import re
+import asyncio
+import contextvars
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from llm_client import LLMClient
+from async_llm_client import AsyncLLMClient, get_response_async
 from prompt_template import (
     get_keyword_extraction_prompt,
     get_domain_analysis_prompt,
     get_paper_classification_prompt,
     get_paper_summary_prompt,
+    get_batch_paper_summary_prompt,
     get_topic_clustering_prompt,
+    get_topic_naming_prompt,
     get_trend_analysis_prompt,
     get_paper_validation_prompt
 )
 from config import Config
+from summary_cache import get_summary_cache
+from topic_clustering import cluster_texts, format_topics, paper_text, parse_topic_names
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
+# 批量总结输出的分隔行（prompt_template.BATCH_SUMMARY_MARKER），容忍Markdown标题/加粗符号
+_BATCH_MARKER_PATTERN = re.compile(r"^[#*\s]*=+\s*PAPER\s+(\d+)\s*=+[*\s]*$", re.IGNORECASE | re.MULTILINE)
+# 中日韩字符（估计token数时每字约1个token）
+_CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计文本的token数：中日韩字符每字约1个token，其余字符约4个字符1个token"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
 class LiteratureAnalyzer:
     """文献分析器"""
     
-    def __init__(self, llm_client: LLMClient, language: str = 'en'):
+    def __init__(self, llm_client: LLMClient, language: str = 'en', async_llm_client: Optional[AsyncLLMClient] = None,
+                 embedding_client=None):
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
+        # 本地主题聚类使用的Embedding客户端（为None时用TF-IDF向量聚类）
+        self.embedding_client = embedding_client
         self.language = language
         self.config = Config
+        # 论文总结缓存（未启用时为None）
+        self.summary_cache = get_summary_cache()
+    
+    async def _get_response_async(self, prompt: str, **kwargs) -> str:
+        """异步获取LLM响应"""
+        return await get_response_async(self.llm_client, self.async_llm_client, prompt, **kwargs)
     
     def extract_keywords(self, query: str, intent_result: dict = None) -> List[str]:
         """提取关键词 - 基于意图分析结果生成更准确的关键词"""
         prompt = get_keyword_extraction_prompt(query, intent_result, self.language)
         response = self.llm_client.get_response(prompt=prompt)
-        
-        # 解析关键词
+        return self._parse_keywords(response)
+    
+    async def extract_keywords_async(self, query: str, intent_result: dict = None) -> List[str]:
+        """提取关键词（异步版本）"""
+        prompt = get_keyword_extraction_prompt(query, intent_result, self.language)
+        response = await self._get_response_async(prompt)
+        return self._parse_keywords(response)
+    
+    def _parse_keywords(self, response: str) -> List[str]:
+        """解析关键词"""
         keywords = [kw.strip() for kw in response.split(',')]
         keywords = [kw for kw in keywords if kw and len(kw) > 0]
         
@@ -47,6 +85,15 @@ class LiteratureAnalyzer:
         )
         return domain_analysis
     
+    async def analyze_domain_async(self, query: str, keywords: List[str], intent_result: dict = None) -> str:
+        """分析研究领域（异步版本）"""
+        prompt = get_domain_analysis_prompt(query, keywords, intent_result, self.language)
+        return await self._get_response_async(
+            prompt,
+            use_reasoning_model=True,
+            timeout=self.config.DOMAIN_ANALYSIS_TIMEOUT * 2
+        )
+    
     def validate_retrieved_papers(self, papers: List[Dict], query: str, intent_result: dict) -> Tuple[List[Dict], bool]:
         """验证检索到的论文是否与查询意图匹配
         
@@ -81,6 +128,23 @@ class LiteratureAnalyzer:
             print(f"⚠️  论文验证失败: {e}，继续使用原论文列表")
             return papers, False
     
+    async def validate_retrieved_papers_async(self, papers: List[Dict], query: str, intent_result: dict) -> Tuple[List[Dict], bool]:
+        """验证检索到的论文是否与查询意图匹配（异步版本）"""
+        if not papers:
+            return [], False
+        
+        try:
+            prompt = get_paper_validation_prompt(papers, query, intent_result, self.language)
+            validation_result = await self._get_response_async(
+                prompt,
+                use_reasoning_model=True,
+                timeout=self.config.PAPER_CLASSIFICATION_TIMEOUT * 2
+            )
+            return papers, self._parse_validation_result(validation_result)
+        except Exception as e:
+            print(f"⚠️  论文验证失败: {e}，继续使用原论文列表")
+            return papers, False
+    
     def _parse_validation_result(self, validation_result: str) -> bool:
         """解析验证结果，判断是否需要重新检索"""
         # 检查验证结果中是否包含"需要重新检索"、"re-retrieval"等关键词
@@ -127,33 +191,237 @@ class LiteratureAnalyzer:
             print(f"⚠️  论文分类失败: {e}，使用fallback方法：返回前15篇论文")
             return papers[:min(len(papers), 15)]
     
-    def summarize_papers(self, papers: List[Dict], query: str) -> List[str]:
-        """论文内容总结"""
+    async def classify_papers_async(self, papers: List[Dict], query: str) -> List[Dict]:
+        """论文分类与筛选（异步版本）"""
         if not papers:
             return []
         
-        summaries = []
+        if len(papers) <= 15:
+            return papers
+        
+        try:
+            papers_to_classify = papers[:20]
+            prompt = get_paper_classification_prompt(papers_to_classify, query, self.language)
+            await self._get_response_async(
+                prompt,
+                use_reasoning_model=False,
+                timeout=self.config.PAPER_CLASSIFICATION_TIMEOUT * 2
+            )
+            return papers[:min(len(papers), 15)]
+        except Exception as e:
+            print(f"⚠️  论文分类失败: {e}，使用fallback方法：返回前15篇论文")
+            return papers[:min(len(papers), 15)]
+    
+    def summarize_papers(self, papers: List[Dict], query: str, intent_result: dict = None) -> List[str]:
+        """论文内容总结（按论文顺序返回，与papers一一对应）
+
+        命中总结缓存的论文不再调用推理模型；PAPER_SUMMARY_BATCH_SIZE大于1时，
+        其余论文按token预算打包，每批共用一次推理模型调用。
+        """
+        return self.assemble_summaries(papers, dict(self.iter_summaries(papers, query, intent_result)))
+    
+    def iter_summaries(self, papers: List[Dict], query: str, intent_result: dict = None) -> Iterator[Tuple[int, str]]:
+        """逐篇产出 (论文下标, 总结)：先产出缓存命中的总结，其余按完成顺序产出，总结失败的论文不产出"""
+        if not papers:
+            return
         
-        # 使用线程池并行处理论文总结
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = []
-            for paper in papers:
-                future = executor.submit(self._summarize_single_paper, paper, query)
-                futures.append(future)
+        summaries, batches = self._plan_summary_batches(papers, query, intent_result)
+        yield from sorted(summaries.items())
+        
+        # 使用线程池并行处理各批论文总结
+        with ThreadPoolExecutor(max_workers=self._summary_concurrency(len(batches))) as executor:
+            futures = {
+                # 复制上下文，使线程内的LLM调用计入当前请求的并发份额
+                executor.submit(contextvars.copy_context().run, self._summarize_batch,
+                                [papers[index] for index in batch], query, intent_result): batch
+                for batch in batches
+            }
             
             for future in as_completed(futures):
                 try:
-                    summary = future.result()
+                    batch_summaries = future.result()
+                except Exception as e:
+                    print(f"⚠️  论文总结失败: {e}")
+                    continue
+                for index, summary in zip(futures[future], batch_summaries):
                     if summary:
-                        summaries.append(summary)
+                        yield index, summary
+    
+    async def summarize_papers_async(self, papers: List[Dict], query: str, intent_result: dict = None) -> List[str]:
+        """论文内容总结（异步版本，协程并发代替线程池）"""
+        summaries = {}
+        async for index, summary in self.iter_summaries_async(papers, query, intent_result):
+            summaries[index] = summary
+        return self.assemble_summaries(papers, summaries)
+    
+    async def iter_summaries_async(self, papers: List[Dict], query: str, intent_result: dict = None) -> AsyncIterator[Tuple[int, str]]:
+        """逐篇产出 (论文下标, 总结)（异步版本），顺序规则与 iter_summaries 相同"""
+        if not papers:
+            return
+        
+        # 总结缓存是SQLite读写，放到线程中执行，避免阻塞事件循环
+        summaries, batches = await asyncio.to_thread(self._plan_summary_batches, papers, query, intent_result)
+        for index, summary in sorted(summaries.items()):
+            yield index, summary
+        
+        semaphore = asyncio.Semaphore(self._summary_concurrency(len(batches)))
+        
+        async def summarize(batch: List[int]) -> Tuple[List[int], List[Optional[str]]]:
+            async with semaphore:
+                return batch, await self._summarize_batch_async([papers[index] for index in batch], query, intent_result)
+        
+        tasks = [asyncio.create_task(summarize(batch)) for batch in batches]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    batch, batch_summaries = await next_done
                 except Exception as e:
                     print(f"⚠️  论文总结失败: {e}")
                     continue
+                for index, summary in zip(batch, batch_summaries):
+                    if summary:
+                        yield index, summary
+        finally:
+            # 调用方提前停止迭代（如请求被取消）时不再继续总结
+            for task in tasks:
+                task.cancel()
+    
+    def _summary_concurrency(self, batch_count: int) -> int:
+        """单个请求内并行总结的批数
         
+        启用AIMD并发限制时各批同时提交（不超过 LLM_CONCURRENCY_MAX），由共享限制器决定实际并发，
+        上游空闲时单个请求也能用满加大后的名额；未启用时按 PAPER_SUMMARY_CONCURRENCY 限制。
+        """
+        if self.config.LLM_CONCURRENCY_ENABLED:
+            return max(1, min(batch_count, self.config.LLM_CONCURRENCY_MAX))
+        return max(1, self.config.PAPER_SUMMARY_CONCURRENCY)
+    
+    def assemble_summaries(self, papers: List[Dict], summaries: Dict[int, str]) -> List[str]:
+        """按论文顺序组装总结列表，总结失败的论文用标题和摘要代替，
+        保证第i个总结对应第i篇论文（综述Prompt中的引用编号依赖这一对应关系）"""
+        assembled = []
+        for index, paper in enumerate(papers):
+            summary = summaries.get(index)
+            if not summary:
+                abstract = (paper.get('abstract', '') or '')[:500]
+                if self.language == 'zh':
+                    summary = f"标题：{paper.get('title', '')}\n摘要：{abstract or '无'}"
+                else:
+                    summary = f"Title: {paper.get('title', '')}\nAbstract: {abstract or 'N/A'}"
+            assembled.append(summary)
+        return assembled
+    
+    def _plan_summary_batches(self, papers: List[Dict], query: str, intent_result: dict = None) -> Tuple[Dict[int, str], List[List[int]]]:
+        """查询总结缓存，并将未命中的论文按token预算分批
+
+        每批最多 PAPER_SUMMARY_BATCH_SIZE 篇，论文标题和摘要的估计token数之和不超过
+        PAPER_SUMMARY_BATCH_TOKENS（单篇超出预算时单独成批）。
+
+        Returns:
+            (缓存命中的总结 {论文下标: 总结}, 待总结论文下标的分批列表)
+        """
+        summaries = {}
+        batches = []
+        current, used = [], 0
+        batch_size = max(1, self.config.PAPER_SUMMARY_BATCH_SIZE)
+        budget = self.config.PAPER_SUMMARY_BATCH_TOKENS
+        for index, paper in enumerate(papers):
+            if self.summary_cache is not None:
+                cached = self.summary_cache.get(paper, query, self.language, intent_result)
+                if cached:
+                    summaries[index] = cached
+                    continue
+            tokens = estimate_tokens(f"{paper.get('title', '')}\n{paper.get('abstract', '') or ''}")
+            if current and (len(current) >= batch_size or used + tokens > budget):
+                batches.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += tokens
+        if current:
+            batches.append(current)
+        return summaries, batches
+    
+    @staticmethod
+    def _parse_batch_summaries(response: str, count: int) -> Dict[int, str]:
+        """解析批量总结输出，返回 {本批内下标: 总结}
+
+        按分隔行（=== PAPER N ===，容忍Markdown标题/加粗符号和大小写差异）切分，
+        编号超出范围、重复出现或内容过短的段落视为解析失败。
+        """
+        matches = list(_BATCH_MARKER_PATTERN.finditer(response or ""))
+        parsed = {}
+        for position, match in enumerate(matches):
+            number = int(match.group(1))
+            end = matches[position + 1].start() if position + 1 < len(matches) else len(response)
+            text = response[match.end():end].strip()
+            if 1 <= number <= count and (number - 1) not in parsed and len(text) >= 20:
+                parsed[number - 1] = text
+        return parsed
+    
+    def _summarize_batch(self, papers: List[Dict], query: str, intent_result: dict = None) -> List[Optional[str]]:
+        """总结一批论文，输出解析失败的论文改为逐篇总结"""
+        if len(papers) == 1:
+            return [self._request_summary(papers[0], query, intent_result)]
+        
+        parsed = {}
+        try:
+            prompt = get_batch_paper_summary_prompt(papers, query, self.language)
+            response = self.llm_client.get_response(
+                prompt=prompt,
+                use_reasoning_model=True,
+                timeout=self.config.PAPER_SUMMARY_TIMEOUT * 2
+            )
+            parsed = self._parse_batch_summaries(response, len(papers))
+        except Exception as e:
+            print(f"⚠️  批量论文总结失败: {e}，改为逐篇总结")
+        
+        if len(parsed) < len(papers):
+            print(f"⚠️  批量总结中{len(papers) - len(parsed)}/{len(papers)}篇论文解析失败，改为逐篇总结")
+        summaries = []
+        for index, paper in enumerate(papers):
+            if index in parsed:
+                if self.summary_cache is not None:
+                    self.summary_cache.put(paper, query, self.language, parsed[index], intent_result, batched=True)
+                summaries.append(parsed[index])
+            else:
+                summaries.append(self._request_summary(paper, query, intent_result))
         return summaries
     
-    def _summarize_single_paper(self, paper: Dict, query: str) -> Optional[str]:
-        """总结单篇论文"""
+    async def _summarize_batch_async(self, papers: List[Dict], query: str, intent_result: dict = None) -> List[Optional[str]]:
+        """总结一批论文（异步版本），解析失败的论文并发逐篇总结"""
+        if len(papers) == 1:
+            return [await self._request_summary_async(papers[0], query, intent_result)]
+        
+        parsed = {}
+        try:
+            prompt = get_batch_paper_summary_prompt(papers, query, self.language)
+            response = await self._get_response_async(
+                prompt,
+                use_reasoning_model=True,
+                timeout=self.config.PAPER_SUMMARY_TIMEOUT * 2
+            )
+            parsed = self._parse_batch_summaries(response, len(papers))
+        except Exception as e:
+            print(f"⚠️  批量论文总结失败: {e}，改为逐篇总结")
+        
+        if len(parsed) < len(papers):
+            print(f"⚠️  批量总结中{len(papers) - len(parsed)}/{len(papers)}篇论文解析失败，改为逐篇总结")
+        if parsed and self.summary_cache is not None:
+            await asyncio.to_thread(self._cache_batch_summaries, papers, query, parsed, intent_result)
+        fallback = [index for index in range(len(papers)) if index not in parsed]
+        fallback_summaries = await asyncio.gather(
+            *(self._request_summary_async(papers[index], query, intent_result) for index in fallback)
+        )
+        parsed.update(zip(fallback, fallback_summaries))
+        return [parsed[index] for index in range(len(papers))]
+    
+    def _cache_batch_summaries(self, papers: List[Dict], query: str, parsed: Dict[int, str], intent_result: dict = None):
+        """将批量总结中解析成功的论文写入总结缓存"""
+        for index, summary in parsed.items():
+            self.summary_cache.put(papers[index], query, self.language, summary, intent_result, batched=True)
+    
+    def _request_summary(self, paper: Dict, query: str, intent_result: dict = None) -> Optional[str]:
+        """调用推理模型总结单篇论文，成功时写入总结缓存"""
         try:
             prompt = get_paper_summary_prompt(paper, query, self.language)
             # 使用推理模型进行高质量的论文总结
@@ -162,16 +430,55 @@ class LiteratureAnalyzer:
                 use_reasoning_model=True,
                 timeout=self.config.PAPER_SUMMARY_TIMEOUT
             )
+            if self.summary_cache is not None:
+                self.summary_cache.put(paper, query, self.language, summary, intent_result)
+            return summary
+        except Exception as e:
+            print(f"⚠️  单篇论文总结失败: {e}")
+            return None
+    
+    async def _request_summary_async(self, paper: Dict, query: str, intent_result: dict = None) -> Optional[str]:
+        """调用推理模型总结单篇论文（异步版本）"""
+        try:
+            prompt = get_paper_summary_prompt(paper, query, self.language)
+            summary = await self._get_response_async(
+                prompt,
+                use_reasoning_model=True,
+                timeout=self.config.PAPER_SUMMARY_TIMEOUT
+            )
+            if self.summary_cache is not None:
+                await asyncio.to_thread(self.summary_cache.put, paper, query, self.language, summary, intent_result)
             return summary
         except Exception as e:
             print(f"⚠️  单篇论文总结失败: {e}")
             return None
     
-    def cluster_topics(self, summaries: List[str]) -> str:
-        """主题聚类"""
-        if not summaries:
+    def cluster_topics(self, summaries: List[str], papers: Optional[List[Dict]] = None) -> str:
+        """主题聚类
+
+        TOPIC_CLUSTERING_MODE为local时在本地对论文（没有论文时对总结）做向量聚类，
+        只有开启 TOPIC_CLUSTERING_LLM_NAMING 时才调用非推理模型为主题命名；本地聚类失败时改用推理模型。
+        """
+        if not summaries and not papers:
             return ""
         
+        if self.config.TOPIC_CLUSTERING_MODE == "local":
+            try:
+                topics, titles = self._cluster_topics_local(summaries, papers)
+                if topics and self.config.TOPIC_CLUSTERING_LLM_NAMING:
+                    try:
+                        response = self.llm_client.get_response(
+                            prompt=get_topic_naming_prompt(topics, titles, self.language),
+                            use_reasoning_model=False,
+                            timeout=self.config.TOPIC_CLUSTERING_TIMEOUT
+                        )
+                        self._apply_topic_names(topics, response)
+                    except Exception as e:
+                        print(f"⚠️  主题命名失败: {e}，使用关键词作为主题名称")
+                return format_topics(topics, titles, self.language)
+            except Exception as e:
+                print(f"⚠️  本地主题聚类失败: {e}，改用推理模型聚类")
+        
         try:
             prompt = get_topic_clustering_prompt(summaries, self.language)
             clustering_result = self.llm_client.get_response(
@@ -185,6 +492,74 @@ class LiteratureAnalyzer:
             print(f"⚠️  主题聚类失败: {e}，跳过此步骤")
             return ""
     
+    async def cluster_topics_async(self, summaries: List[str], papers: Optional[List[Dict]] = None) -> str:
+        """主题聚类（异步版本）"""
+        if not summaries and not papers:
+            return ""
+        
+        if self.config.TOPIC_CLUSTERING_MODE == "local":
+            try:
+                topics, titles = await asyncio.to_thread(self._cluster_topics_local, summaries, papers)
+                if topics and self.config.TOPIC_CLUSTERING_LLM_NAMING:
+                    try:
+                        response = await self._get_response_async(
+                            get_topic_naming_prompt(topics, titles, self.language),
+                            use_reasoning_model=False,
+                            timeout=self.config.TOPIC_CLUSTERING_TIMEOUT
+                        )
+                        self._apply_topic_names(topics, response)
+                    except Exception as e:
+                        print(f"⚠️  主题命名失败: {e}，使用关键词作为主题名称")
+                return format_topics(topics, titles, self.language)
+            except Exception as e:
+                print(f"⚠️  本地主题聚类失败: {e}，改用推理模型聚类")
+        
+        try:
+            prompt = get_topic_clustering_prompt(summaries, self.language)
+            return await self._get_response_async(
+                prompt,
+                use_reasoning_model=True,
+                timeout=self.config.TOPIC_CLUSTERING_TIMEOUT * 2
+            )
+        except Exception as e:
+            print(f"⚠️  主题聚类失败: {e}，跳过此步骤")
+            return ""
+    
+    def _cluster_topics_local(self, summaries: List[str], papers: Optional[List[Dict]] = None) -> Tuple[List[Dict], List[str]]:
+        """本地主题聚类，返回 (主题列表, 各论文标题)
+
+        论文文本（标题+摘要）与检索重排序时向量化的文本相同，通常直接命中Embedding缓存；
+        Embedding不可用或获取失败时用TF-IDF向量聚类。
+        """
+        if papers:
+            texts = [paper_text(paper) for paper in papers]
+            titles = [paper.get('title', '') or f"#{index + 1}" for index, paper in enumerate(papers)]
+        else:
+            texts = list(summaries)
+            titles = [summary.strip().split("\n", 1)[0][:80] for summary in summaries]
+        
+        embeddings = None
+        if self.embedding_client is not None:
+            try:
+                embeddings = self.embedding_client.encode(texts, show_progress_bar=False)
+            except Exception as e:
+                print(f"⚠️  主题聚类向量化失败: {e}，使用TF-IDF向量")
+        
+        topics = cluster_texts(
+            texts,
+            embeddings,
+            max_k=self.config.TOPIC_CLUSTERING_MAX_K,
+            label_terms=self.config.TOPIC_CLUSTERING_LABEL_TERMS
+        )
+        print(f"🧩 本地主题聚类: {len(texts)} 篇论文分为 {len(topics)} 个主题")
+        return topics, titles
+    
+    @staticmethod
+    def _apply_topic_names(topics: List[Dict], response: str):
+        """将命名结果写入主题（未解析出名称的主题保留关键词标签）"""
+        for index, name in parse_topic_names(response, len(topics)).items():
+            topics[index]["name"] = name
+    
     def analyze_trends(self, papers: List[Dict]) -> str:
         """趋势分析"""
         if not papers:
@@ -202,4 +577,19 @@ class LiteratureAnalyzer:
             # 如果趋势分析失败，返回空字符串，不影响后续流程
             print(f"⚠️  趋势分析失败: {e}，跳过此步骤")
             return ""
-
+    
+    async def analyze_trends_async(self, papers: List[Dict]) -> str:
+        """趋势分析（异步版本）"""
+        if not papers:
+            return ""
+        
+        try:
+            prompt = get_trend_analysis_prompt(papers, self.language)
+            return await self._get_response_async(
+                prompt,
+                use_reasoning_model=True,
+                timeout=self.config.TREND_ANALYSIS_TIMEOUT * 2
+            )
+        except Exception as e:
+            print(f"⚠️  趋势分析失败: {e}，跳过此步骤")
+            return ""
@@ -1,7 +1,10 @@
 import requests
 import time
-from typing import Optional
+import json
+from typing import Optional, Iterator, Tuple
 from config import Config
+from http_pool import get_session
+from concurrency_limiter import OVERLOAD, get_llm_concurrency_limiter, is_overload_status, limit_slot
 
 
 class LLMClient:
@@ -31,58 +34,86 @@ class LLMClient:
         self.max_retries = kwargs.get('max_retries', self.config.MAX_RETRIES)
         self.timeout = kwargs.get('timeout', self.config.LLM_REQUEST_TIMEOUT)
 
-    def _make_api_call(self, prompt: str) -> str:
-        """使用自定义API端点调用"""
+        # 复用进程级共享连接池，避免每次调用重新建立TCP+TLS连接
+        self.session = get_session(
+            "llm",
+            pool_size=self.config.LLM_HTTP_POOL_SIZE,
+            keepalive=self.config.LLM_HTTP_KEEPALIVE
+        )
+
+        # 进程级共享的AIMD并发限制（非流式调用），未启用时为None
+        self.concurrency = get_llm_concurrency_limiter()
+
+    @staticmethod
+    def _extract_content(result: dict) -> str:
+        """从chat/completions响应中提取content，格式不符时抛出异常"""
+        # 检查响应格式
+        if "choices" not in result or not result["choices"]:
+            raise Exception(f"API响应格式错误: 缺少choices字段或choices为空。响应: {result}")
+        
+        if "message" not in result["choices"][0] or "content" not in result["choices"][0]["message"]:
+            raise Exception(f"API响应格式错误: 缺少message或content字段。响应: {result}")
+        
+        content = result["choices"][0]["message"]["content"]
+        if content is None:
+            raise Exception("API返回的content为None")
+        
+        return content
+
+    def _make_api_call(self, prompt: str, model: Optional[str] = None, temperature: Optional[float] = None,
+                       max_retries: Optional[int] = None, timeout: Optional[float] = None) -> str:
+        """使用自定义API端点调用（参数按调用传递，未指定时使用实例默认值）"""
+        model = model or self.llm
+        temperature = self.temperature if temperature is None else temperature
+        max_retries = self.max_retries if max_retries is None else max_retries
+        timeout = self.timeout if timeout is None else timeout
+
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
         data = {
-            "model": self.llm,
+            "model": model,
             "messages": [{"role": "user", "content": prompt}],
-            "temperature": self.temperature,
+            "temperature": temperature,
             "stream": False
         }
 
-        for attempt in range(self.max_retries):
+        for attempt in range(max_retries):
             try:
-                response = requests.post(
-                    f"{self.endpoint}/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=self.timeout
-                )
+                # 只在HTTP请求期间占用并发名额，重试等待前已归还
+                with limit_slot(self.concurrency) as slot:
+                    try:
+                        response = self.session.post(
+                            f"{self.endpoint}/chat/completions",
+                            headers=headers,
+                            json=data,
+                            timeout=timeout
+                        )
+                    except requests.exceptions.Timeout:
+                        slot.mark(OVERLOAD)
+                        raise
+                    if is_overload_status(response.status_code):
+                        slot.mark(OVERLOAD)
                 response.raise_for_status()
 
                 result = response.json()
-                
-                # 检查响应格式
-                if "choices" not in result or not result["choices"]:
-                    raise Exception(f"API响应格式错误: 缺少choices字段或choices为空。响应: {result}")
-                
-                if "message" not in result["choices"][0] or "content" not in result["choices"][0]["message"]:
-                    raise Exception(f"API响应格式错误: 缺少message或content字段。响应: {result}")
-                
-                content = result["choices"][0]["message"]["content"]
-                if content is None:
-                    raise Exception("API返回的content为None")
-                
-                return content
+                return self._extract_content(result)
 
             except requests.exceptions.Timeout:
-                if attempt < self.max_retries - 1:
+                if attempt < max_retries - 1:
                     wait_time = 2 ** attempt
-                    print(f"API超时，{wait_time}秒后重试... (尝试 {attempt + 1}/{self.max_retries})")
+                    print(f"API超时，{wait_time}秒后重试... (尝试 {attempt + 1}/{max_retries})")
                     time.sleep(wait_time)
                     continue
                 else:
-                    raise Exception(f"API调用超时，已重试{self.max_retries}次")
+                    raise Exception(f"API调用超时，已重试{max_retries}次")
 
             except requests.exceptions.RequestException as e:
-                if attempt < self.max_retries - 1:
+                if attempt < max_retries - 1:
                     wait_time = 2 ** attempt
-                    print(f"API调用失败: {e}，{wait_time}秒后重试... (尝试 {attempt + 1}/{self.max_retries})")
+                    print(f"API调用失败: {e}，{wait_time}秒后重试... (尝试 {attempt + 1}/{max_retries})")
                     time.sleep(wait_time)
                     continue
                 else:
@@ -96,31 +127,110 @@ class LLMClient:
             use_reasoning_model: 是否使用推理模型，如果为True则使用Config.LLM_REASONING_MODEL
             **kwargs: 其他参数（temperature, max_retries, timeout等）
         """
+        # 参数按调用传递而不是临时修改实例属性，同一实例可被多个线程并发调用
+        model = self.config.LLM_REASONING_MODEL if use_reasoning_model else self.llm
+        return self._make_api_call(
+            prompt,
+            model=model,
+            temperature=kwargs.get('temperature', self.temperature),
+            max_retries=kwargs.get('max_retries', self.max_retries),
+            timeout=kwargs.get('timeout', self.timeout)
+        )
+
+    @staticmethod
+    def _parse_stream_line(line: str) -> Tuple[bool, Optional[str]]:
+        """解析上游chat/completions SSE中的一行
+
+        Returns:
+            (done, content): done表示收到[DONE]结束标记；content为本行的增量文本，
+            非data行、推理过程(reasoning_content)或空增量返回None
+        """
+        line = line.strip()
+        if not line.startswith("data:"):
+            return False, None
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            return True, None
+        try:
+            chunk = json.loads(payload)
+        except ValueError:
+            return False, None
+        if "error" in chunk:
+            raise Exception(f"流式API返回错误: {chunk['error']}")
+        choices = chunk.get("choices") or []
+        if not choices:
+            return False, None
+        delta = choices[0].get("delta") or {}
+        content = delta.get("content")
+        return False, content if content else None
+
+    def stream_response(self, prompt: str, use_reasoning_model: bool = False, **kwargs) -> Iterator[str]:
+        """流式获取LLM响应，逐段产出上游返回的增量文本
+
+        仅在收到第一段内容之前重试；开始输出后出错直接抛出异常，避免重复输出。
+
+        Args:
+            prompt: 提示词
+            use_reasoning_model: 是否使用推理模型，如果为True则使用Config.LLM_REASONING_MODEL
+            **kwargs: 其他参数（temperature, max_retries, timeout等），timeout为两段数据之间的最长等待时间
+        """
+        model = self.config.LLM_REASONING_MODEL if use_reasoning_model else self.llm
         temperature = kwargs.get('temperature', self.temperature)
         max_retries = kwargs.get('max_retries', self.max_retries)
         timeout = kwargs.get('timeout', self.timeout)
 
-        # 临时更新参数
-        original_temp = self.temperature
-        original_retries = self.max_retries
-        original_timeout = self.timeout
-        original_llm = self.llm
-        self.temperature = temperature
-        self.max_retries = max_retries
-        self.timeout = timeout
-        
-        # 如果使用推理模型，临时替换模型名称
-        if use_reasoning_model:
-            self.llm = self.config.LLM_REASONING_MODEL
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
 
-        try:
-            return self._make_api_call(prompt)
-        finally:
-            # 恢复原始参数
-            self.temperature = original_temp
-            self.max_retries = original_retries
-            self.timeout = original_timeout
-            self.llm = original_llm
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "stream": True
+        }
+
+        for attempt in range(max_retries):
+            started = False
+            try:
+                with self.session.post(
+                    f"{self.endpoint}/chat/completions",
+                    headers=headers,
+                    json=data,
+                    timeout=timeout,
+                    stream=True
+                ) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not line:
+                            continue
+                        done, content = self._parse_stream_line(line)
+                        if done:
+                            break
+                        if content:
+                            started = True
+                            yield content
+                if not started:
+                    raise Exception("流式API未返回任何内容")
+                return
+
+            except requests.exceptions.Timeout:
+                if not started and attempt < max_retries - 1:
+                    wait_time = 2 ** attempt
+                    print(f"流式API超时，{wait_time}秒后重试... (尝试 {attempt + 1}/{max_retries})")
+                    time.sleep(wait_time)
+                    continue
+                raise Exception(f"流式API调用超时，已重试{attempt + 1}次")
+
+            except requests.exceptions.RequestException as e:
+                if not started and attempt < max_retries - 1:
+                    wait_time = 2 ** attempt
+                    print(f"流式API调用失败: {e}，{wait_time}秒后重试... (尝试 {attempt + 1}/{max_retries})")
+                    time.sleep(wait_time)
+                    continue
+                raise Exception(f"流式API调用失败: {e}")
 
     def validate_config(self) -> bool:
         """验证配置是否正确"""
@@ -0,0 +1,235 @@
+"""
+本地论文库 - SQLite + FTS5全文索引，保存检索到的论文元数据
+支持按相关度（BM25）、发表时间、引用数从本地检索，远程API不可用时也能返回结果
+"""
+import re
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence
+from config import Config
+from embedding_cache import resolve_cache_path
+
+
+# 支持的排序方式
+SORT_RELEVANCE = "relevance"
+SORT_NEWEST = "newest"
+SORT_CITATIONS = "citations"
+
+_ORDER_BY = {
+    SORT_RELEVANCE: "bm25(papers_fts)",
+    SORT_NEWEST: "p.publication_date IS NULL, p.publication_date DESC, p.year DESC",
+    SORT_CITATIONS: "p.citation_count IS NULL, p.citation_count DESC",
+}
+
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def _phrase_tokens(text: str) -> List[str]:
+    """与FTS5 unicode61分词近似的小写词元"""
+    return _WORD_PATTERN.findall((text or "").lower())
+
+
+def count_matched_keywords(keywords: Sequence[str], text: str) -> int:
+    """统计有多少个关键词短语（词元连续出现）出现在文本中"""
+    tokens = _phrase_tokens(text)
+    joined = " " + " ".join(tokens) + " "
+    matched = 0
+    for keyword in keywords:
+        phrase = _phrase_tokens(str(keyword))
+        if phrase and f" {' '.join(phrase)} " in joined:
+            matched += 1
+    return matched
+
+
+def build_match_query(keywords: Sequence[str]) -> str:
+    """将关键词列表转换为FTS5查询：每个关键词作为短语，关键词之间为OR"""
+    phrases = []
+    for keyword in keywords:
+        keyword = " ".join(str(keyword).replace('"', " ").split())
+        if keyword:
+            phrases.append(f'"{keyword}"')
+    return " OR ".join(phrases)
+
+
+class PaperStore:
+    """本地论文库（线程安全）
+
+    papers 表以 paperId 为主键保存标题、摘要和排序字段，papers_fts 是对标题和摘要
+    建立的FTS5外部内容索引，通过触发器与 papers 表保持同步。
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                paper_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                abstract TEXT NOT NULL DEFAULT '',
+                year INTEGER,
+                publication_date TEXT,
+                citation_count INTEGER,
+                updated_at REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                title, abstract, content='papers', content_rowid='rowid'
+            );
+            CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+                INSERT INTO papers_fts(rowid, title, abstract) VALUES (new.rowid, new.title, new.abstract);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+                INSERT INTO papers_fts(papers_fts, rowid, title, abstract) VALUES ('delete', old.rowid, old.title, old.abstract);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+                INSERT INTO papers_fts(papers_fts, rowid, title, abstract) VALUES ('delete', old.rowid, old.title, old.abstract);
+                INSERT INTO papers_fts(rowid, title, abstract) VALUES (new.rowid, new.title, new.abstract);
+            END;
+        """)
+        self._conn.commit()
+
+        self.local_queries = 0
+        self.local_hits = 0
+
+    def add_papers(self, papers: Sequence[Dict]) -> int:
+        """写入论文（按paperId合并：保留非空摘要、较新的排序字段）
+
+        Args:
+            papers: Semantic Scholar格式的论文列表
+
+        Returns:
+            写入的论文数
+        """
+        rows = []
+        now = time.time()
+        for paper in papers:
+            paper_id = paper.get('paperId')
+            title = (paper.get('title') or '').strip()
+            if not paper_id or not title:
+                continue
+            rows.append((
+                paper_id,
+                title,
+                paper.get('abstract') or '',
+                paper.get('year'),
+                paper.get('publicationDate'),
+                paper.get('citationCount'),
+                now
+            ))
+        if not rows:
+            return 0
+
+        with self._lock:
+            try:
+                self._conn.executemany("""
+                    INSERT INTO papers (paper_id, title, abstract, year, publication_date, citation_count, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(paper_id) DO UPDATE SET
+                        title = excluded.title,
+                        abstract = CASE WHEN excluded.abstract != '' THEN excluded.abstract ELSE papers.abstract END,
+                        year = COALESCE(excluded.year, papers.year),
+                        publication_date = COALESCE(excluded.publication_date, papers.publication_date),
+                        citation_count = COALESCE(excluded.citation_count, papers.citation_count),
+                        updated_at = excluded.updated_at
+                """, rows)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  本地论文库写入失败: {e}")
+                return 0
+        return len(rows)
+
+    def search(self, keywords: Sequence[str], sort: str = SORT_RELEVANCE, limit: int = 5,
+               min_keyword_matches: int = 1, max_age: Optional[float] = None) -> List[Dict]:
+        """从本地全文索引检索论文
+
+        Args:
+            keywords: 关键词列表（任一关键词短语出现在标题或摘要中即为候选）
+            sort: 排序方式，relevance / newest / citations
+            limit: 最多返回的论文数
+            min_keyword_matches: 标题和摘要中至少出现的关键词短语数（不超过关键词数），
+                避免只共享一个泛化关键词（如 "deep learning"）的论文被当作命中
+            max_age: 只返回最近 max_age 秒内由远程检索写入或更新过的论文，为None时不限制
+
+        Returns:
+            Semantic Scholar格式的论文列表
+        """
+        match_query = build_match_query(keywords)
+        if not match_query or limit <= 0:
+            return []
+
+        required = min(max(1, min_keyword_matches), len(keywords))
+        conditions = "papers_fts MATCH ?"
+        params: list = [match_query]
+        if max_age is not None:
+            conditions += " AND p.updated_at >= ?"
+            params.append(time.time() - max_age)
+        # 需要按关键词数过滤时多取一些候选，过滤后再截取
+        params.append(limit if required <= 1 else limit * 20)
+
+        sql = (
+            "SELECT p.paper_id, p.title, p.abstract, p.year, p.publication_date, p.citation_count "
+            "FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid "
+            f"WHERE {conditions} ORDER BY {_ORDER_BY[sort]} LIMIT ?"
+        )
+        with self._lock:
+            self.local_queries += 1
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                print(f"⚠️  本地论文库检索失败: {e}")
+                return []
+            if required > 1:
+                rows = [row for row in rows if count_matched_keywords(keywords, f"{row[1]} {row[2]}") >= required][:limit]
+            if rows:
+                self.local_hits += 1
+
+        return [
+            {
+                'paperId': paper_id,
+                'title': title,
+                'abstract': abstract,
+                'year': year,
+                'publicationDate': publication_date,
+                'citationCount': citation_count
+            }
+            for paper_id, title, abstract, year, publication_date, citation_count in rows
+        ]
+
+    def get_stats(self) -> dict:
+        """获取论文库统计"""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+            return {
+                "papers": count,
+                "local_queries": self.local_queries,
+                "local_hits": self.local_hits
+            }
+
+
+# 进程内共享的论文库实例
+_store: Optional[PaperStore] = None
+_store_lock = threading.Lock()
+_store_failed = False
+
+
+def get_paper_store() -> Optional[PaperStore]:
+    """获取共享的本地论文库，未启用或初始化失败（如SQLite不支持FTS5）时返回None"""
+    global _store, _store_failed
+    if Config.PAPER_STORE_MODE == "off" or _store_failed:
+        return None
+
+    with _store_lock:
+        if _store is None:
+            path = resolve_cache_path(Config.PAPER_STORE_PATH)
+            if not path:
+                return None
+            try:
+                _store = PaperStore(path)
+            except sqlite3.Error as e:
+                print(f"⚠️  本地论文库初始化失败: {e}，仅使用远程检索")
+                _store_failed = True
+                return None
+        return _store
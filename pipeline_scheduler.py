@@ -0,0 +1,129 @@
+"""
+Pipeline调度器 - 将流水线表示为阶段依赖图（DAG），依赖满足的阶段立即并发执行
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Tuple
+
+
+# 阶段函数签名：func(results, emit) -> 结果
+#   results: 已完成阶段的结果字典 {阶段名: 结果}
+#   emit: 发送阶段内进度事件的回调
+StageFunc = Callable[[Dict[str, Any], Callable[[Any], None]], Awaitable[Any]]
+
+
+class PipelineStage:
+    """流水线阶段"""
+
+    def __init__(self, name: str, func: StageFunc, deps: Iterable[str] = (), required: bool = True):
+        """
+        Args:
+            name: 阶段名称（在同一调度器内唯一）
+            func: 阶段协程函数
+            deps: 依赖的阶段名称，全部完成后才会启动本阶段
+            required: 是否为必需阶段；非必需阶段失败只记录警告，
+                      且所有必需阶段完成后仍未结束的非必需阶段会被取消
+        """
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.required = required
+
+
+class PipelineScheduler:
+    """基于依赖图的异步阶段调度器
+
+    run() 是一个异步生成器，按发生顺序产出事件：
+        ("STAGE_DONE", 阶段名, 结果)   - 阶段完成
+        ("PROGRESS", 阶段名, 内容)     - 阶段通过emit发送的进度
+        ("HEARTBEAT",)                - 超过心跳间隔没有任何事件
+    必需阶段抛出的异常会取消其余阶段并原样抛出；调用方提前结束迭代时同样会取消未完成的阶段。
+    """
+
+    def __init__(self, stages: Iterable[PipelineStage], heartbeat_interval: float = 25):
+        self.stages: Dict[str, PipelineStage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"重复的阶段名称: {stage.name}")
+            self.stages[stage.name] = stage
+        self.heartbeat_interval = heartbeat_interval
+        self.results: Dict[str, Any] = {}
+        self._validate()
+
+    def _validate(self):
+        """检查依赖是否存在以及是否有环"""
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"阶段 {stage.name} 依赖未知阶段: {dep}")
+
+        visiting, visited = set(), set()
+
+        def visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"阶段依赖存在环: {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def _run_stage(self, stage: PipelineStage, queue: asyncio.Queue):
+        """执行单个阶段，并把结果或异常放入事件队列"""
+        def emit(payload: Any):
+            queue.put_nowait(("PROGRESS", stage.name, payload))
+
+        try:
+            result = await stage.func(self.results, emit)
+            queue.put_nowait(("STAGE_DONE", stage.name, result))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            queue.put_nowait(("STAGE_FAILED", stage.name, e))
+
+    async def run(self) -> AsyncIterator[Tuple]:
+        """执行整个依赖图，按完成顺序产出事件"""
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks: Dict[str, asyncio.Task] = {}
+        waiting = set(self.stages)
+        remaining_required = {name for name, stage in self.stages.items() if stage.required}
+
+        def start_ready():
+            for name in list(waiting):
+                stage = self.stages[name]
+                if all(dep in self.results for dep in stage.deps):
+                    waiting.discard(name)
+                    tasks[name] = asyncio.create_task(self._run_stage(stage, queue))
+
+        start_ready()
+        try:
+            while remaining_required:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ("HEARTBEAT",)
+                    continue
+
+                kind, name = event[0], event[1]
+                if kind == "STAGE_DONE":
+                    self.results[name] = event[2]
+                    remaining_required.discard(name)
+                    start_ready()
+                    yield event
+                elif kind == "STAGE_FAILED":
+                    if self.stages[name].required:
+                        raise event[2]
+                    # 非必需阶段失败时以None作为结果，不阻塞依赖它的阶段
+                    print(f"⚠️  阶段 {name} 执行失败: {event[2]}，跳过此阶段")
+                    self.results[name] = None
+                    start_ready()
+                else:
+                    yield event
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
@@ -385,6 +385,68 @@ Please respond in English."""
     return prompt
 
 
+# 批量总结输出中每篇论文总结前的分隔行，{index} 为论文在本批中的编号（从1开始）
+BATCH_SUMMARY_MARKER = "=== PAPER {index} ==="
+
+
+def get_batch_paper_summary_prompt(papers: list, query: str, language: str = 'en') -> str:
+    """批量论文总结Prompt：多篇论文共用一份指令，按分隔行逐篇输出结构化总结"""
+    papers_text = ""
+    for i, paper in enumerate(papers, 1):
+        title = paper.get('title', '')
+        abstract = paper.get('abstract', '') or ''
+        if language == 'zh':
+            papers_text += f"\n论文 {i}:\n标题：{title}\n摘要：{abstract}\n"
+        else:
+            papers_text += f"\nPaper {i}:\nTitle: {title}\nAbstract: {abstract}\n"
+    marker = BATCH_SUMMARY_MARKER.format(index="N")
+    
+    if language == 'zh':
+        prompt = f"""你是一位学术研究专家。请分别对以下{len(papers)}篇论文进行结构化总结，提取与用户查询相关的关键信息。
+
+用户查询：{query}
+
+论文列表：
+{papers_text}
+请为每篇论文提供结构化总结，包括：
+1. 标题
+2. 摘要
+3. 主要方法
+4. 核心贡献
+5. 主要结论
+6. 与用户查询的相关性
+
+输出格式要求（CRITICAL）：
+- 按论文编号顺序输出，每篇论文的总结前单独一行写分隔行 {marker}（N为论文编号，例如 {BATCH_SUMMARY_MARKER.format(index=1)}）
+- 每篇论文都必须输出，不要合并或省略任何论文
+- 分隔行之外不要输出其他说明文字
+
+请使用中文回答。"""
+    else:
+        prompt = f"""You are an expert in academic research. Please provide a separate structured summary for each of the following {len(papers)} papers, extracting key information relevant to the user query.
+
+User Query: {query}
+
+Paper List:
+{papers_text}
+For each paper, provide a structured summary including:
+1. Title
+2. Abstract
+3. Main Methods
+4. Core Contributions
+5. Main Conclusions
+6. Relevance to User Query
+
+Output Format (CRITICAL):
+- Output the papers in numbered order. Before each paper's summary, write the separator line {marker} on its own line (N is the paper number, e.g. {BATCH_SUMMARY_MARKER.format(index=1)})
+- Every paper must be summarized; do not merge or skip papers
+- Do not output any other text outside the per-paper summaries
+
+Please respond in English."""
+    
+    return prompt
+
+
 def get_topic_clustering_prompt(summaries: list, language: str = 'en') -> str:
     """主题聚类Prompt"""
     summaries_text = ""
@@ -423,8 +485,36 @@ Please respond in English, output in structured format."""
     return prompt
 
 
+def get_topic_naming_prompt(topics: list, titles: list, language: str = 'en') -> str:
+    """主题命名Prompt（本地聚类结果，每个主题提供关键词和至多3篇论文标题）"""
+    # 分组标签与输出语言一致，避免混合语言的输入让模型用另一种语言命名
+    keywords_label, papers_label = ("关键词", "论文") if language == 'zh' else ("Keywords", "Papers")
+    topics_text = ""
+    for i, topic in enumerate(topics, 1):
+        keywords = ", ".join(topic.get('terms', []))
+        paper_titles = "; ".join(titles[index] for index in topic.get('members', [])[:3])
+        topics_text += f"\n{i}. {keywords_label}: {keywords}\n   {papers_label}: {paper_titles}\n"
+    
+    if language == 'zh':
+        prompt = f"""请为以下每组论文起一个简短的研究主题名称（不超过15个字）。
+
+论文分组：
+{topics_text}
+
+每行输出一个主题，格式为"序号. 名称"，不要输出其他内容。"""
+    else:
+        prompt = f"""Give each of the following paper groups a short research topic name (at most 8 words).
+
+Paper groups:
+{topics_text}
+
+Output one topic per line in the format "number. name", and nothing else."""
+    
+    return prompt
+
+
 def get_trend_analysis_prompt(papers: list, language: str = 'en') -> str:
-    """趋势分析Prompt"""
+    """趋势分析Prompt（论文带有发表年份、引用数时一并提供，便于分析时间维度）"""
     papers_text = ""
     for i, paper in enumerate(papers[:15], 1):
         title = paper.get('title', '')
@@ -432,7 +522,12 @@ def get_trend_analysis_prompt(papers: list, language: str = 'en') -> str:
         # 限制摘要长度为200字符，避免prompt过长
         if len(abstract) > 200:
             abstract = abstract[:200] + "..."
-        papers_text += f"\n论文 {i}:\n标题: {title}\n摘要: {abstract}\n"
+        papers_text += f"\n论文 {i}:\n标题: {title}\n"
+        if paper.get('year'):
+            papers_text += f"年份: {paper['year']}\n"
+        if paper.get('citationCount') is not None:
+            papers_text += f"引用数: {paper['citationCount']}\n"
+        papers_text += f"摘要: {abstract}\n"
     
     if language == 'zh':
         prompt = f"""你是一位学术研究专家。请分析以下论文的研究趋势和热点。
@@ -441,8 +536,8 @@ def get_trend_analysis_prompt(papers: list, language: str = 'en') -> str:
 {papers_text}
 
 请：
-1. 分析研究趋势（时间维度）
-2. 识别研究热点和新兴方向
+1. 分析研究趋势（时间维度，结合论文的发表年份）
+2. 识别研究热点和新兴方向（结合引用数区分奠基性工作与新兴工作）
 3. 预测未来可能的发展方向
 
 请使用中文回答。"""
@@ -453,8 +548,8 @@ Paper List:
 {papers_text}
 
 Please:
-1. Analyze research trends (temporal dimension)
-2. Identify research hotspots and emerging directions
+1. Analyze research trends (temporal dimension, using the publication years)
+2. Identify research hotspots and emerging directions (using citation counts to distinguish foundational work from emerging work)
 3. Predict possible future developments
 
 Please respond in English."""
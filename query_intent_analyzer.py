@@ -1,8 +1,9 @@
 """
 查询意图分析器 - 深度分析查询意图，消除歧义
 """
-from typing import Dict
+from typing import Dict, Optional
 from llm_client import LLMClient
+from async_llm_client import AsyncLLMClient, get_response_async
 from prompt_template import get_query_intent_analysis_prompt
 from config import Config
 
@@ -10,8 +11,9 @@ from config import Config
 class QueryIntentAnalyzer:
     """查询意图分析器"""
     
-    def __init__(self, llm_client: LLMClient, language: str = 'en'):
+    def __init__(self, llm_client: LLMClient, language: str = 'en', async_llm_client: Optional[AsyncLLMClient] = None):
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
         self.language = language
         self.config = Config
     
@@ -43,6 +45,18 @@ class QueryIntentAnalyzer:
         
         return intent_result
     
+    async def analyze_intent_async(self, query: str) -> Dict[str, str]:
+        """深度分析查询意图（异步版本）"""
+        prompt = get_query_intent_analysis_prompt(query, self.language)
+        response = await get_response_async(
+            self.llm_client,
+            self.async_llm_client,
+            prompt,
+            use_reasoning_model=True,
+            timeout=self.config.DOMAIN_ANALYSIS_TIMEOUT * 2
+        )
+        return self._parse_intent_response(response)
+    
     def _parse_intent_response(self, response: str) -> Dict[str, str]:
         """解析意图分析响应，提取结构化信息"""
         intent_result = {
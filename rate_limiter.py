@@ -0,0 +1,257 @@
+"""
+限流器 - 令牌桶 + FIFO排队 + 最长等待预算
+可选通过SQLite文件在多个进程（如多个uvicorn worker）之间共享令牌状态
+"""
+import time
+import sqlite3
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+# 共享状态被其他进程锁定时的重试次数和首次退避时间（秒）
+_LOCKED_RETRIES = 3
+_LOCKED_BACKOFF = 0.02
+
+
+def _is_locked_error(error: sqlite3.OperationalError) -> bool:
+    """SQLite锁冲突（database is locked / busy）属于暂时性错误"""
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class TokenBucketLimiter:
+    """令牌桶限流器（线程安全）
+
+    - 令牌以 rate 个/秒的速度补充，最多积累 capacity 个
+    - 等待者按到达顺序排队，只有队首可以取走令牌
+    - 预计等待时间超过 max_wait 时立即放弃，由调用方走降级路径
+    - state_path 非空时令牌状态保存在SQLite中，同一文件的所有进程共享一个令牌桶
+    """
+
+    def __init__(self, name: str, rate: float, capacity: int = 1, max_wait: float = 10.0, state_path: Optional[str] = None):
+        """
+        Args:
+            name: 限流器名称（同一SQLite文件中区分不同的令牌桶）
+            rate: 每秒补充的令牌数
+            capacity: 令牌桶容量（允许的突发请求数）
+            max_wait: 默认最长等待时间（秒）
+            state_path: 跨进程共享状态的SQLite文件路径，为None时只在进程内限流
+        """
+        self.name = name
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(1, capacity)
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._queue: deque = deque()
+        self._tokens = float(self.capacity)
+        self._updated_at = time.time()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.granted = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+        if state_path:
+            try:
+                self._conn = sqlite3.connect(state_path, timeout=5, check_same_thread=False, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS token_buckets ("
+                    "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+                )
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (self.name, float(self.capacity), time.time())
+                )
+            except sqlite3.Error as e:
+                print(f"⚠️  限流器共享状态初始化失败: {e}，仅在进程内限流")
+                self._conn = None
+
+    def acquire(self, max_wait: Optional[float] = None) -> bool:
+        """获取一个令牌，必要时排队等待
+
+        Args:
+            max_wait: 最长等待时间（秒），默认使用构造时的 max_wait
+
+        Returns:
+            是否获取成功；超过等待预算时返回False
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        start = time.monotonic()
+        deadline = start + max_wait
+        ticket = object()
+
+        with self._cond:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    position = self._queue.index(ticket)
+                    if position == 0 and self._take():
+                        self._record(True, time.monotonic() - start)
+                        return True
+
+                    # 排在前面的等待者都拿到令牌后，自己还需要等待的时间
+                    expected_wait = max(0.0, (position + 1 - self._available()) / self.rate)
+                    remaining = deadline - time.monotonic()
+                    if expected_wait > remaining:
+                        self._record(False, time.monotonic() - start)
+                        return False
+                    self._cond.wait(timeout=max(min(expected_wait, remaining), 0.01))
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def penalize(self, retry_after: Optional[float] = None):
+        """收到上游限流响应（如HTTP 429）时清空令牌，并在 retry_after 秒内不再发放"""
+        with self._cond:
+            self.throttled += 1
+            delay = retry_after if retry_after is not None else 1.0 / self.rate
+            # 令牌数可以为负值：补充到1个令牌恰好需要 delay 秒
+            self._store(min(self._available(), 1 - delay * self.rate), time.time())
+            self._cond.notify_all()
+
+    def get_stats(self) -> dict:
+        """获取限流统计（等待时间单位为秒）"""
+        with self._cond:
+            acquisitions = self.granted + self.rejected
+            return {
+                "name": self.name,
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "max_wait": self.max_wait,
+                "tokens": round(self._available(), 3),
+                "queued": len(self._queue),
+                "granted": self.granted,
+                "rejected": self.rejected,
+                "throttled": self.throttled,
+                "total_wait_seconds": round(self.total_wait, 3),
+                "avg_wait_seconds": round(self.total_wait / acquisitions, 3) if acquisitions else 0.0,
+                "max_wait_seconds": round(self.max_observed_wait, 3),
+                "shared": self._conn is not None
+            }
+
+    def _record(self, granted: bool, waited: float):
+        """记录一次获取结果（调用方需持有锁）"""
+        if granted:
+            self.granted += 1
+        else:
+            self.rejected += 1
+        self.total_wait += waited
+        self.max_observed_wait = max(self.max_observed_wait, waited)
+
+    def _refill(self, tokens: float, updated_at: float, now: float) -> float:
+        return min(float(self.capacity), tokens + (now - updated_at) * self.rate)
+
+    def _available(self) -> float:
+        """当前可用令牌数（调用方需持有锁）"""
+        tokens, updated_at = self._load()
+        return self._refill(tokens, updated_at, time.time())
+
+    def _take(self) -> bool:
+        """尝试取走一个令牌（调用方需持有锁）
+
+        共享状态被其他进程暂时锁定时短暂退避重试，仍失败时本次改用进程内令牌桶，
+        保留连接，之后的调用继续跨进程限流。
+        """
+        if self._conn is None:
+            return self._take_local()
+
+        for attempt in range(_LOCKED_RETRIES + 1):
+            try:
+                return self._take_shared()
+            except sqlite3.OperationalError as e:
+                if not _is_locked_error(e):
+                    return self._disable_shared(e)
+                if attempt < _LOCKED_RETRIES:
+                    time.sleep(_LOCKED_BACKOFF * 2 ** attempt)
+                    continue
+                print(f"⚠️  限流器共享状态被锁定: {e}，本次改为进程内限流")
+                return self._take_local()
+            except (sqlite3.Error, TypeError) as e:
+                return self._disable_shared(e)
+
+    def _take_local(self) -> bool:
+        """从进程内令牌桶取走一个令牌（调用方需持有锁）"""
+        now = time.time()
+        tokens = self._refill(self._tokens, self._updated_at, now)
+        if tokens < 1:
+            return False
+        self._tokens, self._updated_at = tokens - 1, now
+        return True
+
+    def _take_shared(self) -> bool:
+        """从SQLite共享令牌桶取走一个令牌（调用方需持有锁），读写失败时抛出异常"""
+        # BEGIN IMMEDIATE 获取写锁，保证多进程之间的读-改-写是原子的
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            tokens, updated_at = self._conn.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            tokens = self._refill(tokens, updated_at, now)
+            taken = tokens >= 1
+            if taken:
+                tokens -= 1
+            self._conn.execute(
+                "UPDATE token_buckets SET tokens = ?, updated_at = ? WHERE name = ?", (tokens, now, self.name)
+            )
+            self._conn.execute("COMMIT")
+            return taken
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _disable_shared(self, error: Exception) -> bool:
+        """共享状态不可用（非暂时性错误）：之后只在进程内限流（调用方需持有锁）"""
+        print(f"⚠️  限流器共享状态读写失败: {error}，改为进程内限流")
+        self._conn = None
+        return self._take_local()
+
+    def _load(self) -> tuple:
+        """读取令牌状态（调用方需持有锁）"""
+        if self._conn is not None:
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM token_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                if row:
+                    return row
+            except sqlite3.Error:
+                pass
+        return self._tokens, self._updated_at
+
+    def _store(self, tokens: float, updated_at: float):
+        """写入令牌状态（调用方需持有锁）"""
+        self._tokens, self._updated_at = tokens, updated_at
+        if self._conn is not None:
+            try:
+                self._conn.execute(
+                    "UPDATE token_buckets SET tokens = ?, updated_at = ? WHERE name = ?", (tokens, updated_at, self.name)
+                )
+            except sqlite3.Error as e:
+                print(f"⚠️  限流器共享状态写入失败: {e}")
+
+
+# 进程内共享的限流器实例，按名称区分
+_limiters: Dict[str, TokenBucketLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, capacity: int = 1, max_wait: float = 10.0, state_path: Optional[str] = None) -> TokenBucketLimiter:
+    """获取指定名称的共享限流器，首次调用时按参数创建"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = TokenBucketLimiter(name, rate, capacity, max_wait, state_path)
+            _limiters[name] = limiter
+        return limiter
+
+
+def get_all_rate_limiter_stats() -> Dict[str, dict]:
+    """获取所有共享限流器的统计"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.get_stats() for limiter in limiters}
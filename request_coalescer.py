@@ -0,0 +1,129 @@
+"""
+请求合并 - 相同查询的并发请求共享同一条正在执行的流水线（single-flight）
+后加入的请求先收到已输出事件的回放，再继续接收实时事件
+"""
+import asyncio
+import unicodedata
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+
+# 查询末尾不影响语义的标点
+_TRAILING_PUNCTUATION = " ?？.。!！;；,，"
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询：NFKC + 折叠空白 + 忽略大小写和末尾标点"""
+    return " ".join(unicodedata.normalize("NFKC", query).split()).casefold().rstrip(_TRAILING_PUNCTUATION)
+
+
+class _Flight:
+    """一次正在执行的流水线及其已输出的事件"""
+
+    def __init__(self):
+        self.events: List[str] = []
+        self.done = False
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._updated = asyncio.Event()
+
+    def append(self, event: str):
+        self.events.append(event)
+        self._notify()
+
+    def finish(self):
+        self.done = True
+        self._notify()
+
+    def _notify(self):
+        # 唤醒当前所有等待者，并为下一批等待者换一个新的Event
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait(self):
+        await self._updated.wait()
+
+
+class RequestCoalescer:
+    """按（流水线版本, 规范化查询）合并并发请求
+
+    第一个请求启动一个独立的生产者任务执行流水线，所有订阅者（包括第一个请求）都从
+    事件缓冲区读取，因此任意一个客户端断开不会影响其他客户端。所有订阅者都断开时
+    取消生产者任务；流水线结束后移除记录，之后的同名请求会重新执行。
+    """
+
+    def __init__(self, version: str):
+        """
+        Args:
+            version: 流水线版本（如 "v1"），不同版本的相同查询不会合并
+        """
+        self.version = version
+        self._flights: Dict[str, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def make_key(self, query: str) -> str:
+        """生成合并键"""
+        return f"{self.version}\x00{normalize_query(query)}"
+
+    async def subscribe(self, query: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """订阅查询对应的流水线输出
+
+        Args:
+            query: 用户查询
+            factory: 没有进行中的流水线时调用，返回产出SSE数据的异步迭代器
+
+        Yields:
+            SSE数据（先回放已输出的事件，再转发实时事件）
+        """
+        key = self.make_key(query)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.create_task(self._produce(key, flight, factory))
+            self._flights[key] = flight
+            self.started += 1
+        else:
+            self.coalesced += 1
+            print(f"🔗 合并到进行中的请求（{self.version}）: {query[:50]}，已输出 {len(flight.events)} 个事件")
+
+        flight.subscribers += 1
+        try:
+            index = 0
+            while True:
+                while index < len(flight.events):
+                    yield flight.events[index]
+                    index += 1
+                if flight.done:
+                    break
+                await flight.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # 所有客户端都已断开，停止流水线
+                flight.task.cancel()
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    async def _produce(self, key: str, flight: _Flight, factory: Callable[[], AsyncIterator[str]]):
+        """执行流水线并把输出写入事件缓冲区"""
+        try:
+            async for event in factory():
+                flight.append(event)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"⚠️  合并请求的流水线执行失败: {e}")
+        finally:
+            flight.finish()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def get_stats(self) -> dict:
+        """获取合并统计"""
+        return {
+            "version": self.version,
+            "in_flight": len(self._flights),
+            "subscribers": sum(flight.subscribers for flight in self._flights.values()),
+            "started": self.started,
+            "coalesced": self.coalesced
+        }
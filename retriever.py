@@ -1,18 +1,103 @@
+import json
 import requests
 import time
 import numpy as np
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from config import Config
 from embedding_client import EmbeddingClient
+from embedding_cache import resolve_cache_path
+from rate_limiter import get_rate_limiter
+from paper_store import SORT_CITATIONS, SORT_NEWEST, SORT_RELEVANCE, get_paper_store
+from request_coalescer import normalize_query
+from ttl_cache import MISS, NEGATIVE, get_ttl_cache
+from hedging import get_hedger
+from vector_utils import IncrementalReranker, normalize_rows, top_k_indices
+from bm25 import bm25_scores, reciprocal_rank_fusion, tokenize
+from dedup import deduplicate_papers
+
+try:
+    import orjson
+except ImportError:  # 可选依赖：未安装时使用标准库json解析
+    orjson = None
+
+
+def loads_json(content: bytes):
+    """解析JSON响应体，安装了orjson时使用orjson"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def decode_abstract_inverted_index(inverted_index: Dict[str, List[int]]) -> str:
+    """将OpenAlex的abstract_inverted_index（词 -> 位置列表）还原为摘要文本
+
+    按最大位置预分配词数组，直接按位置填入，不再构建位置字典和排序。
+    """
+    max_position = max(map(max, filter(None, inverted_index.values())), default=-1)
+    if max_position < 0:
+        return ''
+    words = [None] * (max_position + 1)
+    for word, positions in inverted_index.items():
+        for position in positions:
+            words[position] = word
+    return ' '.join(filter(None, words))
+
+
+# _request_semantic_scholar 的特殊返回值：本地限流预算耗尽，未真正请求失败（不写负缓存）
+_RATE_LIMITED = object()
 
 
 class PaperRetriever:
     """论文检索器 - 基于Semantic Scholar API，失败时fallback到OpenAlex"""
 
-    def __init__(self):
+    # Semantic Scholar返回的字段（year/publicationDate/citationCount用于本地论文库排序）
+    S2_FIELDS = "title,abstract,paperId,year,publicationDate,citationCount"
+    # OpenAlex的select字段投影：只返回格式转换需要的字段（publication_date/cited_by_count用于本地论文库排序）
+    OPENALEX_SELECT = "id,title,abstract_inverted_index,publication_year,publication_date,cited_by_count"
+    # 扩展投影额外返回的字段（OPENALEX_RICH_FIELDS开启时）
+    OPENALEX_RICH_SELECT = "doi"
+
+    def __init__(self, embedding_client: Optional[EmbeddingClient] = None, init_embedding: bool = True):
+        """
+        Args:
+            embedding_client: 共享的embedding客户端；为None且init_embedding为True时自行创建
+            init_embedding: 未传入embedding_client时是否自行创建（传False表示不做语义重排序）
+        """
         self.config = Config
-        self.embedding_client = None
-        self._init_embedding_client()
+        self.embedding_client = embedding_client
+        if self.embedding_client is None and init_embedding:
+            self._init_embedding_client()
+        # 所有Semantic Scholar请求共用一个令牌桶
+        self.s2_limiter = get_rate_limiter(
+            "semantic_scholar",
+            rate=self.config.SEMANTIC_SCHOLAR_RATE_LIMIT,
+            capacity=self.config.SEMANTIC_SCHOLAR_BURST,
+            max_wait=self.config.SEMANTIC_SCHOLAR_MAX_WAIT,
+            state_path=resolve_cache_path(self.config.SEMANTIC_SCHOLAR_RATE_LIMIT_PATH)
+        )
+        # Semantic Scholar与OpenAlex的对冲请求（未启用时为None，按原流程先S2后fallback）
+        self.s2_hedger = None
+        if self.config.RETRIEVAL_HEDGE_ENABLED:
+            self.s2_hedger = get_hedger(
+                "semantic_scholar",
+                min_delay=self.config.RETRIEVAL_HEDGE_MIN_DELAY,
+                max_delay=self.config.RETRIEVAL_HEDGE_MAX_DELAY,
+                quantile=self.config.RETRIEVAL_HEDGE_QUANTILE,
+                grace=self.config.RETRIEVAL_HEDGE_GRACE_MS / 1000,
+                deadline=self.config.RETRIEVAL_HEDGE_DEADLINE
+            )
+        # 远程检索结果缓存（未启用时为None）
+        self.retrieval_cache = None
+        if self.config.RETRIEVAL_CACHE_ENABLED:
+            self.retrieval_cache = get_ttl_cache(
+                "retrieval",
+                max_entries=self.config.RETRIEVAL_CACHE_MAX_ENTRIES,
+                ttl=self.config.RETRIEVAL_CACHE_TTL,
+                negative_ttl=self.config.RETRIEVAL_CACHE_NEGATIVE_TTL,
+                disk_path=resolve_cache_path(self.config.RETRIEVAL_CACHE_PATH)
+            )
+        # 本地论文库（未启用时为None）
+        self.paper_store = get_paper_store()
         # OpenAlex API headers
         self.openalex_headers = {
             'User-Agent': 'ICAIS2025-LiteratureReview/1.0 ( https://github.com/your-repo )'
@@ -33,14 +118,7 @@ class PaperRetriever:
         abstract = ''
         if 'abstract_inverted_index' in openalex_work and openalex_work['abstract_inverted_index']:
             try:
-                inverted_index = openalex_work['abstract_inverted_index']
-                pos_to_word = {}
-                for word, positions in inverted_index.items():
-                    for pos in positions:
-                        pos_to_word[pos] = word
-                if pos_to_word:
-                    sorted_positions = sorted(pos_to_word.keys())
-                    abstract = ' '.join([pos_to_word[pos] for pos in sorted_positions])
+                abstract = decode_abstract_inverted_index(openalex_work['abstract_inverted_index'])
             except Exception as e:
                 print(f"⚠️  转换 OpenAlex 摘要失败: {e}")
                 abstract = ''
@@ -55,14 +133,50 @@ class PaperRetriever:
         elif not paper_id:
             paper_id = title
         
-        return {
+        paper = {
             'paperId': paper_id,
             'title': title,
-            'abstract': abstract
+            'abstract': abstract,
+            'year': openalex_work.get('publication_year'),
+            'publicationDate': openalex_work.get('publication_date'),
+            'citationCount': openalex_work.get('cited_by_count')
         }
+        if openalex_work.get('doi'):
+            paper['doi'] = openalex_work['doi']
+        return paper
+
+    @staticmethod
+    def _retrieval_cache_key(backend: str, query: str, sort: str, max_results: int) -> str:
+        """检索缓存键：后端 + 排序 + 数量 + 规范化查询"""
+        return f"{backend}\x00{sort}\x00{max_results}\x00{normalize_query(query)}"
+
+    def _get_cached_papers(self, key: str, backend: str):
+        """查询检索缓存，返回论文列表的副本、NEGATIVE或MISS"""
+        if self.retrieval_cache is None:
+            return MISS
+        cached = self.retrieval_cache.get(key, label=backend)
+        if cached is MISS or cached is NEGATIVE:
+            return cached
+        # 返回副本，避免后续流程修改缓存中的论文
+        return [dict(paper) for paper in cached]
+
+    def _get_papers_from_openalex(self, query: str, sort: str, max_results: int, timeout: int = 30, rich: Optional[bool] = None) -> List[Dict]:
+        """从OpenAlex获取论文（内部方法）
+
+        通过select参数只请求需要的字段，不返回作者、概念、参考文献等大字段。
+
+        Args:
+            rich: 是否使用扩展投影（额外返回DOI），为None时使用 OPENALEX_RICH_FIELDS 配置
+        """
+        rich = self.config.OPENALEX_RICH_FIELDS if rich is None else rich
+        select = f"{self.OPENALEX_SELECT},{self.OPENALEX_RICH_SELECT}" if rich else self.OPENALEX_SELECT
+        cache_key = self._retrieval_cache_key("openalex", query, f"{sort}:{'rich' if rich else 'basic'}", max_results)
+        cached = self._get_cached_papers(cache_key, "openalex")
+        if cached is NEGATIVE:
+            return []
+        if cached is not MISS:
+            return cached
 
-    def _get_papers_from_openalex(self, query: str, sort: str, max_results: int, timeout: int = 30) -> List[Dict]:
-        """从OpenAlex获取论文（内部方法）"""
         url = "https://api.openalex.org/works"
         
         cleaned_query = query.replace('"', '').replace(' | ', ' ').strip()
@@ -72,7 +186,8 @@ class PaperRetriever:
         params = {
             "search": cleaned_query,
             "sort": sort,
-            "per_page": min(max_results, 200)
+            "per_page": min(max_results, 200),
+            "select": select
         }
         
         try:
@@ -83,7 +198,7 @@ class PaperRetriever:
                 timeout=timeout
             )
             response.raise_for_status()
-            data = response.json()
+            data = loads_json(response.content)
             
             if 'results' in data and data['results']:
                 papers = []
@@ -91,10 +206,15 @@ class PaperRetriever:
                     paper = self._convert_openalex_to_semanticscholar_format(work)
                     if paper.get('title', '').strip():
                         papers.append(paper)
-                return papers
-            return []
+            else:
+                papers = []
+            if self.retrieval_cache is not None:
+                self.retrieval_cache.set(cache_key, papers)
+            return papers
         except Exception as e:
             print(f"⚠️  OpenAlex检索失败: {e}")
+            if self.retrieval_cache is not None:
+                self.retrieval_cache.set_negative(cache_key)
             return []
 
     def get_newest_paper_openalex(self, query: str, max_results: Optional[int] = None) -> List[Dict]:
@@ -112,27 +232,90 @@ class PaperRetriever:
         max_results = max_results or self.config.MAX_PAPERS_PER_QUERY
         return self._get_papers_from_openalex(query, "cited_by_count:desc", max_results)
 
-    def get_newest_paper(self, query: str, max_results: Optional[int] = None, max_retries: Optional[int] = None) -> List[Dict]:
-        """获取最新论文（Semantic Scholar失败时fallback到OpenAlex）"""
-        max_results = max_results or self.config.MAX_PAPERS_PER_QUERY
-        max_retries = min(max_retries or 2, 2)
+    def _search_semantic_scholar(self, url: str, params: Dict, max_results: int, max_retries: int) -> Optional[List[Dict]]:
+        """调用Semantic Scholar检索接口（内部方法），结果按（查询, 排序, 数量）缓存
 
-        url = "http://api.semanticscholar.org/graph/v1/paper/search/bulk"
-        params = {"query": query, "fields": "title,abstract,paperId", "sort": "publicationDate:desc"}
+        失败结果在 RETRIEVAL_CACHE_NEGATIVE_TTL 秒内被负缓存，期间直接fallback，不再请求；
+        因限流（令牌等待超时或持续429）未能完成请求时只fallback，不写负缓存。
+
+        Returns:
+            论文列表；返回None表示需要fallback到OpenAlex
+        """
+        sort = f"{url.rsplit('/', 1)[-1]}:{params.get('sort', 'relevance')}"
+        cache_key = self._retrieval_cache_key("semantic_scholar", params["query"], sort, max_results)
+        cached = self._get_cached_papers(cache_key, "semantic_scholar")
+        if cached is NEGATIVE:
+            return None
+        if cached is not MISS:
+            return cached
+
+        start_time = time.time()
+        papers = self._request_semantic_scholar(url, params, max_results, max_retries)
+        if papers is _RATE_LIMITED:
+            return None
+        if papers is not None and self.s2_hedger is not None:
+            self.s2_hedger.latency.record(time.time() - start_time)
+        if self.retrieval_cache is not None:
+            if papers is None:
+                self.retrieval_cache.set_negative(cache_key)
+            else:
+                self.retrieval_cache.set(cache_key, papers)
+        return papers
+
+    def _search_with_fallback(self, url: str, params: Dict, max_results: int, max_retries: int, fallback) -> List[Dict]:
+        """Semantic Scholar检索，失败时调用fallback（OpenAlex）
+
+        开启对冲时，Semantic Scholar超过对冲延迟仍未返回就并行请求OpenAlex，
+        采用先返回的非空结果；两者在宽限窗口内先后返回时合并去重。
+        """
+        def primary():
+            return self._search_semantic_scholar(url, params, max_results, max_retries)
+
+        if self.s2_hedger is None:
+            papers = primary()
+            return papers if papers is not None else fallback()
+
+        papers = self.s2_hedger.call(
+            primary,
+            fallback,
+            is_valid=bool,
+            merge=lambda s2_papers, openalex_papers: self.merge_and_deduplicate(
+                {"semantic_scholar": s2_papers, "openalex": openalex_papers}
+            )
+        )
+        return papers or []
+
+    def _request_semantic_scholar(self, url: str, params: Dict, max_results: int, max_retries: int):
+        """请求Semantic Scholar检索接口（内部方法）
 
+        每次请求前从共享限流器获取令牌，令牌等待超过预算时不再请求。
+
+        Returns:
+            论文列表；返回None表示请求失败，返回 _RATE_LIMITED 表示因限流未能完成请求，
+            两者都需要fallback到OpenAlex
+        """
+        rate_limited = False
         for attempt in range(max_retries):
+            if not self.s2_limiter.acquire():
+                print("⚠️  Semantic Scholar限流等待超时，使用OpenAlex")
+                return _RATE_LIMITED
+
             try:
                 response = requests.get(url, params=params, timeout=self.config.SEMANTIC_SCHOLAR_TIMEOUT)
                 
                 if response.status_code == 429:
-                    return self.get_newest_paper_openalex(query, max_results)
+                    # 通知限流器暂停发放令牌，下一次尝试会排队等待
+                    self.s2_limiter.penalize(self._parse_retry_after(response))
+                    rate_limited = True
+                    continue
                 
+                rate_limited = False
                 if response.status_code != 200:
                     if attempt < max_retries - 1:
                         time.sleep(min(2 ** attempt, 2))
                         continue
                     else:
-                        return self.get_newest_paper_openalex(query, max_results)
+                        return None
                 
                 data = response.json()
                 if 'data' in data:
@@ -147,15 +330,37 @@ class PaperRetriever:
                     time.sleep(min(2 ** attempt, 2))
                     continue
                 else:
-                    return self.get_newest_paper_openalex(query, max_results)
+                    return None
             except Exception as e:
                 if attempt < max_retries - 1:
                     time.sleep(min(2 ** attempt, 2))
                     continue
                 else:
-                    return self.get_newest_paper_openalex(query, max_results)
+                    return None
+
+        # 最后一次尝试仍被429拒绝：属于限流而非服务失败
+        return _RATE_LIMITED if rate_limited else None
+
+    @staticmethod
+    def _parse_retry_after(response) -> Optional[float]:
+        """解析Retry-After响应头（秒数），无法解析时返回None"""
+        try:
+            return float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    def get_newest_paper(self, query: str, max_results: Optional[int] = None, max_retries: Optional[int] = None) -> List[Dict]:
+        """获取最新论文（Semantic Scholar失败时fallback到OpenAlex）"""
+        max_results = max_results or self.config.MAX_PAPERS_PER_QUERY
+        max_retries = min(max_retries or 2, 2)
+
+        url = "http://api.semanticscholar.org/graph/v1/paper/search/bulk"
+        params = {"query": query, "fields": self.S2_FIELDS, "sort": "publicationDate:desc"}
 
-        return self.get_newest_paper_openalex(query, max_results)
+        return self._search_with_fallback(
+            url, params, max_results, max_retries,
+            fallback=lambda: self.get_newest_paper_openalex(query, max_results)
+        )
 
     def get_highly_cited_paper(self, query: str, max_results: Optional[int] = None, max_retries: Optional[int] = None) -> List[Dict]:
         """获取高引用论文（Semantic Scholar失败时fallback到OpenAlex）"""
@@ -163,44 +368,12 @@ class PaperRetriever:
         max_retries = min(max_retries or 2, 2)
 
         url = "http://api.semanticscholar.org/graph/v1/paper/search/bulk"
-        params = {"query": query, "fields": "title,abstract,paperId", "sort": "citationCount:desc"}
+        params = {"query": query, "fields": self.S2_FIELDS, "sort": "citationCount:desc"}
 
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(url, params=params, timeout=self.config.SEMANTIC_SCHOLAR_TIMEOUT)
-                
-                if response.status_code == 429:
-                    return self.get_highly_cited_paper_openalex(query, max_results)
-                
-                if response.status_code != 200:
-                    if attempt < max_retries - 1:
-                        time.sleep(min(2 ** attempt, 2))
-                        continue
-                    else:
-                        return self.get_highly_cited_paper_openalex(query, max_results)
-                
-                data = response.json()
-                if 'data' in data:
-                    papers = data['data'][:max_results] if data['data'] else []
-                    if papers:
-                        return papers
-                    if attempt < max_retries - 1:
-                        time.sleep(min(2 ** attempt, 2))
-                    continue
-            except requests.exceptions.Timeout:
-                if attempt < max_retries - 1:
-                    time.sleep(min(2 ** attempt, 2))
-                    continue
-                else:
-                    return self.get_highly_cited_paper_openalex(query, max_results)
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(min(2 ** attempt, 2))
-                    continue
-                else:
-                    return self.get_highly_cited_paper_openalex(query, max_results)
-
-        return self.get_highly_cited_paper_openalex(query, max_results)
+        return self._search_with_fallback(
+            url, params, max_results, max_retries,
+            fallback=lambda: self.get_highly_cited_paper_openalex(query, max_results)
+        )
 
     def get_relevant_paper(self, query: str, max_results: Optional[int] = None, max_retries: Optional[int] = None) -> List[Dict]:
         """获取相关论文（Semantic Scholar失败时fallback到OpenAlex）"""
@@ -208,107 +381,243 @@ class PaperRetriever:
         max_retries = min(max_retries or 2, 2)
 
         url = "http://api.semanticscholar.org/graph/v1/paper/search"
-        params = {"query": query, "fields": "title,abstract,paperId"}
+        params = {"query": query, "fields": self.S2_FIELDS}
 
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(url, params=params, timeout=self.config.SEMANTIC_SCHOLAR_TIMEOUT)
-                
-                if response.status_code == 429:
-                    return self.get_relevant_paper_openalex(query, max_results)
-                
-                if response.status_code != 200:
-                    if attempt < max_retries - 1:
-                        time.sleep(min(2 ** attempt, 2))
-                        continue
-                    else:
-                        return self.get_relevant_paper_openalex(query, max_results)
-                
-                try:
-                    data = response.json()
-                except ValueError:
-                    if attempt < max_retries - 1:
-                        time.sleep(min(2 ** attempt, 2))
-                        continue
-                    else:
-                        return self.get_relevant_paper_openalex(query, max_results)
+        return self._search_with_fallback(
+            url, params, max_results, max_retries,
+            fallback=lambda: self.get_relevant_paper_openalex(query, max_results)
+        )
 
-                if 'data' in data:
-                    papers = data['data'][:max_results] if data['data'] else []
-                    if papers:
-                        return papers
-                    if attempt < max_retries - 1:
-                        time.sleep(min(2 ** attempt, 2))
+    def iter_semantic_scholar_bulk(self, query: str, sort: str, max_candidates: int, max_retries: int = 2) -> Iterator[List[Dict]]:
+        """分页读取Semantic Scholar bulk检索结果（生成器）
+
+        每页最多1000篇，按响应中的continuation token请求下一页，累计 max_candidates 篇
+        或没有下一页时结束。每页请求前从共享限流器获取令牌；请求失败时结束迭代。
+
+        Args:
+            query: 检索词
+            sort: 排序方式，如 publicationDate:desc
+            max_candidates: 最多读取的论文数
+            max_retries: 每页的最大尝试次数
+
+        Yields:
+            每页的论文列表
+        """
+        url = "http://api.semanticscholar.org/graph/v1/paper/search/bulk"
+        params = {"query": query, "fields": self.S2_FIELDS, "sort": sort}
+        fetched = 0
+
+        while fetched < max_candidates:
+            data = None
+            for attempt in range(max_retries):
+                if not self.s2_limiter.acquire():
+                    print("⚠️  Semantic Scholar限流等待超时，停止分页")
+                    return
+                try:
+                    response = requests.get(url, params=params, timeout=self.config.SEMANTIC_SCHOLAR_TIMEOUT)
+                except requests.exceptions.RequestException:
                     continue
-            except requests.exceptions.Timeout:
-                if attempt < max_retries - 1:
-                    time.sleep(min(2 ** attempt, 2))
+                if response.status_code == 429:
+                    self.s2_limiter.penalize(self._parse_retry_after(response))
                     continue
-                else:
-                    return self.get_relevant_paper_openalex(query, max_results)
-            except Exception as e:
+                if response.status_code == 200:
+                    try:
+                        data = loads_json(response.content)
+                        break
+                    except ValueError:
+                        data = None
                 if attempt < max_retries - 1:
                     time.sleep(min(2 ** attempt, 2))
-                    continue
-                else:
-                    return self.get_relevant_paper_openalex(query, max_results)
-
-        return self.get_relevant_paper_openalex(query, max_results)
-
-    def merge_and_deduplicate(self, results: Dict[str, List[Dict]]) -> List[Dict]:
-        """融合和去重论文"""
+            if data is None:
+                return
+
+            page = (data.get('data') or [])[:max_candidates - fetched]
+            if not page:
+                return
+            fetched += len(page)
+            yield page
+
+            token = data.get('token')
+            if not token:
+                return
+            params["token"] = token
+
+    def get_deep_candidates(self, query: str, sort: str, query_embedding: Optional[np.ndarray], fallback) -> List[Dict]:
+        """分页读取更深的候选池（RETRIEVAL_CANDIDATE_DEPTH篇），边读取边做语义排序
+
+        每页论文向量化后加入增量重排序器；相似度不低于 RETRIEVAL_EARLY_STOP_SIMILARITY 的候选
+        达到 RETRIEVAL_EARLY_STOP_COUNT 篇，或耗时超过 RETRIEVAL_DEEP_TIME_BUDGET 时停止翻页。
+        没有查询向量时只按深度和耗时上限读取。
+
+        Args:
+            query: 检索词
+            sort: Semantic Scholar排序方式
+            query_embedding: 查询向量，为None时不做语义排序
+            fallback: Semantic Scholar没有返回结果时调用的检索方法（OpenAlex）
+
+        Returns:
+            按相似度降序排列的候选论文
+        """
+        depth = self.config.RETRIEVAL_CANDIDATE_DEPTH
+        cache_key = self._retrieval_cache_key("semantic_scholar", query, f"bulk-deep:{sort}", depth)
+        cached = self._get_cached_papers(cache_key, "semantic_scholar")
+        if cached is NEGATIVE:
+            return fallback(query)
+        if cached is not MISS:
+            return cached
+
+        reranker = None
+        if self.embedding_client is not None and query_embedding is not None:
+            reranker = IncrementalReranker(query_embedding, self.config.RETRIEVAL_EARLY_STOP_SIMILARITY)
+
+        candidates = []
         seen_ids = set()
-        all_papers = []
-
-        for paper_list in results.values():
-            for paper in paper_list:
+        pages = 0
+        stop_reason = "exhausted"
+        start_time = time.time()
+        for page in self.iter_semantic_scholar_bulk(query, sort, depth):
+            pages += 1
+            new_papers = []
+            for paper in page:
                 paper_id = paper.get('paperId') or paper.get('title', '')
                 if paper_id and paper_id not in seen_ids:
                     seen_ids.add(paper_id)
-                    all_papers.append(paper)
+                    new_papers.append(paper)
+            candidates.extend(new_papers)
 
-        return all_papers
+            if reranker is not None and new_papers:
+                try:
+                    embeddings = self.embedding_client.encode(
+                        [self._paper_text(paper) for paper in new_papers], show_progress_bar=False
+                    )
+                except Exception as e:
+                    print(f"⚠️  候选论文向量化失败: {e}，停止语义排序")
+                    reranker = None
+                else:
+                    reranker.add(new_papers, np.atleast_2d(embeddings))
+                    if reranker.high_similarity_count >= self.config.RETRIEVAL_EARLY_STOP_COUNT:
+                        stop_reason = "early_stop"
+                        break
+            if time.time() - start_time > self.config.RETRIEVAL_DEEP_TIME_BUDGET:
+                stop_reason = "time_budget"
+                break
+
+        elapsed = time.time() - start_time
+        print(f"📄 S2分页检索({sort}): {pages}页, {len(candidates)}篇候选, 耗时{elapsed:.1f}s, 结束原因: {stop_reason}")
+
+        if not candidates:
+            if self.retrieval_cache is not None:
+                self.retrieval_cache.set_negative(cache_key)
+            return fallback(query)
+
+        if reranker is not None and len(reranker.items) == len(candidates):
+            candidates = reranker.top_k()
+        if self.retrieval_cache is not None:
+            self.retrieval_cache.set(cache_key, candidates)
+        return candidates
 
-    def rerank_by_similarity(self, papers: List[Dict], background_embedding: np.ndarray, background_text: str) -> List[Dict]:
-        """基于语义相似度重排序论文"""
-        if not self.embedding_client or len(papers) == 0:
-            return papers
+    def merge_and_deduplicate(self, results: Dict[str, List[Dict]]) -> List[Dict]:
+        """融合和去重论文
 
-        try:
-            paper_texts = []
-            for paper in papers:
-                abstract = paper.get('abstract', '') or ''
-                title = paper.get('title', '') or ''
-                text = f"{title} {abstract}".strip()
-                paper_texts.append(text if text else " ")
+        除paperId外，还按规范化标题、DOI和MinHash近似重复检测合并同一篇论文
+        （如Semantic Scholar与OpenAlex的同一篇论文、预印本与正式版）。
+        """
+        all_papers = [
+            paper for paper_list in results.values() for paper in paper_list
+            if paper.get('paperId') or paper.get('title', '')
+        ]
+        papers, report = deduplicate_papers(
+            all_papers,
+            threshold=self.config.DEDUP_SIMILARITY_THRESHOLD,
+            near_duplicates=self.config.DEDUP_NEAR_DUPLICATES
+        )
+        near_duplicates = report["by_title"] + report["by_doi"] + report["by_minhash"]
+        if near_duplicates:
+            print(
+                f"🧹 去重: {report['input']}篇 -> {report['output']}篇，合并近似重复{near_duplicates}篇"
+                f"（标题{report['by_title']}，DOI{report['by_doi']}，MinHash{report['by_minhash']}）"
+            )
+        return papers
 
+    @staticmethod
+    def _paper_text(paper: Dict) -> str:
+        """论文用于向量化的文本（标题 + 摘要）"""
+        abstract = paper.get('abstract', '') or ''
+        title = paper.get('title', '') or ''
+        text = f"{title} {abstract}".strip()
+        return text if text else " "
+
+    def _similarity_scores(self, papers: List[Dict], background_embedding: np.ndarray) -> Optional[np.ndarray]:
+        """论文与查询向量的余弦相似度，Embedding不可用或失败时返回None
+
+        论文向量为L2归一化的float32矩阵，相似度通过一次矩阵-向量乘法得到。
+        """
+        if not self.embedding_client or background_embedding is None or len(papers) == 0:
+            return None
+
+        try:
+            paper_texts = [self._paper_text(paper) for paper in papers]
             paper_embeddings = self.embedding_client.encode(paper_texts, show_progress_bar=False)
-            
-            if paper_embeddings.ndim == 1:
-                paper_embeddings = paper_embeddings.reshape(1, -1)
+            query_embedding = normalize_rows(np.ravel(background_embedding))
+            if paper_embeddings.ndim != 2 or paper_embeddings.shape[1] != query_embedding.shape[0]:
+                print("⚠️  论文向量与查询向量维度不一致，跳过语义相似度")
+                return None
+            return paper_embeddings @ query_embedding
+        except Exception as e:
+            print(f"⚠️  语义相似度计算失败: {e}")
+            return None
 
-            similarities = []
-            for paper_emb in paper_embeddings:
-                similarity = np.dot(background_embedding, paper_emb) / (
-                    np.linalg.norm(background_embedding) * np.linalg.norm(paper_emb) + 1e-8
-                )
-                similarities.append(similarity)
+    def rerank_by_similarity(self, papers: List[Dict], background_embedding: np.ndarray, background_text: str, top_k: Optional[int] = None) -> List[Dict]:
+        """基于语义相似度重排序论文
 
-            sorted_papers = sorted(
-                zip(papers, similarities),
-                key=lambda x: x[1],
-                reverse=True
-            )
+        用argpartition选出相似度最高的top_k篇（为None时返回全部论文），失败时返回原始顺序。
+        """
+        similarities = self._similarity_scores(papers, background_embedding)
+        if similarities is None:
+            return papers
+        return [papers[index] for index in top_k_indices(similarities, top_k)]
 
-            return [paper for paper, _ in sorted_papers]
+    def rerank(self, papers: List[Dict], query_text: str, keywords: List[str], background_embedding: Optional[np.ndarray], top_k: Optional[int] = None) -> List[Dict]:
+        """混合重排序：BM25词法得分与向量相似度做倒数排名融合（RRF）
 
-        except Exception as e:
-            print(f"⚠️  语义重排序失败: {e}，返回原始顺序")
+        Embedding不可用时只使用BM25排序；RERANK_BM25_ENABLED为False时只使用向量相似度；
+        两者都没有时保持原始顺序。
+
+        Args:
+            papers: 候选论文
+            query_text: 研究背景
+            keywords: 检索关键词（与研究背景一起作为BM25查询）
+            background_embedding: 查询向量，为None时不计算相似度
+            top_k: 返回的论文数，为None时返回全部
+        """
+        if len(papers) == 0:
             return papers
 
+        lexical = None
+        if self.config.RERANK_BM25_ENABLED:
+            query_tokens = tokenize(" ".join([query_text, *keywords]))
+            lexical = bm25_scores(query_tokens, [tokenize(self._paper_text(paper)) for paper in papers])
+            if not np.any(lexical):
+                lexical = None
+        dense = self._similarity_scores(papers, background_embedding)
+
+        if lexical is not None and dense is not None:
+            scores = reciprocal_rank_fusion([lexical, dense], k=self.config.RERANK_RRF_K)
+        else:
+            scores = lexical if lexical is not None else dense
+        if scores is None:
+            return papers[:top_k] if top_k is not None else papers
+        return [papers[index] for index in top_k_indices(scores, top_k)]
+
     def hybrid_retrieve(self, query_text: str, keywords: List[str]) -> List[Dict]:
         """
         混合检索策略 - 优先使用Semantic Scholar API，失败时自动fallback到OpenAlex
+
+        PAPER_STORE_MODE为local_first时先查询本地论文库，只有本地命中数低于
+        PAPER_STORE_MIN_RESULTS的排序才请求远程API；命中只统计包含至少
+        PAPER_STORE_MIN_KEYWORD_MATCHES个关键词短语的论文，最新论文只统计最近
+        PAPER_STORE_NEWEST_MAX_AGE秒内更新过的论文。远程检索到的论文都会写入本地论文库。
+        RETRIEVAL_CANDIDATE_DEPTH大于0时，最新/高引用论文改为分页读取更深的候选池。
         """
         if len(keywords) == 1:
             query = keywords[0]
@@ -317,47 +626,78 @@ class PaperRetriever:
 
         import concurrent.futures
 
-        newest_papers = []
-        highly_cited_papers = []
-        relevant_papers = []
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            future_newest = executor.submit(self.get_newest_paper, query)
-            future_highly_cited = executor.submit(self.get_highly_cited_paper, query)
-            future_relevant = executor.submit(self.get_relevant_paper, query)
-
-            try:
-                newest_papers = future_newest.result(timeout=120)
-            except Exception:
-                newest_papers = []
-
-            try:
-                highly_cited_papers = future_highly_cited.result(timeout=120)
-            except Exception:
-                highly_cited_papers = []
-
+        background_embedding = None
+        if self.embedding_client:
             try:
-                relevant_papers = future_relevant.result(timeout=120)
-            except Exception:
-                relevant_papers = []
-
-        results = {
-            "newest_papers": newest_papers or [],
-            "highly_cited_papers": highly_cited_papers or [],
-            "relevant_papers": relevant_papers or []
+                background_embedding = self.embedding_client.encode(query_text, show_progress_bar=False)
+            except Exception as e:
+                print(f"⚠️  查询向量化失败: {e}，使用原始顺序")
+            # 查询向量获取失败时为零向量，此时保持原始顺序
+            if background_embedding is not None and (background_embedding.size == 0 or not np.any(background_embedding)):
+                background_embedding = None
+
+        # 三种排序各自的本地检索方式和远程检索方法
+        sources = {
+            "newest_papers": (SORT_NEWEST, self.get_newest_paper),
+            "highly_cited_papers": (SORT_CITATIONS, self.get_highly_cited_paper),
+            "relevant_papers": (SORT_RELEVANCE, self.get_relevant_paper)
         }
+        if self.config.RETRIEVAL_CANDIDATE_DEPTH > 0:
+            # 候选深度模式：最新/高引用论文分页读取更大的候选池，边读取边做语义排序
+            sources["newest_papers"] = (SORT_NEWEST, lambda q: self.get_deep_candidates(
+                q, "publicationDate:desc", background_embedding, fallback=self.get_newest_paper_openalex
+            ))
+            sources["highly_cited_papers"] = (SORT_CITATIONS, lambda q: self.get_deep_candidates(
+                q, "citationCount:desc", background_embedding, fallback=self.get_highly_cited_paper_openalex
+            ))
+
+        # 优先使用本地论文库，命中数不足的排序再请求远程API
+        # 只统计包含足够多关键词短语的论文；最新论文只使用新近由远程检索更新过的论文，避免结果停留在首次写入时
+        local_results = {}
+        if self.paper_store is not None and self.config.PAPER_STORE_MODE == "local_first":
+            newest_max_age = self.config.PAPER_STORE_NEWEST_MAX_AGE
+            for name, (sort, _) in sources.items():
+                if sort == SORT_NEWEST and newest_max_age <= 0:
+                    continue
+                local_results[name] = self.paper_store.search(
+                    keywords, sort, self.config.MAX_PAPERS_PER_QUERY,
+                    min_keyword_matches=self.config.PAPER_STORE_MIN_KEYWORD_MATCHES,
+                    max_age=newest_max_age if sort == SORT_NEWEST else None
+                )
+        remote_names = [
+            name for name in sources
+            if len(local_results.get(name, [])) < self.config.PAPER_STORE_MIN_RESULTS
+        ]
+        if local_results and len(remote_names) < len(sources):
+            local_names = [name for name in sources if name not in remote_names]
+            print(f"📚 本地论文库命中: {', '.join(local_names)}")
+
+        remote_results = {}
+        if remote_names:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(remote_names)) as executor:
+                futures = {name: executor.submit(sources[name][1], query) for name in remote_names}
+                for name, future in futures.items():
+                    try:
+                        remote_results[name] = future.result(timeout=120) or []
+                    except Exception:
+                        remote_results[name] = []
+                    if remote_results[name] and self.paper_store is not None:
+                        self.paper_store.add_papers(remote_results[name])
+
+        # 远程检索失败时退回本地结果（不足时放宽为任一关键词匹配、不限更新时间）
+        results = {}
+        for name, (sort, _) in sources.items():
+            results[name] = remote_results.get(name) or local_results.get(name, [])
+            if not results[name] and self.paper_store is not None:
+                results[name] = self.paper_store.search(keywords, sort, self.config.MAX_PAPERS_PER_QUERY)
         all_papers = self.merge_and_deduplicate(results)
 
         if not all_papers:
             return []
 
-        if self.embedding_client:
-            try:
-                background_embedding = self.embedding_client.encode(query_text, show_progress_bar=False)
-                if background_embedding is not None and len(background_embedding) > 0:
-                    all_papers = self.rerank_by_similarity(all_papers, background_embedding, query_text)
-            except Exception as e:
-                print(f"⚠️  语义重排序失败: {e}，使用原始顺序")
+        all_papers = self.rerank(
+            all_papers, query_text, keywords, background_embedding, top_k=self.config.MAX_TOTAL_PAPERS
+        )
 
         return all_papers[:self.config.MAX_TOTAL_PAPERS]
 
@@ -0,0 +1,287 @@
+"""
+综述结果缓存 - 按规范化查询精确匹配，或按查询向量相似度匹配近似重复的查询
+内存LRU + 可选SQLite持久化，条目带TTL
+"""
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence
+import numpy as np
+from config import Config
+from embedding_cache import resolve_cache_path
+from request_coalescer import normalize_query
+
+
+def make_review_key(query: str, language: str) -> str:
+    """生成缓存键：语言 + 规范化查询的SHA-256"""
+    digest = hashlib.sha256(f"{language}\x00{normalize_query(query)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ReviewCacheEntry:
+    """缓存条目"""
+
+    def __init__(self, key: str, query: str, language: str, review: str, created_at: float, embedding: Optional[np.ndarray] = None,
+                 ttl: Optional[float] = None):
+        self.key = key
+        self.query = query
+        self.language = language
+        self.review = review
+        self.created_at = created_at
+        self.embedding = embedding
+        # 条目自己的有效期（秒），为None时使用缓存默认的ttl
+        self.ttl = ttl
+
+    def expires_at(self, default_ttl: float) -> float:
+        """条目的过期时间"""
+        return self.created_at + (default_ttl if self.ttl is None else self.ttl)
+
+
+class ReviewCacheHit:
+    """缓存命中结果"""
+
+    def __init__(self, entry: ReviewCacheEntry, match: str, similarity: float = 1.0):
+        """
+        Args:
+            entry: 命中的缓存条目
+            match: 匹配方式，"exact" 或 "semantic"
+            similarity: 查询向量余弦相似度（精确匹配为1.0）
+        """
+        self.entry = entry
+        self.match = match
+        self.similarity = similarity
+
+    @property
+    def age(self) -> float:
+        """条目已缓存的秒数"""
+        return time.time() - self.entry.created_at
+
+
+class ReviewCache:
+    """综述结果缓存（线程安全）
+
+    - 精确匹配：语言 + 规范化查询
+    - 近似匹配：同语言条目中查询向量余弦相似度不低于 similarity_threshold 的最相似条目
+    - 超过 ttl 秒（或写入时指定的条目有效期）的条目视为过期；条目数超过 max_entries 时淘汰最久未命中的条目
+    """
+
+    def __init__(self, max_entries: int = 500, ttl: int = 86400, similarity_threshold: float = 0.92, disk_path: Optional[str] = None):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, ReviewCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+        if disk_path and self.max_entries > 0:
+            try:
+                self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS reviews ("
+                    "key TEXT PRIMARY KEY, query TEXT NOT NULL, language TEXT NOT NULL, review TEXT NOT NULL, "
+                    "embedding BLOB, created_at REAL NOT NULL)"
+                )
+                columns = {row[1] for row in self._conn.execute("PRAGMA table_info(reviews)")}
+                if "ttl" not in columns:
+                    # 旧版本创建的表没有条目有效期列
+                    self._conn.execute("ALTER TABLE reviews ADD COLUMN ttl REAL")
+                self._conn.commit()
+                self._load()
+            except sqlite3.Error as e:
+                print(f"⚠️  综述磁盘缓存初始化失败: {e}，仅使用内存缓存")
+                self._conn = None
+
+    def _load(self):
+        """启动时从SQLite加载未过期的条目（按写入时间保留最新的 max_entries 条）"""
+        self._conn.execute("DELETE FROM reviews WHERE created_at + COALESCE(ttl, ?) < ?", (self.ttl, time.time()))
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT key, query, language, review, embedding, created_at, ttl FROM reviews "
+            "ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        self._conn.execute(
+            "DELETE FROM reviews WHERE key NOT IN (SELECT key FROM reviews ORDER BY created_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        self._conn.commit()
+        for key, query, language, review, blob, created_at, ttl in reversed(rows):
+            embedding = np.frombuffer(blob, dtype=np.float32) if blob else None
+            self._entries[key] = ReviewCacheEntry(key, query, language, review, created_at, embedding, ttl)
+        if rows:
+            print(f"✓ 已加载 {len(rows)} 条综述缓存")
+
+    def lookup(self, query: str, language: str, embedding: Optional[Sequence[float]] = None) -> Optional[ReviewCacheHit]:
+        """查询缓存
+
+        Args:
+            query: 用户查询
+            language: 查询语言
+            embedding: 查询向量；为None时只做精确匹配
+
+        Returns:
+            命中结果，未命中返回None
+        """
+        key = make_review_key(query, language)
+        with self._lock:
+            self._expire()
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return ReviewCacheHit(entry, "exact")
+
+            if embedding is not None:
+                hit = self._semantic_lookup(language, embedding)
+                if hit is not None:
+                    self._entries.move_to_end(hit.entry.key)
+                    self.semantic_hits += 1
+                    return hit
+
+            self.misses += 1
+            return None
+
+    def needs_embedding(self, query: str, language: str) -> bool:
+        """查询是否需要查询向量：未精确命中且存在可做近似匹配的条目（否则可跳过计算向量）"""
+        key = make_review_key(query, language)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at(self.ttl) >= now:
+                return False
+            return any(
+                entry.embedding is not None and entry.language == language and entry.expires_at(self.ttl) >= now
+                for entry in self._entries.values()
+            )
+
+    def put(self, query: str, language: str, review: str, embedding: Optional[Sequence[float]] = None, ttl: Optional[float] = None):
+        """写入缓存（空综述会被跳过）
+
+        Args:
+            ttl: 条目有效期（秒），为None时使用缓存默认的ttl
+        """
+        if not review or self.max_entries == 0:
+            return
+        key = make_review_key(query, language)
+        vector = self._unit_vector(embedding)
+        entry = ReviewCacheEntry(key, query, language, review, time.time(), vector, ttl)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self.evictions += 1
+            if self._conn is not None:
+                self._disk_put(entry, evicted)
+
+    def get_stats(self) -> dict:
+        """获取缓存命中统计"""
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "disk_enabled": self._conn is not None
+            }
+
+    @staticmethod
+    def _unit_vector(embedding: Optional[Sequence[float]]) -> Optional[np.ndarray]:
+        """转换为单位向量，零向量（Embedding调用失败时的占位）返回None"""
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if vector.size == 0 or norm == 0.0:
+            return None
+        return vector / norm
+
+    def _semantic_lookup(self, language: str, embedding: Sequence[float]) -> Optional[ReviewCacheHit]:
+        """在同语言、同维度的条目中查找最相似的查询（调用方需持有锁）"""
+        query_vector = self._unit_vector(embedding)
+        if query_vector is None:
+            return None
+
+        candidates = [
+            entry for entry in self._entries.values()
+            if entry.language == language and entry.embedding is not None and entry.embedding.shape == query_vector.shape
+        ]
+        if not candidates:
+            return None
+
+        similarities = np.stack([entry.embedding for entry in candidates]) @ query_vector
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.similarity_threshold:
+            return None
+        return ReviewCacheHit(candidates[best], "semantic", similarity)
+
+    def _expire(self):
+        """删除过期条目（调用方需持有锁）"""
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if entry.expires_at(self.ttl) < now]
+        for key in expired:
+            del self._entries[key]
+        self.expirations += len(expired)
+        if expired and self._conn is not None:
+            try:
+                self._conn.executemany("DELETE FROM reviews WHERE key = ?", [(key,) for key in expired])
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  综述磁盘缓存清理失败: {e}")
+
+    def _disk_put(self, entry: ReviewCacheEntry, evicted: list):
+        """写入SQLite并删除被淘汰的条目（调用方需持有锁）"""
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reviews (key, query, language, review, embedding, created_at, ttl) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry.key, entry.query, entry.language, entry.review,
+                    entry.embedding.tobytes() if entry.embedding is not None else None,
+                    entry.created_at, entry.ttl
+                )
+            )
+            if evicted:
+                self._conn.executemany("DELETE FROM reviews WHERE key = ?", [(key,) for key in evicted])
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  综述磁盘缓存写入失败: {e}")
+
+
+# 进程内共享的缓存实例
+_cache: Optional[ReviewCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_review_cache() -> Optional[ReviewCache]:
+    """获取共享的综述缓存实例，未启用缓存时返回None"""
+    global _cache
+    if not Config.REVIEW_CACHE_ENABLED:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReviewCache(
+                max_entries=Config.REVIEW_CACHE_MAX_ENTRIES,
+                ttl=Config.REVIEW_CACHE_TTL,
+                similarity_threshold=Config.REVIEW_CACHE_SIMILARITY_THRESHOLD,
+                disk_path=resolve_cache_path(Config.REVIEW_CACHE_PATH)
+            )
+        return _cache
@@ -1,16 +1,18 @@
 """
 综述生成器 - 基于论文总结和主题聚类生成结构化文献综述
 """
-from typing import List, Dict
+from typing import List, Dict, Optional, Iterator, AsyncIterator
 from llm_client import LLMClient
+from async_llm_client import AsyncLLMClient, get_response_async, stream_response_async
 from prompt_template import get_review_generation_prompt
 
 
 class ReviewGenerator:
     """综述生成器"""
     
-    def __init__(self, llm_client: LLMClient, language: str = 'en'):
+    def __init__(self, llm_client: LLMClient, language: str = 'en', async_llm_client: Optional[AsyncLLMClient] = None):
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
         self.language = language
     
     def generate_review(self, summaries: List[str], topics: str, trends: str, query: str, papers: List[Dict], intent_result: dict = None) -> str:
@@ -30,4 +32,19 @@ class ReviewGenerator:
         review = self.llm_client.get_response(prompt=prompt, use_reasoning_model=True)
         
         return review
-
+    
+    async def generate_review_async(self, summaries: List[str], topics: str, trends: str, query: str, papers: List[Dict], intent_result: dict = None) -> str:
+        """生成完整综述（异步版本）"""
+        prompt = get_review_generation_prompt(summaries, topics, trends, query, papers, intent_result, self.language)
+        return await get_response_async(self.llm_client, self.async_llm_client, prompt, use_reasoning_model=True)
+    
+    def stream_review(self, summaries: List[str], topics: str, trends: str, query: str, papers: List[Dict], intent_result: dict = None) -> Iterator[str]:
+        """流式生成综述，逐段产出模型输出的增量文本"""
+        prompt = get_review_generation_prompt(summaries, topics, trends, query, papers, intent_result, self.language)
+        yield from self.llm_client.stream_response(prompt=prompt, use_reasoning_model=True)
+    
+    async def stream_review_async(self, summaries: List[str], topics: str, trends: str, query: str, papers: List[Dict], intent_result: dict = None) -> AsyncIterator[str]:
+        """流式生成综述（异步版本）"""
+        prompt = get_review_generation_prompt(summaries, topics, trends, query, papers, intent_result, self.language)
+        async for content in stream_response_async(self.llm_client, self.async_llm_client, prompt, use_reasoning_model=True):
+            yield content
@@ -2,8 +2,9 @@
 综述生成器 v2 - 纯Prompt文献综述生成方案
 两阶段生成：查询理解 + 综述生成
 """
-from typing import Dict
+from typing import Dict, Optional
 from llm_client import LLMClient
+from async_llm_client import AsyncLLMClient, get_response_async
 from prompt_template_v2 import (
     get_query_understanding_prompt,
     get_literature_review_generation_prompt
@@ -14,8 +15,9 @@ from config import Config
 class ReviewGeneratorV2:
     """综述生成器 v2 - 纯Prompt方案"""
     
-    def __init__(self, llm_client: LLMClient, language: str = 'en'):
+    def __init__(self, llm_client: LLMClient, language: str = 'en', async_llm_client: Optional[AsyncLLMClient] = None):
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
         self.language = language
         self.config = Config
     
@@ -76,4 +78,30 @@ class ReviewGeneratorV2:
         review = self.generate_review(query, knowledge_plan)
         
         return review
-
+    
+    async def understand_query_async(self, query: str) -> str:
+        """阶段1：查询理解与知识规划（异步版本）"""
+        prompt = get_query_understanding_prompt(query, self.language)
+        return await get_response_async(
+            self.llm_client,
+            self.async_llm_client,
+            prompt,
+            use_reasoning_model=True,
+            timeout=self.config.LLM_REQUEST_TIMEOUT * 3
+        )
+    
+    async def generate_review_async(self, query: str, knowledge_plan: str) -> str:
+        """阶段2：生成文献综述（异步版本）"""
+        prompt = get_literature_review_generation_prompt(query, knowledge_plan, self.language)
+        return await get_response_async(
+            self.llm_client,
+            self.async_llm_client,
+            prompt,
+            use_reasoning_model=True,
+            timeout=self.config.LLM_REQUEST_TIMEOUT * 5
+        )
+    
+    async def generate_async(self, query: str) -> str:
+        """完整生成流程（异步版本）"""
+        knowledge_plan = await self.understand_query_async(query)
+        return await self.generate_review_async(query, knowledge_plan)
@@ -1,7 +1,9 @@
 """
 综述生成器 v3 - 强调结构化章节与引用规范的纯Prompt方案
 """
+from typing import Optional
 from llm_client import LLMClient
+from async_llm_client import AsyncLLMClient, get_response_async
 from prompt_template_v3 import (
     get_query_understanding_prompt,
     get_literature_review_generation_prompt,
@@ -12,8 +14,9 @@ from config import Config
 class ReviewGeneratorV3:
     """综述生成器 v3 - 结合v3模板的两阶段流程"""
 
-    def __init__(self, llm_client: LLMClient, language: str = 'en'):
+    def __init__(self, llm_client: LLMClient, language: str = 'en', async_llm_client: Optional[AsyncLLMClient] = None):
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
         self.language = language
         self.config = Config
 
@@ -44,3 +47,33 @@ class ReviewGeneratorV3:
         knowledge_plan = self.understand_query(query)
         return self.generate_review(query, knowledge_plan)
 
+    async def understand_query_async(self, query: str) -> str:
+        """阶段1：查询理解与知识规划（异步版本）"""
+        prompt = get_query_understanding_prompt(query, self.language)
+
+        return await get_response_async(
+            self.llm_client,
+            self.async_llm_client,
+            prompt,
+            use_reasoning_model=True,
+            timeout=self.config.LLM_REQUEST_TIMEOUT * 3,
+        )
+
+    async def generate_review_async(self, query: str, knowledge_plan: str) -> str:
+        """阶段2：基于v3模板生成综述（异步版本）"""
+        prompt = get_literature_review_generation_prompt(
+            query, knowledge_plan, self.language
+        )
+
+        return await get_response_async(
+            self.llm_client,
+            self.async_llm_client,
+            prompt,
+            use_reasoning_model=True,
+            timeout=self.config.LLM_REQUEST_TIMEOUT * 5,
+        )
+
+    async def generate_async(self, query: str) -> str:
+        """完整管线（异步版本）：查询理解 -> 综述生成"""
+        knowledge_plan = await self.understand_query_async(query)
+        return await self.generate_review_async(query, knowledge_plan)
@@ -1,7 +1,9 @@
 """
 综述生成器 v4 - 基于v2结构融合v3规范的纯Prompt方案
 """
+from typing import Optional, Iterator, AsyncIterator
 from llm_client import LLMClient
+from async_llm_client import AsyncLLMClient, get_response_async, stream_response_async
 from prompt_template_v4 import (
     get_query_understanding_prompt,
     get_literature_review_generation_prompt,
@@ -12,8 +14,9 @@ from config import Config
 class ReviewGeneratorV4:
     """综述生成器 v4 - 结合v4模板的两阶段流程"""
 
-    def __init__(self, llm_client: LLMClient, language: str = 'en'):
+    def __init__(self, llm_client: LLMClient, language: str = 'en', async_llm_client: Optional[AsyncLLMClient] = None):
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
         self.language = language
         self.config = Config
 
@@ -39,8 +42,65 @@ class ReviewGeneratorV4:
             timeout=self.config.LLM_REQUEST_TIMEOUT * 5,
         )
 
+    def stream_review(self, query: str, knowledge_plan: str) -> Iterator[str]:
+        """阶段2（流式）：逐段产出模型输出的增量文本"""
+        prompt = get_literature_review_generation_prompt(
+            query, knowledge_plan, self.language
+        )
+
+        yield from self.llm_client.stream_response(
+            prompt=prompt,
+            use_reasoning_model=True,
+            timeout=self.config.LLM_REQUEST_TIMEOUT * 5,
+        )
+
     def generate(self, query: str) -> str:
         """完整管线：查询理解 -> 综述生成"""
         knowledge_plan = self.understand_query(query)
         return self.generate_review(query, knowledge_plan)
 
+    async def understand_query_async(self, query: str) -> str:
+        """阶段1：查询理解与知识规划（异步版本）"""
+        prompt = get_query_understanding_prompt(query, self.language)
+
+        return await get_response_async(
+            self.llm_client,
+            self.async_llm_client,
+            prompt,
+            use_reasoning_model=True,
+            timeout=self.config.LLM_REQUEST_TIMEOUT * 3,
+        )
+
+    async def generate_review_async(self, query: str, knowledge_plan: str) -> str:
+        """阶段2：基于v4模板生成综述（异步版本）"""
+        prompt = get_literature_review_generation_prompt(
+            query, knowledge_plan, self.language
+        )
+
+        return await get_response_async(
+            self.llm_client,
+            self.async_llm_client,
+            prompt,
+            use_reasoning_model=True,
+            timeout=self.config.LLM_REQUEST_TIMEOUT * 5,
+        )
+
+    async def stream_review_async(self, query: str, knowledge_plan: str) -> AsyncIterator[str]:
+        """阶段2（流式，异步版本）：逐段产出模型输出的增量文本"""
+        prompt = get_literature_review_generation_prompt(
+            query, knowledge_plan, self.language
+        )
+
+        async for content in stream_response_async(
+            self.llm_client,
+            self.async_llm_client,
+            prompt,
+            use_reasoning_model=True,
+            timeout=self.config.LLM_REQUEST_TIMEOUT * 5,
+        ):
+            yield content
+
+    async def generate_async(self, query: str) -> str:
+        """完整管线（异步版本）：查询理解 -> 综述生成"""
+        knowledge_plan = await self.understand_query_async(query)
+        return await self.generate_review_async(query, knowledge_plan)
@@ -0,0 +1,161 @@
+"""
+SSE工具 - 生成OpenAI兼容的chat.completion.chunk流，按字节预算和时间窗口合并输出
+各版本API服务共用
+"""
+import json
+import time
+import asyncio
+from typing import Iterator, Optional
+from config import Config
+
+
+# chat.completion.chunk的固定前后缀，只对content做JSON编码
+_SSE_PREFIX = 'data: {"object": "chat.completion.chunk", "choices": [{"delta": {"content": '
+_SSE_SUFFIX = '}}]}\n\n'
+
+
+def format_sse_data(content: str) -> str:
+    """生成OpenAI格式的SSE数据"""
+    return f"{_SSE_PREFIX}{json.dumps(content, ensure_ascii=False)}{_SSE_SUFFIX}"
+
+
+def format_sse_comment(text: str) -> str:
+    """生成SSE注释行（客户端会忽略，用于传递元信息）"""
+    return f": {text}\n\n"
+
+
+def format_sse_done() -> str:
+    """生成SSE结束标记"""
+    return "data: [DONE]\n\n"
+
+
+def split_by_bytes(message: str, max_bytes: int) -> Iterator[str]:
+    """按UTF-8字节预算切分文本，不会切断多字节字符"""
+    encoded = message.encode("utf-8")
+    start = 0
+    while start < len(encoded):
+        end = min(start + max_bytes, len(encoded))
+        # 回退到字符边界（UTF-8续字节形如0b10xxxxxx）
+        while end < len(encoded) and end > start and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        if end == start:
+            # 预算小于单个字符的字节数时，至少输出一个完整字符
+            end = start + 1
+            while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+                end += 1
+        yield encoded[start:end].decode("utf-8")
+        start = end
+
+
+def stream_message(message: str, max_bytes: Optional[int] = None):
+    """将消息按字节预算合并为若干SSE帧输出（同步生成器）"""
+    max_bytes = max_bytes or Config.SSE_CHUNK_BYTES
+    for chunk in split_by_bytes(message, max(1, max_bytes)):
+        yield format_sse_data(chunk)
+
+
+async def run_with_heartbeat(task_func, *args, heartbeat_interval=25, **kwargs):
+    """
+    执行长时间任务，期间定期发送心跳数据
+
+    Args:
+        task_func: 要执行的函数（同步函数或协程函数）
+        *args, **kwargs: 传递给函数的参数
+        heartbeat_interval: 心跳间隔（秒），默认25秒
+
+    Yields:
+        心跳数据（空格字符）或任务结果
+    """
+    start_time = time.time()
+    last_heartbeat = start_time
+
+    # 创建任务（协程函数直接调度，同步函数使用asyncio.to_thread转换为协程）
+    if asyncio.iscoroutinefunction(task_func):
+        task = asyncio.create_task(task_func(*args, **kwargs))
+    else:
+        task = asyncio.create_task(asyncio.to_thread(task_func, *args, **kwargs))
+
+    # 在任务执行期间定期发送心跳
+    while not task.done():
+        await asyncio.sleep(1)  # 每秒检查一次
+        elapsed = time.time() - last_heartbeat
+
+        # 如果超过心跳间隔，发送心跳数据
+        if elapsed >= heartbeat_interval:
+            yield format_sse_data(" ")  # 发送一个空格作为心跳
+            last_heartbeat = time.time()
+
+        # 检查任务是否完成
+        if task.done():
+            break
+
+    # 等待任务完成并返回结果
+    try:
+        result = await task
+        # 使用特殊标记来区分结果和心跳数据
+        yield ("RESULT", result)
+    except Exception as e:
+        print(f"⚠️  任务执行失败: {e}")
+        import traceback
+        print(traceback.format_exc())
+        raise e
+
+
+async def stream_with_heartbeat(stream, heartbeat_interval=25, max_bytes: Optional[int] = None, flush_interval_ms: Optional[int] = None):
+    """
+    转发异步流的增量文本，空闲超过心跳间隔时发送心跳数据
+
+    上游的增量文本会先合并，累计达到 max_bytes 字节或距首段缓冲超过
+    flush_interval_ms 毫秒时再一次性输出，避免每个token单独成帧。
+
+    Args:
+        stream: 产出增量文本的异步迭代器
+        heartbeat_interval: 心跳间隔（秒），默认25秒
+        max_bytes: 单帧字节预算，默认 Config.SSE_CHUNK_BYTES
+        flush_interval_ms: 最长缓冲时间（毫秒），默认 Config.SSE_FLUSH_INTERVAL_MS
+
+    Yields:
+        心跳数据（空格字符）或 ("DELTA", 合并后的增量文本)
+    """
+    max_bytes = max_bytes or Config.SSE_CHUNK_BYTES
+    flush_interval = (flush_interval_ms if flush_interval_ms is not None else Config.SSE_FLUSH_INTERVAL_MS) / 1000
+
+    iterator = stream.__aiter__()
+    next_task = None
+    buffer = []
+    buffered_bytes = 0
+    buffer_started = 0.0
+    try:
+        while True:
+            next_task = asyncio.ensure_future(iterator.__anext__())
+            # 推理模型可能长时间只输出思考过程，期间保持心跳
+            while True:
+                if buffer:
+                    timeout = max(0.0, buffer_started + flush_interval - time.monotonic())
+                else:
+                    timeout = heartbeat_interval
+                done, _ = await asyncio.wait({next_task}, timeout=timeout)
+                if done:
+                    break
+                if buffer:
+                    # 时间窗口到期，先输出已缓冲的内容
+                    yield ("DELTA", "".join(buffer))
+                    buffer, buffered_bytes = [], 0
+                else:
+                    yield format_sse_data(" ")
+            try:
+                content = next_task.result()
+            except StopAsyncIteration:
+                break
+            if not buffer:
+                buffer_started = time.monotonic()
+            buffer.append(content)
+            buffered_bytes += len(content.encode("utf-8"))
+            if buffered_bytes >= max_bytes or time.monotonic() - buffer_started >= flush_interval:
+                yield ("DELTA", "".join(buffer))
+                buffer, buffered_bytes = [], 0
+        if buffer:
+            yield ("DELTA", "".join(buffer))
+    finally:
+        if next_task is not None and not next_task.done():
+            next_task.cancel()
@@ -0,0 +1,106 @@
+"""
+论文总结缓存 - 按（论文ID, 总结Prompt模板哈希, 语言, 粗粒度查询意图）缓存推理模型生成的单篇论文总结
+复用TTLCache：内存LRU + SQLite磁盘层，条目带TTL
+"""
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Dict, Optional
+from config import Config
+from embedding_cache import resolve_cache_path
+from prompt_template import get_batch_paper_summary_prompt, get_paper_summary_prompt
+from request_coalescer import normalize_query
+from bm25 import tokenize
+from dedup import normalize_title
+from ttl_cache import MISS, NEGATIVE, TTLCache, get_ttl_cache
+
+
+@lru_cache(maxsize=None)
+def summary_template_hash(language: str, batched: bool = False) -> str:
+    """总结Prompt模板的哈希（用占位符渲染模板，模板文字修改后缓存自动失效）
+
+    Args:
+        batched: 是否为批量总结模板
+    """
+    placeholder = {'title': '{title}', 'abstract': '{abstract}'}
+    if batched:
+        template = get_batch_paper_summary_prompt([placeholder], '{query}', language)
+    else:
+        template = get_paper_summary_prompt(placeholder, '{query}', language)
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+def make_intent_key(query: str, intent_result: Optional[dict] = None) -> str:
+    """粗粒度查询意图键
+
+    意图分析给出技术全称时使用规范化的全称，否则使用查询的词元集合（忽略词序、停用词和标点），
+    使措辞略有不同的相似查询共享论文总结。
+    """
+    full_name = (intent_result or {}).get("full_name") or ""
+    if isinstance(full_name, str) and normalize_query(full_name):
+        return "intent:" + normalize_query(full_name)
+    return "query:" + " ".join(sorted(set(tokenize(normalize_query(query)))))
+
+
+class SummaryCache:
+    """论文总结缓存（线程安全，由TTLCache保证）"""
+
+    def __init__(self, cache: TTLCache):
+        self.cache = cache
+
+    @staticmethod
+    def make_key(paper: Dict, query: str, language: str, intent_result: Optional[dict] = None, batched: bool = False) -> Optional[str]:
+        """生成缓存键，论文既没有paperId也没有标题时返回None（不缓存）"""
+        paper_id = paper.get('paperId') or normalize_title(paper.get('title', '') or '')
+        if not paper_id:
+            return None
+        raw = "\x00".join([paper_id, summary_template_hash(language, batched), language, make_intent_key(query, intent_result)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, paper: Dict, query: str, language: str, intent_result: Optional[dict] = None) -> Optional[str]:
+        """查询缓存的总结（单篇总结优先，其次批量总结），未命中返回None"""
+        key = self.make_key(paper, query, language, intent_result)
+        if key is None:
+            return None
+        summary = self.cache.get(key, label=language)
+        if summary is MISS or summary is NEGATIVE:
+            summary = self.cache.get(self.make_key(paper, query, language, intent_result, batched=True), label=f"{language}-batch")
+        if summary is MISS or summary is NEGATIVE:
+            return None
+        return summary
+
+    def put(self, paper: Dict, query: str, language: str, summary: str, intent_result: Optional[dict] = None, batched: bool = False):
+        """写入总结（空总结不缓存）
+
+        Args:
+            batched: 总结是否由批量总结Prompt生成
+        """
+        key = self.make_key(paper, query, language, intent_result, batched)
+        if key is None or not summary:
+            return
+        self.cache.set(key, summary)
+
+    def get_stats(self) -> dict:
+        return self.cache.get_stats()
+
+
+# 进程内共享的总结缓存
+_summary_cache: Optional[SummaryCache] = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> Optional[SummaryCache]:
+    """获取共享的论文总结缓存，未启用时返回None"""
+    global _summary_cache
+    if not Config.SUMMARY_CACHE_ENABLED:
+        return None
+
+    with _summary_cache_lock:
+        if _summary_cache is None:
+            _summary_cache = SummaryCache(get_ttl_cache(
+                "summaries",
+                max_entries=Config.SUMMARY_CACHE_MAX_ENTRIES,
+                ttl=Config.SUMMARY_CACHE_TTL,
+                disk_path=resolve_cache_path(Config.SUMMARY_CACHE_PATH)
+            ))
+        return _summary_cache
@@ -0,0 +1,213 @@
+"""
+主题聚类 - 本地向量聚类代替推理模型调用
+论文向量（Embedding不可用时用TF-IDF向量）做球面k-means，按轮廓系数自动选择主题数，
+以各主题的TF-IDF高权重词作为标签；固定随机种子，相同输入得到相同结果
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from bm25 import tokenize
+from vector_utils import normalize_rows
+
+
+# 不适合作为主题标签的学术常用词
+_LABEL_STOPWORDS = frozenset("""
+    we our us their its they these those which also can such than then there here into onto over under
+    using use used based via paper papers study studies work works propose proposed proposes present
+    presents method methods approach approaches result results show shows shown demonstrate demonstrates
+    new novel existing previous recent however while both each other more most many several various
+    performance state art first two three one well between across through within without not only
+    achieve achieves achieved significantly experiments experimental evaluation evaluate data task tasks
+""".split())
+
+# 命名输出的行格式：序号. 名称（容忍Markdown标题/加粗符号）
+_NAME_LINE_PATTERN = re.compile(r"^[#*\s]*(?:主题|topic)?\s*(\d+)\s*[.)、:：]\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+def paper_text(paper: Dict) -> str:
+    """论文用于向量化的文本（标题 + 摘要），与检索重排序使用的文本相同，可命中Embedding缓存"""
+    abstract = paper.get('abstract', '') or ''
+    title = paper.get('title', '') or ''
+    text = f"{title} {abstract}".strip()
+    return text if text else " "
+
+
+def tfidf_matrix(documents: Sequence[Sequence[str]]) -> Tuple[np.ndarray, List[str]]:
+    """计算L2归一化的TF-IDF矩阵（对数词频、平滑IDF）
+
+    Returns:
+        ((文档数, 词数) 的float32矩阵, 词表)
+    """
+    counts = [Counter(tokens) for tokens in documents]
+    vocabulary = sorted(set().union(*counts)) if counts else []
+    position = {term: column for column, term in enumerate(vocabulary)}
+    matrix = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+    for row, counter in enumerate(counts):
+        for term, count in counter.items():
+            matrix[row, position[term]] = 1.0 + math.log(count)
+    if vocabulary:
+        df = np.count_nonzero(matrix, axis=0).astype(np.float32)
+        matrix *= np.log((1.0 + len(documents)) / (1.0 + df)) + 1.0
+    return normalize_rows(matrix), vocabulary
+
+
+def kmeans(vectors: np.ndarray, k: int, n_init: int = 4, max_iter: int = 50, seed: int = 0) -> np.ndarray:
+    """球面k-means（向量需L2归一化，按余弦相似度分配），k-means++初始化
+
+    用n_init组不同的初始中心各运行一次，取各向量与所属中心相似度之和最大的结果。
+
+    Returns:
+        每个向量所属的簇编号
+    """
+    rng = np.random.RandomState(seed)
+    best_labels, best_objective = None, -np.inf
+    for _ in range(max(1, n_init)):
+        labels, objective = _kmeans_once(vectors, k, max_iter, rng)
+        if objective > best_objective:
+            best_labels, best_objective = labels, objective
+    return best_labels
+
+
+def _kmeans_once(vectors: np.ndarray, k: int, max_iter: int, rng: np.random.RandomState) -> Tuple[np.ndarray, float]:
+    n = vectors.shape[0]
+    centroids = [int(rng.randint(n))]
+    distances = np.clip(1.0 - vectors @ vectors[centroids[0]], 0.0, None)
+    for _ in range(1, k):
+        weights = distances.astype(np.float64)
+        total = weights.sum()
+        chosen = int(rng.choice(n, p=weights / total)) if total > 0 else int(rng.randint(n))
+        centroids.append(chosen)
+        distances = np.minimum(distances, np.clip(1.0 - vectors @ vectors[chosen], 0.0, None))
+    centers = vectors[centroids].copy()
+
+    labels = np.full(n, -1, dtype=np.intp)
+    for _ in range(max_iter):
+        similarities = vectors @ centers.T
+        new_labels = np.argmax(similarities, axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        one_hot = np.zeros((n, k), dtype=np.float32)
+        one_hot[np.arange(n), labels] = 1.0
+        sums = one_hot.T @ vectors
+        for cluster in np.flatnonzero(one_hot.sum(axis=0) == 0):
+            # 空簇重新以离所属中心最远的向量为中心
+            sums[cluster] = vectors[int(np.argmin(similarities[np.arange(n), labels]))]
+        centers = normalize_rows(sums)
+    objective = float((vectors @ centers.T)[np.arange(n), labels].sum())
+    return labels, objective
+
+
+def silhouette_score(vectors: np.ndarray, labels: np.ndarray) -> float:
+    """平均轮廓系数（余弦距离），只有一个簇时返回0"""
+    clusters = np.unique(labels)
+    if clusters.shape[0] < 2:
+        return 0.0
+    n = vectors.shape[0]
+    one_hot = (labels[:, None] == clusters[None, :]).astype(np.float32)
+    sizes = one_hot.sum(axis=0)
+    distance_sums = np.clip(1.0 - vectors @ vectors.T, 0.0, None) @ one_hot
+    own = np.searchsorted(clusters, labels)
+    own_sizes = sizes[own]
+
+    # a: 到同簇其他向量的平均距离；b: 到最近的其他簇的平均距离
+    a = distance_sums[np.arange(n), own] / np.maximum(own_sizes - 1, 1)
+    means = distance_sums / sizes[None, :]
+    means[np.arange(n), own] = np.inf
+    b = means.min(axis=1)
+    scores = (b - a) / np.maximum(np.maximum(a, b), 1e-12)
+    scores[own_sizes <= 1] = 0.0
+    return float(scores.mean())
+
+
+def choose_clusters(vectors: np.ndarray, max_k: int = 5, seed: int = 0) -> np.ndarray:
+    """在2到max_k之间选择轮廓系数最高的主题数（相同时取较小的k），向量太少时归为一个主题"""
+    n = vectors.shape[0]
+    best_labels = np.zeros(n, dtype=np.intp)
+    best_score = -np.inf
+    for k in range(2, min(max_k, n - 1) + 1):
+        labels = kmeans(vectors, k, seed=seed)
+        score = silhouette_score(vectors, labels)
+        if score > best_score:
+            best_labels, best_score = labels, score
+    return best_labels
+
+
+def _is_label_term(term: str) -> bool:
+    return len(term) >= 3 and term.isalpha() and term not in _LABEL_STOPWORDS
+
+
+def cluster_texts(texts: Sequence[str], embeddings: Optional[np.ndarray] = None, max_k: int = 5,
+                  label_terms: int = 4, seed: int = 0) -> List[Dict]:
+    """对文本做主题聚类
+
+    Args:
+        texts: 待聚类的文本（论文标题+摘要或论文总结）
+        embeddings: 文本的L2归一化向量；为None、形状不符或含零向量（获取失败）时改用TF-IDF向量
+        max_k: 最大主题数
+        label_terms: 每个主题的标签词数
+
+    Returns:
+        主题列表（按论文数降序），每项包含 members（文本下标，升序）、terms（标签词）、
+        representative（最接近主题中心的文本下标）
+    """
+    n = len(texts)
+    if n == 0:
+        return []
+    tfidf, vocabulary = tfidf_matrix([tokenize(text) for text in texts])
+
+    vectors = tfidf
+    if embeddings is not None:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 2 and embeddings.shape[0] == n and embeddings.shape[1] > 0 and np.all(np.any(embeddings, axis=1)):
+            vectors = normalize_rows(embeddings)
+    labels = choose_clusters(vectors, max_k, seed) if vectors.shape[1] > 0 else np.zeros(n, dtype=np.intp)
+
+    label_mask = np.array([_is_label_term(term) for term in vocabulary], dtype=bool)
+    topics = []
+    for cluster in np.unique(labels):
+        members = np.flatnonzero(labels == cluster)
+        weights = tfidf[members].mean(axis=0) * label_mask if vocabulary else np.zeros(0)
+        order = np.argsort(-weights, kind="stable")[:label_terms]
+        terms = [vocabulary[column] for column in order if weights[column] > 0]
+        center = normalize_rows(vectors[members].sum(axis=0))
+        representative = int(members[int(np.argmax(vectors[members] @ center))])
+        topics.append({"members": members.tolist(), "terms": terms, "representative": representative})
+    topics.sort(key=lambda topic: (-len(topic["members"]), topic["members"][0]))
+    return topics
+
+
+def parse_topic_names(response: str, count: int) -> Dict[int, str]:
+    """解析主题命名输出（每行"序号. 名称"），返回 {主题下标: 名称}"""
+    names = {}
+    for match in _NAME_LINE_PATTERN.finditer(response or ""):
+        number = int(match.group(1))
+        name = match.group(2).strip().strip("*").strip()
+        if 1 <= number <= count and (number - 1) not in names and name:
+            names[number - 1] = name
+    return names
+
+
+def format_topics(topics: List[Dict], titles: Sequence[str], language: str = 'en') -> str:
+    """将聚类结果格式化为综述Prompt使用的主题文本
+
+    论文编号从1开始，与综述Prompt中的论文编号一致。
+    """
+    lines = []
+    for number, topic in enumerate(topics, 1):
+        terms = " / ".join(topic["terms"])
+        name = topic.get("name") or terms or titles[topic["representative"]]
+        if language == 'zh':
+            lines.append(f"主题 {number}：{name}（{len(topic['members'])}篇）")
+            if terms and topic.get("name"):
+                lines.append(f"- 关键词：{terms}")
+            lines.extend(f"- 论文 {index + 1}: {titles[index]}" for index in topic["members"])
+        else:
+            lines.append(f"Topic {number}: {name} ({len(topic['members'])} papers)")
+            if terms and topic.get("name"):
+                lines.append(f"- Keywords: {terms}")
+            lines.extend(f"- Paper {index + 1}: {titles[index]}" for index in topic["members"])
+        lines.append("")
+    return "\n".join(lines).strip()
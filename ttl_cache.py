@@ -0,0 +1,197 @@
+"""
+TTL缓存 - 内存LRU + 可选SQLite磁盘层（值以JSON存储），支持失败结果的短期负缓存
+命中统计按标签（如检索后端）分别记录
+"""
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class _Sentinel:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+# get() 的特殊返回值
+MISS = _Sentinel("MISS")          # 未命中
+NEGATIVE = _Sentinel("NEGATIVE")  # 命中负缓存（最近失败过，应直接走降级路径）
+
+
+class TTLCache:
+    """带过期时间的两级缓存（线程安全）
+
+    - 内存层：OrderedDict实现的LRU，最多 max_entries 条
+    - 磁盘层：SQLite表，值为JSON，按过期时间清理
+    - 负缓存：set_negative() 写入的条目在 negative_ttl 秒内返回 NEGATIVE，只保存在内存中
+    """
+
+    def __init__(self, name: str, max_entries: int = 1000, ttl: float = 86400, negative_ttl: float = 60, disk_path: Optional[str] = None):
+        """
+        Args:
+            name: 缓存名称（同一SQLite文件中区分不同的缓存）
+            max_entries: 内存层最大条目数（磁盘层为其10倍）
+            ttl: 默认有效期（秒）
+            negative_ttl: 负缓存有效期（秒）
+            disk_path: SQLite文件路径，为None时只使用内存
+        """
+        self.name = name
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        if disk_path and self.max_entries > 0:
+            try:
+                self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS ttl_cache ("
+                    "name TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                    "PRIMARY KEY (name, key))"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ttl_cache_expires ON ttl_cache(expires_at)")
+                self._conn.execute("DELETE FROM ttl_cache WHERE expires_at < ?", (time.time(),))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  {self.name}磁盘缓存初始化失败: {e}，仅使用内存缓存")
+                self._conn = None
+
+    def get(self, key: str, label: str = "default") -> Any:
+        """查询缓存
+
+        Args:
+            key: 缓存键
+            label: 统计标签
+
+        Returns:
+            缓存的值；未命中返回 MISS，命中负缓存返回 NEGATIVE
+        """
+        now = time.time()
+        with self._lock:
+            stats = self._stats.setdefault(label, {"hits": 0, "negative_hits": 0, "misses": 0})
+
+            item = self._memory.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    if value is NEGATIVE:
+                        stats["negative_hits"] += 1
+                    else:
+                        stats["hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._conn is not None:
+                value = self._disk_get(key, now)
+                if value is not MISS:
+                    stats["hits"] += 1
+                    return value
+
+            stats["misses"] += 1
+            return MISS
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """写入缓存（值需可JSON序列化）"""
+        if self.max_entries == 0:
+            return
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._memory_put(key, expires_at, value)
+            if self._conn is not None:
+                self._disk_put(key, expires_at, value)
+
+    def set_negative(self, key: str, ttl: Optional[float] = None):
+        """记录失败结果，在负缓存有效期内 get() 返回 NEGATIVE"""
+        if self.max_entries == 0:
+            return
+        expires_at = time.time() + (self.negative_ttl if ttl is None else ttl)
+        with self._lock:
+            self._memory_put(key, expires_at, NEGATIVE)
+
+    def get_stats(self) -> dict:
+        """获取按标签统计的命中率"""
+        with self._lock:
+            labels = {}
+            for label, stats in self._stats.items():
+                lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+                labels[label] = dict(stats, hit_rate=stats["hits"] / lookups if lookups else 0.0)
+            return {
+                "name": self.name,
+                "memory_entries": len(self._memory),
+                "disk_enabled": self._conn is not None,
+                "labels": labels
+            }
+
+    def _memory_put(self, key: str, expires_at: float, value: Any):
+        """写入内存LRU（调用方需持有锁）"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Any:
+        """从SQLite读取并回填内存层（调用方需持有锁）"""
+        try:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM ttl_cache WHERE name = ? AND key = ?", (self.name, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️  {self.name}磁盘缓存读取失败: {e}")
+            return MISS
+        if row is None or row[1] < now:
+            return MISS
+        value = json.loads(row[0])
+        self._memory_put(key, row[1], value)
+        return value
+
+    def _disk_put(self, key: str, expires_at: float, value: Any):
+        """写入SQLite并按过期时间淘汰超量条目（调用方需持有锁）"""
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ttl_cache (name, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.name, key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+            total = self._conn.execute("SELECT COUNT(*) FROM ttl_cache WHERE name = ?", (self.name,)).fetchone()[0]
+            overflow = total - self.max_entries * 10
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM ttl_cache WHERE name = ? AND key IN ("
+                    "SELECT key FROM ttl_cache WHERE name = ? ORDER BY expires_at ASC LIMIT ?)",
+                    (self.name, self.name, overflow)
+                )
+            self._conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"⚠️  {self.name}磁盘缓存写入失败: {e}")
+
+
+# 进程内共享的缓存实例，按名称区分
+_caches: Dict[str, TTLCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_ttl_cache(name: str, max_entries: int = 1000, ttl: float = 86400, negative_ttl: float = 60, disk_path: Optional[str] = None) -> TTLCache:
+    """获取指定名称的共享缓存，首次调用时按参数创建"""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = TTLCache(name, max_entries, ttl, negative_ttl, disk_path)
+            _caches[name] = cache
+        return cache
+
+
+def get_all_ttl_cache_stats() -> Dict[str, dict]:
+    """获取所有共享缓存的统计"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.get_stats() for cache in caches}
@@ -0,0 +1,73 @@
+"""
+向量工具 - 行归一化与Top-K选择（float32）
+"""
+from typing import Optional
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """将矩阵每行（或单个向量）L2归一化为float32，零向量保持为零"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.size == 0:
+        return matrix
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    # 零向量（Embedding失败时的占位）除以1，保持为零，相似度为0
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """返回得分最高的k个下标（降序，得分相同时保持原顺序）
+
+    k小于元素数时先用argpartition选出前k个，只对这k个排序。
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[0]
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    # 按下标排序后再稳定排序，得分相同时保持原顺序
+    candidates.sort()
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class IncrementalReranker:
+    """增量重排序：逐批加入候选及其向量，随时取出相似度最高的候选
+
+    query_embedding 与候选向量都应为L2归一化的float32向量，每批只计算一次矩阵-向量乘法。
+    """
+
+    def __init__(self, query_embedding: np.ndarray, threshold: float = 0.5):
+        """
+        Args:
+            query_embedding: 查询向量
+            threshold: 高相似度阈值，用于统计 high_similarity_count
+        """
+        self.query_embedding = normalize_rows(np.ravel(query_embedding))
+        self.threshold = threshold
+        self.items: list = []
+        self._scores: list = []
+        self.high_similarity_count = 0
+
+    def add(self, items: list, embeddings: np.ndarray):
+        """加入一批候选（embeddings的行与items一一对应）"""
+        if not items:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[1] != self.query_embedding.shape[0]:
+            # 维度不一致时按相似度0处理，保留候选
+            scores = np.zeros(len(items), dtype=np.float32)
+        else:
+            scores = embeddings @ self.query_embedding
+        self.items.extend(items)
+        self._scores.append(scores)
+        self.high_similarity_count += int(np.count_nonzero(scores >= self.threshold))
+
+    def top_k(self, k: Optional[int] = None) -> list:
+        """按相似度降序返回前k个候选（为None时返回全部）"""
+        if not self.items:
+            return []
+        scores = np.concatenate(self._scores)
+        return [self.items[index] for index in top_k_indices(scores, k)]